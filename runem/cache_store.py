@@ -0,0 +1,341 @@
+"""Where cached job results are kept, on disk and, optionally, on a shared server.
+
+A cache-store maps keys, e.g. the job-cache's keys, to blobs of bytes. There are
+two kinds:
+- `LocalCacheStore`, a dir in runem's state-dir, capped in size.
+- `HttpCacheStore`, a server that GETs and PUTs blobs, so that CI and the team's
+  checkouts can share results.
+
+When a server is configured both are used, see `LayeredCacheStore`, so that
+results found on the server are kept locally for next time.
+
+Each store counts its hits, misses and the bytes moved, see `CacheStats`, which
+are shown in the run's report so the size cap can be tuned.
+"""
+
+import hashlib
+import os
+import pathlib
+import tempfile
+import typing
+
+from runem.log import warn
+from runem.types.runem_config import CacheConfig
+from runem.types.types_jobs import CacheStats, CacheStatsByStore
+
+# Overrides the config's `cache.url`, useful for pointing ci/cd at a server.
+CACHE_URL_ENV_VAR = "RUNEM_CACHE_URL"
+
+DEFAULT_MAX_SIZE_MB = 256
+
+# How long to wait on the cache server before treating it as a miss
+HTTP_TIMEOUT_S = 5.0
+
+REFS_DIRNAME = "refs"
+BLOBS_DIRNAME = "blobs"
+
+# The cache servers that failed, so this process, e.g. a worker, doesn't use
+# them again. The stores are opened per job, so the flag can't live on them.
+_FAILED_URLS: typing.Set[str] = set()
+
+# A running total of the size of each local cache dir, by path, so that we only
+# walk the dir when it might be over its cap, rather than on every write.
+_CACHE_DIR_SIZES: typing.Dict[str, int] = {}
+
+
+def new_cache_stats() -> CacheStats:
+    """Returns stats for a store that hasn't been used yet."""
+    return {
+        "hits": 0,
+        "misses": 0,
+        "bytes_read": 0,
+        "bytes_written": 0,
+        "bytes_evicted": 0,
+    }
+
+
+def merge_cache_stats(
+    total: CacheStatsByStore, cache_stats: CacheStatsByStore
+) -> CacheStatsByStore:
+    """Adds `cache_stats` to `total`, by store, returning `total`."""
+    for store_name, store_stats in cache_stats.items():
+        total_stats: CacheStats = total.setdefault(store_name, new_cache_stats())
+        total_stats["hits"] += store_stats["hits"]
+        total_stats["misses"] += store_stats["misses"]
+        total_stats["bytes_read"] += store_stats["bytes_read"]
+        total_stats["bytes_written"] += store_stats["bytes_written"]
+        total_stats["bytes_evicted"] += store_stats["bytes_evicted"]
+    return total
+
+
+class CacheStore(typing.Protocol):
+    """Gets and puts blobs by key."""
+
+    def get(self, key: str) -> typing.Optional[bytes]:  # pragma: no cover
+        """Returns the blob stored under `key`, or None."""
+
+    def put(self, key: str, data: bytes) -> None:  # pragma: no cover
+        """Stores `data` under `key`, replacing anything there."""
+
+    def get_stats(self) -> CacheStatsByStore:  # pragma: no cover
+        """Returns how the store, and any it wraps, have been used."""
+
+
+def _write_atomically(file_path: pathlib.Path, data: bytes) -> None:
+    """Writes to a temp file and moves it into place.
+
+    So that concurrent jobs never see a half-written file.
+    """
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "wb",
+        dir=file_path.parent,
+        prefix=f".{file_path.name}.",
+        delete=False,
+    ) as file_handle:
+        file_handle.write(data)
+    os.replace(file_handle.name, file_path)
+
+
+class LocalCacheStore:
+    """A cache-store in a local dir, that evicts the least-recently-used entries.
+
+    Blobs are content-addressed, stored under the hash of their contents, and
+    keys are small 'ref' files holding the hash of their blob. So jobs that
+    produce the same output share one blob, and a corrupt blob is spotted, and
+    missed, on read.
+
+    Reads touch the ref and blob, so the files' mtimes order them by last use.
+    When a write takes the store over `max_size_bytes` the oldest files, refs and
+    blobs alike, are removed. A ref whose blob was removed is a miss.
+
+    The dir is only walked, to find its size, on a process's first write and
+    whenever the writes since take it over the cap. Each worker only counts its
+    own writes, so the store can go over the cap by what the others wrote since.
+    """
+
+    name = "local"
+
+    def __init__(self, cache_dir: pathlib.Path, max_size_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.stats: CacheStats = new_cache_stats()
+
+    def _ref_path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / REFS_DIRNAME / key
+
+    def _blob_path(self, digest: str) -> pathlib.Path:
+        # fan out, so that no one dir gets too large
+        return self.cache_dir / BLOBS_DIRNAME / digest[:2] / digest
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        """Returns the blob stored under `key`, or None."""
+        ref_path: pathlib.Path = self._ref_path(key)
+        try:
+            digest: str = ref_path.read_text(encoding="utf-8").strip()
+            blob_path: pathlib.Path = self._blob_path(digest)
+            data: bytes = blob_path.read_bytes()
+        except OSError:
+            # no ref, or its blob was evicted
+            self.stats["misses"] += 1
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            warn(f"ignoring corrupt cache entry at {str(blob_path)}")
+            self.stats["misses"] += 1
+            return None
+        try:
+            # mark as recently used, for eviction
+            os.utime(ref_path)
+            os.utime(blob_path)
+        except OSError:  # pragma: no cover
+            # evicted by another job since we read it, the data is still good
+            pass
+        self.stats["hits"] += 1
+        self.stats["bytes_read"] += len(data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Stores `data` under `key`, evicting old entries if over the cap."""
+        digest: str = hashlib.sha256(data).hexdigest()
+        blob_path: pathlib.Path = self._blob_path(digest)
+        bytes_written: int = len(digest)
+        try:
+            if blob_path.exists():
+                # another job had the same output, share it
+                os.utime(blob_path)
+            else:
+                _write_atomically(blob_path, data)
+                self.stats["bytes_written"] += len(data)
+                bytes_written += len(data)
+            _write_atomically(self._ref_path(key), digest.encode("utf-8"))
+        except OSError as err:
+            warn(f"failed to write to the cache at {str(self.cache_dir)}: {err}")
+            return
+        cache_dir_size: typing.Optional[int] = _CACHE_DIR_SIZES.get(
+            str(self.cache_dir), None
+        )
+        if cache_dir_size is None or (
+            cache_dir_size + bytes_written > self.max_size_bytes
+        ):
+            cache_dir_size = self._evict()
+        else:
+            cache_dir_size += bytes_written
+        _CACHE_DIR_SIZES[str(self.cache_dir)] = cache_dir_size
+
+    def _evict(self) -> int:
+        """Removes the least-recently-used files until we're under the cap.
+
+        Returns the size of the dir's files after.
+        """
+        entries: typing.List[typing.Tuple[int, int, str]] = []  # mtime, size, path
+        total_size: int = 0
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                file_path: str = os.path.join(dir_path, file_name)
+                try:
+                    file_stat: os.stat_result = os.stat(file_path)
+                except OSError:
+                    # removed by another job as we were looking
+                    continue
+                entries.append((file_stat.st_mtime_ns, file_stat.st_size, file_path))
+                total_size += file_stat.st_size
+        if total_size <= self.max_size_bytes:
+            return total_size
+        entries.sort()
+        for _, size, file_path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.unlink(file_path)
+            except OSError:
+                # another job evicted it first
+                continue
+            total_size -= size
+            self.stats["bytes_evicted"] += size
+        return total_size
+
+    def get_stats(self) -> CacheStatsByStore:
+        """Returns how the store has been used."""
+        return {self.name: self.stats}
+
+
+class HttpCacheStore:
+    """A cache-store on a server that GETs and PUTs blobs at `<url>/<key>`.
+
+    A 404 is a miss. Any other error is warned about and the server is not used
+    again by this process for the rest of the run. So a down server only slows
+    each worker once, rather than every cacheable job.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, timeout_s: float = HTTP_TIMEOUT_S) -> None:
+        self.url = url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.stats: CacheStats = new_cache_stats()
+
+    @property
+    def _failed(self) -> bool:
+        return self.url in _FAILED_URLS
+
+    def _request(
+        self, method: str, key: str, data: typing.Optional[bytes] = None
+    ) -> typing.Optional[bytes]:
+        """Returns the response's body, or None on a 404 or error."""
+        if self._failed:
+            return None
+        # slow to import, and only needed when a server is configured
+        import urllib.error  # pylint: disable=import-outside-toplevel
+        import urllib.parse  # pylint: disable=import-outside-toplevel
+        import urllib.request  # pylint: disable=import-outside-toplevel
+
+        request = urllib.request.Request(
+            f"{self.url}/{urllib.parse.quote(key, safe='')}", data=data, method=method
+        )
+        if data is not None:
+            request.add_header("Content-Type", "application/octet-stream")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout_s) as response:
+                body: bytes = response.read()
+                return body
+        except urllib.error.HTTPError as err:
+            if err.code == 404:
+                return None
+            warn(f"cache server at {self.url} failed, not using it: {err}")
+        except (OSError, ValueError) as err:
+            # URLError, timeouts, bad urls
+            warn(f"cache server at {self.url} failed, not using it: {err}")
+        _FAILED_URLS.add(self.url)
+        return None
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        """Returns the blob stored under `key` on the server, or None."""
+        data: typing.Optional[bytes] = self._request("GET", key)
+        if data is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.stats["bytes_read"] += len(data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Uploads `data` to the server under `key`."""
+        if self._failed:
+            return
+        self._request("PUT", key, data)
+        if not self._failed:
+            self.stats["bytes_written"] += len(data)
+
+    def get_stats(self) -> CacheStatsByStore:
+        """Returns how the server has been used."""
+        return {self.name: self.stats}
+
+
+class LayeredCacheStore:
+    """Looks in a fast store first, then a slow one, keeping slow hits locally."""
+
+    def __init__(self, fast: CacheStore, slow: CacheStore) -> None:
+        self.fast = fast
+        self.slow = slow
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        """Returns the blob from the first store that has it."""
+        data: typing.Optional[bytes] = self.fast.get(key)
+        if data is None:
+            data = self.slow.get(key)
+            if data is not None:
+                self.fast.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Stores `data` in both stores."""
+        self.fast.put(key, data)
+        self.slow.put(key, data)
+
+    def get_stats(self) -> CacheStatsByStore:
+        """Returns the stats of both stores."""
+        return {**self.fast.get_stats(), **self.slow.get_stats()}
+
+
+def open_cache_store(
+    cache_dir: typing.Optional[pathlib.Path],
+    cache_config: typing.Optional[CacheConfig],
+) -> typing.Optional[CacheStore]:
+    """Returns the configured cache-store, or None if there is nowhere to cache.
+
+    `cache_dir` is the local store's dir, None if there isn't one.
+    """
+    cache_config = cache_config or {}
+    local_store: typing.Optional[CacheStore] = None
+    if cache_dir is not None:
+        max_size_mb: int = cache_config.get("max_size_mb", DEFAULT_MAX_SIZE_MB)
+        local_store = LocalCacheStore(cache_dir, max_size_mb * 1024 * 1024)
+    url: typing.Optional[str] = os.environ.get(
+        CACHE_URL_ENV_VAR, None
+    ) or cache_config.get("url", None)
+    if not url:
+        return local_store
+    http_store: CacheStore = HttpCacheStore(url)
+    if local_store is None:
+        return http_store
+    return LayeredCacheStore(local_store, http_store)
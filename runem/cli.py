@@ -1,13 +1,22 @@
-"""CLI interface for runem project."""
+"""CLI interface for runem project.
 
-import sys
+Every run starts here, so keep the imports light: modules that are only needed
+on some code paths, e.g. the spinner, jsonschema or termplotlib, are imported
+where they are used. `tests/test_import_time.py` checks that they stay so.
+"""
 
-from runem.mcp.help import help_agents_text
-from runem.runem import timed_main
+import sys
 
 
 def main() -> None:
     if "--help-agents" in sys.argv:
+        from runem.mcp.help import (  # pylint: disable=import-outside-toplevel
+            help_agents_text,
+        )
+
         print(help_agents_text())
         return
+
+    from runem.runem import timed_main  # pylint: disable=import-outside-toplevel
+
     timed_main(sys.argv)
@@ -1,5 +1,6 @@
 import argparse
 import importlib
+import math
 import os
 import pathlib
 import sys
@@ -251,6 +252,31 @@ def parse_args(  # pylint: disable=too-many-statements
         required=False,
     )
 
+    parser.add_argument(
+        "--cache",
+        dest="cache",
+        help=(
+            "skip jobs that set ctx.cache whose config, code, options, files and "
+            "declared inputs are unchanged since they last passed, re-using their "
+            "output. Use --no-cache to run all jobs"
+        ),
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--fail-fast",
+        dest="fail_fast",
+        help=(
+            "on the first failing job, stop all other jobs, including running "
+            "ones, instead of letting the running jobs complete"
+        ),
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        required=False,
+    )
+
     parser.add_argument(
         "--git-files-since-branch",
         dest="git_since_branch",
@@ -263,6 +289,42 @@ def parse_args(  # pylint: disable=too-many-statements
         type=str,  # Accepts a string input representing the branch name
     )
 
+    parser.add_argument(
+        "--job-timeout",
+        dest="job_timeout",
+        help=(
+            "stop any job, and everything it started, that runs for longer than "
+            "this many seconds, for jobs that don't set ctx.timeout_s"
+        ),
+        default=None,
+        required=False,
+        type=parse_timeout,
+    )
+
+    parser.add_argument(
+        "--load-aware",
+        dest="load_aware",
+        help=(
+            "hold back starting jobs whilst other processes keep the host busy, "
+            "going by cpu/memory pressure-stall info or the load-average"
+        ),
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        required=False,
+    )
+
+    parser.add_argument(
+        "--mem-budget",
+        dest="mem_budget",
+        help=(
+            "only run jobs together whilst their combined peak memory, as "
+            "measured on previous runs, fits in this many bytes, e.g. 512M or 12G"
+        ),
+        default=None,
+        required=False,
+        type=parse_mem_size,
+    )
+
     parser.add_argument(
         "--procs",
         "-j",
@@ -387,6 +449,45 @@ def _enable_shell_completion(parser: argparse.ArgumentParser) -> None:
     argcomplete_module.autocomplete(parser)
 
 
+_MEM_SIZE_UNITS: typing.Dict[str, int] = {
+    "": 1,
+    "K": 1024,
+    "M": 1024**2,
+    "G": 1024**3,
+    "T": 1024**4,
+}
+
+
+def parse_mem_size(value: str) -> int:
+    """Parses a memory size, in bytes or with a K/M/G/T suffix, e.g. '12G'."""
+    size: str = value.strip().upper()
+    if size.endswith("B"):
+        size = size[:-1]  # allow '12GB' as well as '12G'
+    unit: str = size[-1:] if size[-1:] in _MEM_SIZE_UNITS else ""
+    try:
+        number: float = float(size[: len(size) - len(unit)])
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid memory size '{value}', expected e.g. 512M or 12G"
+        ) from None
+    if not math.isfinite(number) or number <= 0:
+        raise argparse.ArgumentTypeError(f"memory size must be positive, not '{value}'")
+    return int(number * _MEM_SIZE_UNITS[unit])
+
+
+def parse_timeout(value: str) -> float:
+    """Parses a timeout, a positive number of seconds."""
+    try:
+        timeout_s: float = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid timeout '{value}', expected a number of seconds"
+        ) from None
+    if not math.isfinite(timeout_s) or timeout_s <= 0:
+        raise argparse.ArgumentTypeError(f"timeout must be positive, not '{value}'")
+    return timeout_s
+
+
 def _get_config_dir(config_metadata: ConfigMetadata) -> pathlib.Path:
     """A function to get the path, that we can mock in tests."""
     return config_metadata.cfg_filepath.parent
@@ -13,7 +13,6 @@ from runem.types.runem_config import (
     GlobalSerialisedConfig,
     UserConfigMetadata,
 )
-from runem.yaml_utils import load_yaml_object
 
 CFG_FILE_YAML = pathlib.Path(".runem.yml")
 
@@ -118,6 +117,11 @@ def _conform_global_config_types(
 
 def load_and_parse_config(cfg_filepath: pathlib.Path) -> Config:
     """For the given config file pass, project or user, load it & parse/conform it."""
+    # yaml is slow to import, and not needed when the compiled config is cached
+    from runem.yaml_utils import (  # pylint: disable=import-outside-toplevel
+        load_yaml_object,
+    )
+
     all_config = load_yaml_object(cfg_filepath)
     validate_runem_file(
         cfg_filepath,
@@ -156,10 +160,28 @@ def load_project_config() -> typing.Tuple[Config, pathlib.Path]:
     return conformed_config, cfg_filepath
 
 
-def load_user_configs() -> UserConfigMetadata:
-    """Returns the user-local configs, that extend/override runem behaviour."""
+def find_config_files() -> typing.Tuple[
+    typing.Optional[pathlib.Path], typing.List[pathlib.Path]
+]:
+    """Returns the project's .runem.yml, or None if not found, and the user-configs.
+
+    Unlike load_project_config() this does not exit if there is no .runem.yml.
+    """
+    cfg_candidate: typing.Optional[pathlib.Path]
+    cfg_candidate, _ = _find_config_file(config_filename=CFG_FILE_YAML)
+    return cfg_candidate, _find_local_configs()
+
+
+def load_user_configs(
+    user_config_paths: typing.Optional[typing.List[pathlib.Path]] = None,
+) -> UserConfigMetadata:
+    """Returns the user-local configs, that extend/override runem behaviour.
+
+    Searches for the user-configs unless `user_config_paths` is given.
+    """
     user_configs: typing.List[typing.Tuple[Config, pathlib.Path]] = []
-    user_config_paths: typing.List[pathlib.Path] = _find_local_configs()
+    if user_config_paths is None:
+        user_config_paths = _find_local_configs()
     for config_path in user_config_paths:
         user_config: Config = load_and_parse_config(config_path)
         user_configs.append((user_config, config_path))
@@ -0,0 +1,140 @@
+"""Caches the compiled config between runs, so an unchanged config isn't re-parsed.
+
+Loading the yaml, validating it against runem's schema and parsing it is a
+noticeable part of runem's start-up. The result only changes when the files do,
+so we keep the compiled config, see `CompiledConfig`, keyed on:
+- the paths and contents of .runem.yml and the user-configs,
+- the contents of runem's schema,
+- and runem's version.
+
+NOTE: the files of the jobs' functions are not part of the key, so a job whose
+      function has gone fails when it runs, rather than as the config loads.
+      Warnings from parsing, e.g. about phase ordering, show when it compiles.
+"""
+
+import hashlib
+import os
+import pathlib
+import pickle
+import tempfile
+import typing
+
+from runem.config import find_config_files, load_project_config, load_user_configs
+from runem.config_metadata import ConfigMetadata
+from runem.config_parse import compile_config, config_metadata_from_compiled
+from runem.log import log, warn
+from runem.runem_version import get_runem_version
+from runem.state_dir import find_state_dir
+from runem.types.runem_config import CompiledConfig, Config, UserConfigMetadata
+
+CONFIG_CACHE_FILENAME = "config_cache.pickle"
+
+SCHEMA_PATH = pathlib.Path(__file__).with_name("schema.yml")
+
+# Bump when the cached data, or how it is made, changes
+_CACHE_FORMAT = 1
+
+
+def config_cache_key(
+    cfg_filepath: pathlib.Path, user_config_paths: typing.List[pathlib.Path]
+) -> typing.Optional[str]:
+    """Returns the key for the configs, or None if one of them can't be read."""
+    key_hash = hashlib.sha256()
+    key_hash.update(f"{_CACHE_FORMAT} {str(get_runem_version())}".encode("utf-8"))
+    for file_path in (SCHEMA_PATH, cfg_filepath, *user_config_paths):
+        key_hash.update(
+            b"\0" + str(file_path.absolute()).encode("utf-8", "surrogateescape")
+        )
+        try:
+            key_hash.update(hashlib.sha256(file_path.read_bytes()).digest())
+        except OSError:
+            return None
+    return key_hash.hexdigest()
+
+
+def load_compiled_config(
+    state_dir: pathlib.Path, key: str
+) -> typing.Optional[CompiledConfig]:
+    """Returns the compiled config, if it was cached under `key`."""
+    cache_path: pathlib.Path = state_dir / CONFIG_CACHE_FILENAME
+    try:
+        cached: bytes = cache_path.read_bytes()
+    except FileNotFoundError:
+        return None
+    except OSError:
+        warn(f"ignoring unreadable config cache at {str(cache_path)}")
+        return None
+    # the key leads, so a stale entry is never un-pickled. The state-dir is as
+    # trusted as the checkout it is in, so we are happy to un-pickle from it.
+    cached_key, _, serialised = cached.partition(b"\n")
+    if cached_key != key.encode("utf-8"):
+        return None
+    try:
+        compiled: CompiledConfig = pickle.loads(serialised)
+    except Exception:  # pylint: disable=broad-exception-caught
+        warn(f"ignoring unreadable config cache at {str(cache_path)}")
+        return None
+    return compiled
+
+
+def save_compiled_config(
+    state_dir: pathlib.Path, key: str, compiled: CompiledConfig
+) -> None:
+    """Atomically writes the compiled config to the cache."""
+    try:
+        serialised: bytes = pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as err:
+        warn(f"failed to write the config cache: {str(err)}")
+        return
+    try:
+        state_dir.mkdir(parents=True, exist_ok=True)
+        # write to a temp file and move it into place so that concurrent runem
+        # runs never see a half-written file.
+        with tempfile.NamedTemporaryFile(
+            "wb",
+            dir=state_dir,
+            prefix=f".{CONFIG_CACHE_FILENAME}.",
+            delete=False,
+        ) as file_handle:
+            file_handle.write(key.encode("utf-8") + b"\n" + serialised)
+        os.replace(file_handle.name, state_dir / CONFIG_CACHE_FILENAME)
+    except OSError as err:
+        warn(f"failed to write the config cache to {str(state_dir)}: {str(err)}")
+
+
+def load_cached_config_metadata(
+    silent: bool = False, verbose: bool = False
+) -> ConfigMetadata:
+    """Finds and loads the project and user configs, only compiling them if changed.
+
+    An unchanged config costs one small file read, instead of loading the yaml,
+    validating and parsing it.
+    """
+    cfg_filepath: typing.Optional[pathlib.Path]
+    user_config_paths: typing.List[pathlib.Path]
+    cfg_filepath, user_config_paths = find_config_files()
+    state_dir: typing.Optional[pathlib.Path] = None
+    key: typing.Optional[str] = None
+    if cfg_filepath is not None:
+        state_dir = find_state_dir(cfg_filepath)
+        if state_dir is not None:
+            key = config_cache_key(cfg_filepath, user_config_paths)
+        if state_dir is not None and key is not None:
+            compiled: typing.Optional[CompiledConfig] = load_compiled_config(
+                state_dir, key
+            )
+            if compiled is not None:
+                if verbose:
+                    log(f"loaded compiled config for {str(cfg_filepath)} from cache")
+                return config_metadata_from_compiled(cfg_filepath, compiled, verbose)
+
+    # exits if there is no .runem.yml
+    config: Config
+    config, cfg_filepath = load_project_config()
+    user_configs: UserConfigMetadata = load_user_configs(user_config_paths)
+    new_compiled: CompiledConfig = compile_config(
+        config, cfg_filepath, user_configs, silent, verbose
+    )
+    if state_dir is not None and key is not None:
+        save_compiled_config(state_dir, key, new_compiled)
+    return config_metadata_from_compiled(cfg_filepath, new_compiled, verbose)
@@ -6,7 +6,12 @@ from runem.informative_dict import InformativeDict
 from runem.types.common import JobNames, JobPhases, JobTags, OrderedPhases
 from runem.types.filters import TagFileFilters
 from runem.types.options import OptionsWritable
-from runem.types.runem_config import OptionConfigs, PhaseGroupedJobs
+from runem.types.runem_config import (
+    CacheConfig,
+    FileProviderConfig,
+    OptionConfigs,
+    PhaseGroupedJobs,
+)
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from runem.hook_manager import HookManager
@@ -23,6 +28,8 @@ class ConfigMetadata:
     all_job_names: JobNames  # the set of job-names
     all_job_phases: JobPhases  # the set of job-phases (should be subset of 'phases')
     all_job_tags: JobTags  # the set of job-tags (used for filtering)
+    file_provider: typing.Optional[FileProviderConfig]  # where to get files, or git
+    cache_config: typing.Optional[CacheConfig]  # where, and how much, to cache
 
     options: OptionsWritable  # the final configured options to pass to jobs
 
@@ -43,6 +50,8 @@ class ConfigMetadata:
         all_job_names: JobNames,
         all_job_phases: JobPhases,
         all_job_tags: JobTags,
+        file_provider: typing.Optional[FileProviderConfig] = None,
+        cache_config: typing.Optional[CacheConfig] = None,
     ) -> None:
         self.cfg_filepath = cfg_filepath
         self.phases = phases
@@ -54,6 +63,8 @@ class ConfigMetadata:
         self.all_job_names = all_job_names
         self.all_job_phases = all_job_phases
         self.all_job_tags = all_job_tags
+        self.file_provider = file_provider
+        self.cache_config = cache_config
 
         self.options = InformativeDict()  # shows useful errors on bad-option lookups
 
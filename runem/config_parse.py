@@ -15,8 +15,11 @@ from runem.types.errors import FunctionNotFound, SystemExitBad
 from runem.types.filters import TagFileFilter, TagFileFilters
 from runem.types.hooks import HookName
 from runem.types.runem_config import (
+    CacheConfig,
+    CompiledConfig,
     Config,
     ConfigNodes,
+    FileProviderConfig,
     GlobalConfig,
     GlobalSerialisedConfig,
     HookConfig,
@@ -29,6 +32,7 @@ from runem.types.runem_config import (
     PhaseGroupedJobs,
     TagFileFilterSerialised,
 )
+from runem.utils import printable_set
 
 
 def _support_job_module(cfg_filepath: pathlib.Path) -> None:
@@ -233,6 +237,29 @@ def parse_job_config(
         ) from err
 
 
+def _validate_job_dependencies(
+    jobs_by_phase: PhaseGroupedJobs, job_names: JobNames
+) -> None:
+    """Checks that the `when.after` entries of all jobs name real jobs."""
+    for jobs in jobs_by_phase.values():
+        for job in jobs:
+            dependencies: typing.Optional[JobNames] = Job.get_job_dependencies(job)
+            if not dependencies:
+                continue
+            job_name: str = Job.get_job_name(job)
+            for dependency in sorted(dependencies):
+                if Job.is_dependency_match(job_name, dependency):
+                    raise ValueError(f"job '{job_name}' cannot run after itself")
+                if not any(
+                    Job.is_dependency_match(candidate, dependency)
+                    for candidate in job_names
+                ):
+                    raise ValueError(
+                        f"job '{job_name}' runs after unknown job '{dependency}'. "
+                        f"Known jobs are: {printable_set(job_names)}"
+                    )
+
+
 def parse_config(  # noqa: C901
     config: Config,
     cfg_filepath: pathlib.Path,
@@ -247,6 +274,8 @@ def parse_config(  # noqa: C901
     JobNames,  # job_names:
     JobPhases,  # job_phases:
     JobTags,  # tags:
+    typing.Optional[FileProviderConfig],  # file_provider:
+    typing.Optional[CacheConfig],  # cache_config:
 ]:
     """Validates and restructure the config to make it more convenient to use."""
     jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
@@ -258,6 +287,8 @@ def parse_config(  # noqa: C901
     phase_order: OrderedPhases = ()
     options: OptionConfigs = ()
     file_filters: TagFileFilters = {}
+    file_provider: typing.Optional[FileProviderConfig] = None
+    cache_config: typing.Optional[CacheConfig] = None
     hooks: Hooks = defaultdict(list)
 
     # Support `module` dynamic imports
@@ -284,6 +315,8 @@ def parse_config(  # noqa: C901
             global_entry: GlobalSerialisedConfig = entry  # type: ignore  # see above
             global_config: GlobalConfig = global_entry["config"]
             phase_order, options, file_filters = _parse_global_config(global_config)
+            file_provider = global_config.get("file_provider", None)
+            cache_config = global_config.get("cache", None)
             continue
 
         # we apply a type-ignore here as we know (for now) that jobs have "job"
@@ -330,6 +363,7 @@ def parse_config(  # noqa: C901
             phase_order=phase_order,
             silent=silent,
         )
+    _validate_job_dependencies(jobs_by_phase, job_names)
     return (
         hooks,
         phase_order,
@@ -339,6 +373,8 @@ def parse_config(  # noqa: C901
         job_names,
         job_phases,
         tags,
+        file_provider,
+        cache_config,
     )
 
 
@@ -353,6 +389,8 @@ def generate_config(
     job_names: JobNames,
     job_phases: JobPhases,
     tags: JobTags,
+    file_provider: typing.Optional[FileProviderConfig] = None,
+    cache_config: typing.Optional[CacheConfig] = None,
 ) -> ConfigMetadata:
     """Constructs the ConfigMetadata from parsed config parts."""
     return ConfigMetadata(
@@ -365,6 +403,8 @@ def generate_config(
         job_names,
         job_phases,
         tags,
+        file_provider,
+        cache_config,
     )
 
 
@@ -383,17 +423,20 @@ def _load_user_hooks_from_config(
         _,
         _,
         _,
+        _,
+        _,
     ) = parse_config(user_config, cfg_filepath, silent, hooks_only=True)
     return hooks
 
 
-def load_config_metadata(
+def compile_config(
     config: Config,
     cfg_filepath: pathlib.Path,
     user_configs: typing.List[typing.Tuple[Config, pathlib.Path]],
     silent: bool = False,
     verbose: bool = False,
-) -> ConfigMetadata:
+) -> CompiledConfig:
+    """Parses the project config and the user-configs' hooks into one config."""
     hooks: Hooks
     phase_order: OrderedPhases
     options: OptionConfigs
@@ -402,6 +445,8 @@ def load_config_metadata(
     job_names: JobNames
     job_phases: JobPhases
     tags: JobTags
+    file_provider: typing.Optional[FileProviderConfig]
+    cache_config: typing.Optional[CacheConfig]
     (
         hooks,
         phase_order,
@@ -411,6 +456,8 @@ def load_config_metadata(
         job_names,
         job_phases,
         tags,
+        file_provider,
+        cache_config,
     ) = parse_config(config, cfg_filepath, silent)
 
     user_config: Config
@@ -431,15 +478,50 @@ def load_config_metadata(
                     f"hooks:\tadded {len(hooks_for_name)} user hooks for '{str(hook_name)}'"
                 )
 
+    return {
+        "hooks": hooks,
+        "phase_order": phase_order,
+        "options": options,
+        "file_filters": file_filters,
+        "jobs_by_phase": jobs_by_phase,
+        "job_names": job_names,
+        "job_phases": job_phases,
+        "tags": tags,
+        "file_provider": file_provider,
+        "cache_config": cache_config,
+    }
+
+
+def config_metadata_from_compiled(
+    cfg_filepath: pathlib.Path, compiled: CompiledConfig, verbose: bool = False
+) -> ConfigMetadata:
+    """Constructs the ConfigMetadata from a compiled, possibly cached, config."""
+    # parsing does this, but a cached config wasn't parsed this run
+    _support_job_module(cfg_filepath)
     return generate_config(
         cfg_filepath,
-        hooks,
-        phase_order,
+        compiled["hooks"],
+        compiled["phase_order"],
         verbose,
-        options,
-        file_filters,
-        jobs_by_phase,
-        job_names,
-        job_phases,
-        tags,
+        compiled["options"],
+        compiled["file_filters"],
+        compiled["jobs_by_phase"],
+        compiled["job_names"],
+        compiled["job_phases"],
+        compiled["tags"],
+        compiled["file_provider"],
+        compiled["cache_config"],
+    )
+
+
+def load_config_metadata(
+    config: Config,
+    cfg_filepath: pathlib.Path,
+    user_configs: typing.List[typing.Tuple[Config, pathlib.Path]],
+    silent: bool = False,
+    verbose: bool = False,
+) -> ConfigMetadata:
+    compiled: CompiledConfig = compile_config(
+        config, cfg_filepath, user_configs, silent, verbose
     )
+    return config_metadata_from_compiled(cfg_filepath, compiled, verbose)
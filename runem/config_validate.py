@@ -3,8 +3,9 @@ import typing
 
 from runem.log import error, log
 from runem.types.errors import SystemExitBad
-from runem.yaml_utils import load_yaml_object
-from runem.yaml_validation import ValidationErrors, validate_yaml
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from runem.yaml_validation import ValidationErrors
 
 
 def _load_runem_schema() -> typing.Any:
@@ -22,6 +23,10 @@ def _load_runem_schema() -> typing.Any:
             )
         )
         raise SystemExitBad(1)
+    from runem.yaml_utils import (  # pylint: disable=import-outside-toplevel
+        load_yaml_object,
+    )
+
     schema: typing.Any = load_yaml_object(schema_path)
     return schema
 
@@ -34,8 +39,13 @@ def validate_runem_file(
 
     Exits if the files does not validate.
     """
+    # jsonschema is slow to import, so only load it once we have a file to check
+    from runem.yaml_validation import (  # pylint: disable=import-outside-toplevel
+        validate_yaml,
+    )
+
     schema: typing.Any = _load_runem_schema()
-    errors: ValidationErrors = validate_yaml(all_config, schema)
+    errors: "ValidationErrors" = validate_yaml(all_config, schema)
     if not errors:
         # aok
         return
@@ -0,0 +1,100 @@
+"""Caches the tracked files, bucketed by tag, between runs.
+
+Listing, and bucketing, every file tracked by git is most of runem's start-up
+time on large projects. The tracked files only change when git's index does, so
+we keep the bucketed files, keyed on:
+- the index's size and modification time,
+- what HEAD points at,
+- the dir git was run in,
+- and the file-filters config.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import typing
+from collections import defaultdict
+
+from runem.log import warn
+from runem.types.filters import FilePathListLookup, TagFileFilters
+
+FILE_LISTS_CACHE_FILENAME = "file_lists.json"
+
+# Bump when the cached data, or how it is made, changes
+_CACHE_FORMAT = 1
+
+
+def _read_head(git_dir: pathlib.Path) -> str:
+    """Returns what HEAD points at, resolving a branch to its commit if we can."""
+    try:
+        head: str = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+    if head.startswith("ref:"):
+        ref_path: pathlib.Path = git_dir / head[len("ref:") :].strip()
+        try:
+            head = f"{head} {ref_path.read_text(encoding='utf-8').strip()}"
+        except OSError:
+            # packed, or an unborn branch, so the ref name is all we have
+            pass
+    return head
+
+
+def file_lists_cache_key(
+    git_dir: pathlib.Path, cwd: pathlib.Path, file_filters: TagFileFilters
+) -> typing.Optional[str]:
+    """Returns the key for the tracked files, or None if git has no index."""
+    try:
+        index_stat: os.stat_result = (git_dir / "index").stat()
+    except OSError:
+        return None
+    key_data: typing.Dict[str, typing.Any] = {
+        "format": _CACHE_FORMAT,
+        "index": [index_stat.st_size, index_stat.st_mtime_ns],
+        "head": _read_head(git_dir),
+        "cwd": str(cwd.absolute()),
+        "file_filters": file_filters,
+    }
+    return hashlib.sha256(
+        json.dumps(key_data, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def load_cached_file_lists(
+    state_dir: pathlib.Path, key: str
+) -> typing.Optional[FilePathListLookup]:
+    """Returns the cached files, by tag, if they were cached under `key`."""
+    cache_path: pathlib.Path = state_dir / FILE_LISTS_CACHE_FILENAME
+    try:
+        cached: typing.Any = json.loads(cache_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        warn(f"ignoring unreadable file cache at {str(cache_path)}")
+        return None
+    if not isinstance(cached, dict) or cached.get("key", None) != key:
+        return None
+    return defaultdict(list, cached["file_lists"])
+
+
+def save_cached_file_lists(
+    state_dir: pathlib.Path, key: str, file_lists: FilePathListLookup
+) -> None:
+    """Atomically writes the files, by tag, to the cache."""
+    try:
+        state_dir.mkdir(parents=True, exist_ok=True)
+        # write to a temp file and move it into place so that concurrent runem
+        # runs never see a half-written file.
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=state_dir,
+            prefix=f".{FILE_LISTS_CACHE_FILENAME}.",
+            delete=False,
+        ) as file_handle:
+            json.dump({"key": key, "file_lists": file_lists}, file_handle)
+        os.replace(file_handle.name, state_dir / FILE_LISTS_CACHE_FILENAME)
+    except OSError as err:
+        warn(f"failed to write the file cache to {str(state_dir)}: {str(err)}")
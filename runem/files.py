@@ -1,17 +1,82 @@
 import re
+import subprocess
 import typing
 from collections import defaultdict
 from pathlib import Path
-from subprocess import check_output as subprocess_check_output
 
 from runem.config_metadata import ConfigMetadata
-from runem.types.filters import FilePathListLookup
+from runem.file_cache import (
+    file_lists_cache_key,
+    load_cached_file_lists,
+    save_cached_file_lists,
+)
+from runem.file_walker import walk_file_provider
+from runem.git_index import list_tracked_files, list_unstaged_files
+from runem.job_wrapper import get_job_wrapper
+from runem.state_dir import find_git_dir, find_state_dir
+from runem.types.common import FilePathList, JobTag
+from runem.types.filters import (
+    FilePathListLookup,
+    FileProviderFunction,
+    TagFileFilters,
+)
+from runem.types.runem_config import FileProviderConfig
+
+# The changed files, relative to the work-tree's root, NUL-delimited and without
+# deleted files
+_GIT_DIFF_QUERY: typing.List[str] = [
+    "git",
+    "diff",
+    "--name-only",
+    "-z",
+    "--diff-filter=d",
+]
+
+# Files that have since been deleted from the work-tree, compared with the index,
+# which has staged, new, files, and with HEAD, which has `git rm`ed files
+_GIT_DELETED_QUERIES: typing.Tuple[typing.List[str], ...] = (
+    ["git", "diff", "--name-only", "-z", "--diff-filter=D"],
+    ["git", "diff", "--name-only", "-z", "--diff-filter=D", "HEAD"],
+)
+
+# How much of a git command's output to parse at a time
+_GIT_READ_SIZE = 64 * 1024
+
+# Filters that only match a file-extension, e.g. `\.py$` or `\.(ts|tsx)$`, with
+# an optional leading `.*` or `^.*`, as in `.*\.(json|yml)$`, which matches the same
+_SUFFIX_ONLY_REGEX = re.compile(
+    r"(?:\^?\.\*)?\\\.(?:(\w+)|\((?:\?:)?(\w+(?:\|\w+)*)\))\$"
+)
+
+# Filters that refer to their own groups, or set global flags, can't be combined
+# with other filters
+_UNCOMBINABLE_REGEX = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)")
+
+
+class CompiledFileFilters(typing.TypedDict):
+    """The file-filters, compiled so that a path is matched against all at once.
+
+    Filters are referred to by their index in `tags`.
+    """
+
+    tags: typing.List[JobTag]  # the tag for each filter
+    # file-extension filters, looked up by the path's extension e.g. '.py'
+    suffixes: typing.Dict[str, typing.List[int]]
+    # start-anchored filters, e.g. `^src/`, as a single regex with a capture
+    # group per filter
+    combined: typing.Optional[typing.Pattern[str]]
+    combined_groups: typing.List[typing.Tuple[int, int]]  # filter-index, group
+    # all other filters, pre-compiled and searched for one-by-one
+    searched: typing.List[typing.Tuple[int, typing.Pattern[str]]]
 
 
 def find_files(config_metadata: ConfigMetadata) -> FilePathListLookup:
     """Ronseal function, finds files.
 
-    For brevity we use git-ls-files, which, for now, limits us to working in git projects.
+    By default we use git-ls-files. Where we can we read git's index directly, see
+    `runem.git_index`, rather than running git. Projects without git can set
+    `config.file_provider` to walk the filesystem instead, see `runem.file_walker`,
+    or to a function of their own.
 
     Previous incarnations used various methods:
         - in bash we used find with hard-coded exclude filters
@@ -20,7 +85,7 @@ def find_files(config_metadata: ConfigMetadata) -> FilePathListLookup:
           `gitignore-parser` but it is too slow on larger projects and 'runem' becomes
           the largest overhead, which isn't acceptable
 
-    TODO: make this function support plugins.
+    The change-selection options, e.g. `--modified-files`, always ask git.
     """
     file_lists: FilePathListLookup = defaultdict(list)
 
@@ -31,35 +96,34 @@ def find_files(config_metadata: ConfigMetadata) -> FilePathListLookup:
         or config_metadata.args.check_head_files
         or (config_metadata.args.git_since_branch is not None)
     ):
+        # The git queries are all run at once, so cost about one git round-trip.
+        # We ask git to leave out deleted files, i.e. `--diff-filter=d`.
+        queries: typing.List[typing.List[str]] = []
         if config_metadata.args.check_modified_files:
             # get modified, un-staged files first
-            file_paths.extend(
-                subprocess_check_output(
-                    "git diff --name-only",
-                    shell=True,
-                )
-                .decode("utf-8")
-                .splitlines()
+            unstaged_files: typing.Optional[typing.List[str]] = list_unstaged_files(
+                Path.cwd(), include_deleted=False
             )
+            if unstaged_files is None:
+                queries.append(_GIT_DIFF_QUERY)
+            else:
+                file_paths.extend(unstaged_files)
             # now get modified, staged files first
-            file_paths.extend(
-                subprocess_check_output(
-                    "git diff --name-only --staged",
-                    shell=True,
-                )
-                .decode("utf-8")
-                .splitlines()
-            )
+            queries.append([*_GIT_DIFF_QUERY, "--staged"])
 
         if config_metadata.args.check_head_files:
             # Fetching modified and added files from the HEAD commit
-            file_paths.extend(
-                subprocess_check_output(
-                    "git diff-tree --no-commit-id --name-only -r HEAD",
-                    shell=True,
-                )
-                .decode("utf-8")
-                .splitlines()
+            queries.append(
+                [
+                    "git",
+                    "diff-tree",
+                    "--no-commit-id",
+                    "--name-only",
+                    "-z",
+                    "--diff-filter=d",
+                    "-r",
+                    "HEAD",
+                ]
             )
 
         if config_metadata.args.git_since_branch is not None:
@@ -67,32 +131,34 @@ def find_files(config_metadata: ConfigMetadata) -> FilePathListLookup:
             # Useful for quickly checking branches before pushing.
             # NOTE: without dependency checking this might report false-positives.
             target_branch: str = config_metadata.args.git_since_branch
-            file_paths.extend(
-                subprocess_check_output(
-                    f"git diff --name-only {target_branch}...HEAD",
-                    shell=True,
-                )
-                .decode("utf-8")
-                .splitlines()
-            )
-        # ensure files are unique, and still on disk i.e. filter-out deleted files
-        file_paths = list(
-            {file_path for file_path in file_paths if Path(file_path).exists()}
+            queries.append([*_GIT_DIFF_QUERY, f"{target_branch}...HEAD"])
+
+        git_queries: typing.List["subprocess.Popen[bytes]"] = [
+            _start_git_query(query) for query in queries
+        ]
+        # files changed, or staged, but then deleted from the work-tree.
+        # NOTE: the HEAD query fails, harmlessly, before the first commit
+        deleted_queries: typing.List["subprocess.Popen[bytes]"] = [
+            _start_git_query(query, stderr=subprocess.DEVNULL)
+            for query in _GIT_DELETED_QUERIES
+        ]
+        for git_query in git_queries:
+            file_paths.extend(_read_git_query(git_query))
+        deleted_files: typing.Set[str] = set()
+        for deleted_query in deleted_queries:
+            deleted_files.update(_read_git_query(deleted_query, check=False))
+
+        # Make files unique, and filter out deleted files
+        file_paths = sorted(set(file_paths) - deleted_files)
+        _bucket_file_by_tag(
+            file_paths,
+            config_metadata,
+            in_out_file_lists=file_lists,
         )
 
     else:
         # fall-back to all files
-        file_paths = (
-            subprocess_check_output(
-                "git ls-files",
-                shell=True,
-            )
-            .decode("utf-8")
-            .splitlines()
-        )
-
-    # Make files unique
-    file_paths = sorted(set(file_paths))
+        file_lists = _find_all_files(config_metadata)
 
     if config_metadata.args.always_files is not None:
         # a poor-man's version of adding path-regex's
@@ -101,27 +167,230 @@ def find_files(config_metadata: ConfigMetadata) -> FilePathListLookup:
             for filepath in config_metadata.args.always_files
             if Path(filepath).exists()
         ]
-        file_paths.extend(existent_files)
+        _bucket_file_by_tag(
+            existent_files,
+            config_metadata,
+            in_out_file_lists=file_lists,
+        )
+
+    # now ensure the file lists are sorted so we get deterministic behaviour in tests
+    for job_type in file_lists:
+        file_lists[job_type] = sorted(file_lists[job_type])
+    return file_lists
+
+
+def _start_git_query(
+    query: typing.List[str], stderr: typing.Optional[int] = None
+) -> "subprocess.Popen[bytes]":
+    """Starts a git command, without a shell, read its output with `_read_git_query`."""
+    return subprocess.Popen(query, stdout=subprocess.PIPE, stderr=stderr)
+
+
+def _read_git_query(
+    git_query: "subprocess.Popen[bytes]", check: bool = True
+) -> typing.List[str]:
+    """Returns the NUL-delimited paths a git command prints, parsed as they arrive.
+
+    Raises CalledProcessError if the command fails, unless `check` is False, when
+    no paths are returned instead.
+    """
+    assert git_query.stdout is not None
+    stdout: typing.IO[bytes] = git_query.stdout
+    paths: typing.List[str] = []
+    partial_path: bytes = b""
+    with stdout:
+        for chunk in iter(lambda: stdout.read(_GIT_READ_SIZE), b""):
+            *complete_paths, partial_path = (partial_path + chunk).split(b"\0")
+            paths.extend(
+                complete_path.decode("utf-8", "surrogateescape")
+                for complete_path in complete_paths
+            )
+    if partial_path:
+        paths.append(partial_path.decode("utf-8", "surrogateescape"))
+    return_code: int = git_query.wait()
+    if return_code != 0:
+        if check:
+            raise subprocess.CalledProcessError(return_code, git_query.args)
+        return []
+    return paths
 
+
+def _git_tracked_files() -> typing.List[str]:
+    """Returns the files tracked by git, reading git's index directly if we can."""
+    tracked_files: typing.Optional[typing.List[str]] = list_tracked_files(Path.cwd())
+    if tracked_files is not None:
+        return tracked_files
+    return _read_git_query(_start_git_query(["git", "ls-files", "-z"]))
+
+
+def _git_file_provider(**kwargs: typing.Any) -> FilePathList:
+    """The 'git', default, file-provider."""
+    return _git_tracked_files()
+
+
+# The built-in file-providers, by `config.file_provider.name`
+FILE_PROVIDERS: typing.Dict[str, FileProviderFunction] = {
+    "git": _git_file_provider,
+    "walk": walk_file_provider,
+}
+
+
+def get_file_provider(config_metadata: ConfigMetadata) -> FileProviderFunction:
+    """Returns the function that lists the files for `config.file_provider`."""
+    provider_config: typing.Optional[FileProviderConfig] = config_metadata.file_provider
+    if provider_config is None:
+        return _git_file_provider
+    if "name" in provider_config:
+        return FILE_PROVIDERS[provider_config["name"]]
+    return typing.cast(
+        FileProviderFunction,
+        get_job_wrapper(provider_config, config_metadata.cfg_filepath),
+    )
+
+
+def _find_all_files(config_metadata: ConfigMetadata) -> FilePathListLookup:
+    """Returns all files, by tag, from git or the configured file-provider.
+
+    The files tracked by git only change when git's index, or HEAD, does, so we
+    cache them, by tag, in the state-dir and skip git, and bucketing, when we can.
+    Other file-providers can't tell us when their files change, so aren't cached.
+    """
+    file_provider: FileProviderFunction = get_file_provider(config_metadata)
+    if file_provider is not _git_file_provider:
+        provided_files: FilePathListLookup = defaultdict(list)
+        _bucket_file_by_tag(
+            sorted(
+                set(
+                    file_provider(config_metadata=config_metadata, root_path=Path.cwd())
+                )
+            ),
+            config_metadata,
+            in_out_file_lists=provided_files,
+        )
+        return provided_files
+
+    cache_key: typing.Optional[str] = None
+    state_dir: typing.Optional[Path] = find_state_dir(config_metadata.cfg_filepath)
+    git_dir: typing.Optional[Path] = find_git_dir(config_metadata.cfg_filepath.parent)
+    if state_dir is not None and git_dir is not None:
+        cache_key = file_lists_cache_key(
+            git_dir, Path.cwd(), config_metadata.file_filters
+        )
+    if state_dir is not None and cache_key is not None:
+        cached_file_lists: typing.Optional[FilePathListLookup] = load_cached_file_lists(
+            state_dir, cache_key
+        )
+        if cached_file_lists is not None:
+            return cached_file_lists
+
+    file_paths: typing.List[str] = sorted(set(_git_tracked_files()))
+    file_lists: FilePathListLookup = defaultdict(list)
     _bucket_file_by_tag(
         file_paths,
         config_metadata,
         in_out_file_lists=file_lists,
     )
-
-    # now ensure the file lists are sorted so we get deterministic behaviour in tests
-    for job_type in file_lists:
-        file_lists[job_type] = sorted(file_lists[job_type])
+    if state_dir is not None and cache_key is not None:
+        save_cached_file_lists(state_dir, cache_key, file_lists)
     return file_lists
 
 
-def _bucket_file_by_tag(  # noqa: C901 # pylint: disable=too-many-branches
+def compile_file_filters(file_filters: TagFileFilters) -> CompiledFileFilters:
+    """Compiles the file-filters so that paths can be bucketed in a single pass.
+
+    Extension-only filters become a dict lookup. Filters anchored to the start
+    of the path are combined into one regex, each as an optional look-ahead so
+    that every filter gets to match. Any others are pre-compiled and searched
+    for one-by-one, as `re` is quicker at finding un-anchored regexes on their
+    own than as look-aheads.
+    """
+    compiled: CompiledFileFilters = {
+        "tags": [],
+        "suffixes": {},
+        "combined": None,
+        "combined_groups": [],
+        "searched": [],
+    }
+    combinable: typing.List[typing.Tuple[int, str]] = []
+    for filter_idx, (tag, file_filter) in enumerate(file_filters.items()):
+        compiled["tags"].append(tag)
+        regex: str = file_filter["regex"]
+        suffix_match: typing.Optional[re.Match[str]] = _SUFFIX_ONLY_REGEX.fullmatch(
+            regex
+        )
+        if suffix_match is not None:
+            extensions: str = suffix_match.group(1) or suffix_match.group(2)
+            for extension in extensions.split("|"):
+                compiled["suffixes"].setdefault(f".{extension}", []).append(filter_idx)
+        elif (
+            regex.startswith("^")
+            and "|" not in regex  # an alternative might not be anchored
+            and not _UNCOMBINABLE_REGEX.search(regex)
+        ):
+            combinable.append((filter_idx, regex))
+        else:
+            compiled["searched"].append((filter_idx, re.compile(regex)))
+
+    if combinable:
+        combined_regex: str = "".join(
+            f"(?:(?=(?P<_runem_filter_{filter_idx}>{regex}))|)"
+            for filter_idx, regex in combinable
+        )
+        try:
+            combined: typing.Pattern[str] = re.compile(combined_regex)
+        except re.error:
+            # e.g. clashing group names, match them one-by-one
+            compiled["searched"].extend(
+                (filter_idx, re.compile(regex)) for filter_idx, regex in combinable
+            )
+        else:
+            compiled["combined"] = combined
+            compiled["combined_groups"] = [
+                (filter_idx, combined.groupindex[f"_runem_filter_{filter_idx}"])
+                for filter_idx, _ in combinable
+            ]
+    compiled["searched"].sort()
+    return compiled
+
+
+def _bucket_file_by_tag(
     file_paths: typing.List[str],
     config_metadata: ConfigMetadata,
     in_out_file_lists: FilePathListLookup,
 ) -> None:
-    """Groups files by the file.filters iin the config."""
+    """Groups files by the file.filters iin the config.
+
+    Equivalent to calling `re.search()` for every filter on every file, but each
+    path is matched against all the filters in a single pass.
+    """
+    compiled: CompiledFileFilters = compile_file_filters(config_metadata.file_filters)
+    tags: typing.List[JobTag] = compiled["tags"]
+    suffixes: typing.Dict[str, typing.List[int]] = compiled["suffixes"]
+    combined: typing.Optional[typing.Pattern[str]] = compiled["combined"]
+    combined_groups: typing.List[typing.Tuple[int, int]] = compiled["combined_groups"]
+    searched: typing.List[typing.Tuple[int, typing.Pattern[str]]] = compiled["searched"]
     for file_path in file_paths:
-        for tag, file_filter in config_metadata.file_filters.items():
-            if re.search(file_filter["regex"], file_path):
-                in_out_file_lists[tag].append(file_path)
+        matched: typing.List[int] = []
+        if suffixes:
+            extension_start: int = file_path.rfind(".")
+            if extension_start != -1:
+                matched.extend(suffixes.get(file_path[extension_start:], ()))
+        if combined is not None:
+            combined_match: typing.Optional[re.Match[str]] = combined.match(file_path)
+            if combined_match is not None:
+                groups: typing.Tuple[typing.Optional[str], ...] = (
+                    combined_match.groups()
+                )
+                matched.extend(
+                    filter_idx
+                    for filter_idx, group in combined_groups
+                    if groups[group - 1] is not None
+                )
+        matched.extend(
+            filter_idx for filter_idx, regex in searched if regex.search(file_path)
+        )
+        if len(matched) > 1:
+            # keep the config order of the filters
+            matched.sort()
+        for filter_idx in matched:
+            in_out_file_lists[tags[filter_idx]].append(file_path)
@@ -0,0 +1,446 @@
+"""Reads git's index, `.git/index`, directly instead of running `git`.
+
+Running `git ls-files`, or `git diff`, means starting a shell and then git
+itself, before git does any work. The index already lists every tracked file,
+along with the `stat()` info of each file when it was last staged, which is all
+we need to list the tracked files, and to find the ones with unstaged changes.
+
+The index is memory-mapped and the paths are sliced straight out of the map.
+Anything we don't understand, e.g. split or sparse indices, gets None back, and
+callers fall back to the `git` CLI. As do big indices, where git's own speed
+outweighs the cost of starting it, and, for unstaged changes, repos that have
+git convert files' content, e.g. line-endings or LFS, which we don't.
+
+See https://git-scm.com/docs/index-format
+"""
+
+import hashlib
+import mmap
+import os
+import pathlib
+import re
+import stat
+import struct
+import typing
+
+from runem.state_dir import find_git_dir, find_work_tree
+
+INDEX_SIGNATURE = b"DIRC"
+SUPPORTED_INDEX_VERSIONS = (2, 3, 4)
+
+# Extensions that change what the entries mean, if present we use the git CLI
+# - link: split-index, some entries live in a different file
+# - sdir: sparse-index, some entries are whole directories
+UNSUPPORTED_EXTENSIONS = (b"link", b"sdir")
+
+# Past this many files git's C is quicker than us, even with git's start-up
+# cost, so we leave big indices to the `git` CLI.
+MAX_NATIVE_INDEX_ENTRIES = 5_000
+
+# Env-vars that change which repo, index, or work-tree git uses
+_GIT_ENV_VARS = ("GIT_DIR", "GIT_INDEX_FILE", "GIT_WORK_TREE")
+
+# Env-vars that change git's config, which may turn on content conversion
+_GIT_CONFIG_ENV_VARS = (
+    "GIT_CONFIG_COUNT",
+    "GIT_CONFIG_GLOBAL",
+    "GIT_CONFIG_PARAMETERS",
+    "GIT_CONFIG_SYSTEM",
+)
+
+# Config that converts files' content, or may, when comparing them with the
+# index. Includes, and other attribute files, could set anything.
+_CONVERTING_CONFIG_REGEX = re.compile(
+    r"^\s*(?:(?:autocrlf|eol|attributesfile)\s*=|\[\s*include)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Attributes that have git convert files' content, e.g. LFS's `filter=lfs`,
+# or line-ending conversion with `text`, `eol` and the old `crlf`
+_CONVERTING_ATTRIBUTES_REGEX = re.compile(
+    r"(?:^|\s)[-!]?(?:filter|eol|text|crlf|ident|working-tree-encoding)(?:[=\s]|$)",
+    re.MULTILINE,
+)
+
+GITATTRIBUTES_FILENAME = ".gitattributes"
+
+# signature, version, number of entries
+_HEADER = struct.Struct(">4sII")
+_FLAGS = struct.Struct(">H")
+# extension signature, size
+_EXTENSION_HEADER = struct.Struct(">4sI")
+
+_FLAG_ASSUME_VALID = 0x8000
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE_MASK = 0x3000
+_FLAG_NAME_LENGTH_MASK = 0x0FFF
+_EXTENDED_FLAG_SKIP_WORKTREE = 0x4000
+_EXTENDED_FLAG_INTENT_TO_ADD = 0x2000
+
+# submodules are stored as 'gitlink' entries
+_GITLINK_MODE = 0o160000
+
+_OBJECT_FORMAT_SHA256_REGEX = re.compile(
+    r"^\s*objectformat\s*=\s*sha256\s*$", re.IGNORECASE | re.MULTILINE
+)
+
+_UINT32_MASK = 0xFFFFFFFF
+_NS_PER_S = 1_000_000_000
+
+
+class GitIndexEntry(typing.TypedDict):
+    """A file in git's index."""
+
+    path: str  # relative to the root of the work-tree
+    # ctime-s, ctime-ns, mtime-s, mtime-ns, dev, ino, mode, uid, gid, size, as
+    # the file was when last staged, truncated to 32 bits
+    stat: typing.Tuple[int, ...]
+    object_id: bytes  # the hash of the staged content
+    flags: int  # assume-valid and merge-stage flags
+    extended_flags: int  # skip-worktree and intent-to-add flags, v3+ only
+
+
+class GitIndex(typing.TypedDict):
+    """The parts of git's index that we use."""
+
+    entries: typing.List[GitIndexEntry]
+    mtime_ns: int  # when the index was written, for spotting racily-clean files
+    hash_name: str  # the `hashlib` name of the repo's object hash
+
+
+def _common_dir(git_dir: pathlib.Path) -> pathlib.Path:
+    """Returns the dir with the repo's config, that work-trees share."""
+    try:
+        common_dir: str = (git_dir / "commondir").read_text(encoding="utf-8")
+    except OSError:
+        return git_dir
+    return git_dir / common_dir.strip()
+
+
+def _object_hash_name(git_dir: pathlib.Path) -> str:
+    """Returns the name of the hash the repo uses for its object ids."""
+    try:
+        config: str = (_common_dir(git_dir) / "config").read_text(encoding="utf-8")
+    except (OSError, ValueError):
+        return "sha1"
+    return "sha256" if _OBJECT_FORMAT_SHA256_REGEX.search(config) else "sha1"
+
+
+def _read_offset_varint(data: mmap.mmap, offset: int) -> typing.Tuple[int, int]:
+    """Returns the value of git's 'offset' varint at `offset`, and its end."""
+    byte: int = data[offset]
+    offset += 1
+    value: int = byte & 0x7F
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, offset
+
+
+def parse_git_index(
+    data: mmap.mmap, hash_name: str, max_entries: typing.Optional[int] = None
+) -> typing.Optional[typing.List[GitIndexEntry]]:
+    """Returns the entries of the index in `data`, or None if we can't read it.
+
+    Also returns None if there are more than `max_entries` entries.
+    """
+    hash_size: int = hashlib.new(hash_name).digest_size
+    # the stat info, object-id and flags of each entry, the path follows
+    entry_header: struct.Struct = struct.Struct(f">10I{hash_size}sH")
+    try:
+        signature, version, num_entries = _HEADER.unpack_from(data, 0)
+        if signature != INDEX_SIGNATURE or version not in SUPPORTED_INDEX_VERSIONS:
+            return None
+        if max_entries is not None and num_entries > max_entries:
+            return None
+        entries: typing.List[GitIndexEntry] = []
+        offset: int = _HEADER.size
+        previous_path: bytes = b""
+        for _ in range(num_entries):
+            fields: typing.Tuple[typing.Any, ...] = entry_header.unpack_from(
+                data, offset
+            )
+            flags: int = fields[11]
+            path_start: int = offset + entry_header.size
+            extended_flags: int = 0
+            if flags & _FLAG_EXTENDED:
+                if version < 3:
+                    return None
+                (extended_flags,) = _FLAGS.unpack_from(data, path_start)
+                path_start += _FLAGS.size
+            path: bytes
+            path_end: int
+            if version >= 4:
+                # paths are stored as the number of bytes to remove from the end
+                # of the previous path, and the bytes to add in their place
+                strip_len, path_start = _read_offset_varint(data, path_start)
+                if strip_len > len(previous_path):
+                    return None
+                path_end = data.find(b"\0", path_start)
+                if path_end == -1:
+                    return None
+                path = (
+                    previous_path[: len(previous_path) - strip_len]
+                    + data[path_start:path_end]
+                )
+                previous_path = path
+                offset = path_end + 1
+            else:
+                path_end = path_start + (flags & _FLAG_NAME_LENGTH_MASK)
+                if flags & _FLAG_NAME_LENGTH_MASK == _FLAG_NAME_LENGTH_MASK:
+                    # too long to fit in the flags
+                    path_end = data.find(b"\0", path_start)
+                    if path_end == -1:
+                        return None
+                path = data[path_start:path_end]
+                # entries are NUL padded to a multiple of 8 bytes
+                offset += (path_end - offset + 8) & ~7
+            entries.append(
+                {
+                    "path": path.decode("utf-8", "surrogateescape"),
+                    "stat": fields[:10],
+                    "object_id": fields[10],
+                    "flags": flags,
+                    "extended_flags": extended_flags,
+                }
+            )
+        # the extensions follow the entries, the index's checksum follows those
+        while offset + _EXTENSION_HEADER.size <= len(data) - hash_size:
+            extension, extension_size = _EXTENSION_HEADER.unpack_from(data, offset)
+            if extension in UNSUPPORTED_EXTENSIONS:
+                return None
+            offset += _EXTENSION_HEADER.size + extension_size
+    except (struct.error, IndexError, UnicodeDecodeError):
+        # truncated, or corrupt
+        return None
+    return entries
+
+
+def read_git_index(
+    git_dir: pathlib.Path, max_entries: typing.Optional[int] = MAX_NATIVE_INDEX_ENTRIES
+) -> typing.Optional[GitIndex]:
+    """Returns the entries in the repo's index, or None if we can't read them.
+
+    Big indices, with more than `max_entries` entries, also get None.
+    """
+    hash_name: str = _object_hash_name(git_dir)
+    try:
+        with open(git_dir / "index", "rb") as index_file:
+            index_stat: os.stat_result = os.fstat(index_file.fileno())
+            if index_stat.st_size == 0:
+                return None
+            with mmap.mmap(
+                index_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as index_data:
+                entries: typing.Optional[typing.List[GitIndexEntry]] = parse_git_index(
+                    index_data, hash_name, max_entries
+                )
+    except (OSError, ValueError):
+        return None
+    if entries is None:
+        return None
+    return {
+        "entries": entries,
+        "mtime_ns": index_stat.st_mtime_ns,
+        "hash_name": hash_name,
+    }
+
+
+def _find_repo(
+    cwd: pathlib.Path,
+) -> typing.Optional[typing.Tuple[pathlib.Path, pathlib.Path, GitIndex]]:
+    """Returns the work-tree, git-dir and index of the repo `cwd` is in.
+
+    Returns None if we can't read the index.
+    """
+    if any(env_var in os.environ for env_var in _GIT_ENV_VARS):
+        return None
+    work_tree: typing.Optional[pathlib.Path] = find_work_tree(cwd)
+    git_dir: typing.Optional[pathlib.Path] = find_git_dir(cwd)
+    if work_tree is None or git_dir is None:
+        return None
+    git_index: typing.Optional[GitIndex] = read_git_index(git_dir)
+    if git_index is None:
+        return None
+    return work_tree, git_dir, git_index
+
+
+def _file_matches(file_path: pathlib.Path, regex: typing.Pattern[str]) -> bool:
+    """Returns True if the file exists and `regex` is found in it."""
+    try:
+        return regex.search(file_path.read_text(encoding="utf-8")) is not None
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError):
+        # can't tell, so assume the worst
+        return True
+
+
+def converts_content(
+    work_tree: pathlib.Path, git_dir: pathlib.Path, git_index: GitIndex
+) -> bool:
+    """Returns True if git may convert files' content when comparing with the index.
+
+    e.g. with `core.autocrlf`, or `filter=`, `eol` or `text` attributes, as used
+    for line-endings and by LFS. We don't apply git's conversions, so we leave
+    those repos to git.
+    """
+    if any(env_var in os.environ for env_var in _GIT_CONFIG_ENV_VARS):
+        return True
+    xdg_config_dir: pathlib.Path = pathlib.Path(
+        os.environ.get("XDG_CONFIG_HOME", "") or pathlib.Path.home() / ".config"
+    )
+    config_paths: typing.Tuple[pathlib.Path, ...] = (
+        _common_dir(git_dir) / "config",
+        git_dir / "config.worktree",
+        pathlib.Path.home() / ".gitconfig",
+        xdg_config_dir / "git" / "config",
+        pathlib.Path("/etc/gitconfig"),
+    )
+    if any(_file_matches(path, _CONVERTING_CONFIG_REGEX) for path in config_paths):
+        return True
+    attributes_paths: typing.List[pathlib.Path] = [
+        _common_dir(git_dir) / "info" / "attributes",
+        xdg_config_dir / "git" / "attributes",
+    ]
+    attributes_paths.extend(
+        work_tree / entry["path"]
+        for entry in git_index["entries"]
+        if entry["path"].rpartition("/")[2] == GITATTRIBUTES_FILENAME
+    )
+    # untracked attribute files apply too, but we only look for the top one
+    if (work_tree / GITATTRIBUTES_FILENAME) not in attributes_paths:
+        attributes_paths.append(work_tree / GITATTRIBUTES_FILENAME)
+    return any(
+        _file_matches(path, _CONVERTING_ATTRIBUTES_REGEX) for path in attributes_paths
+    )
+
+
+def list_tracked_files(cwd: pathlib.Path) -> typing.Optional[typing.List[str]]:
+    """Returns the tracked files under `cwd`, relative to it, like `git ls-files`.
+
+    Returns None if the index can't be read, use `git ls-files` instead.
+    """
+    repo: typing.Optional[typing.Tuple[pathlib.Path, pathlib.Path, GitIndex]] = (
+        _find_repo(cwd)
+    )
+    if repo is None:
+        return None
+    work_tree, _, git_index = repo
+    try:
+        cwd_prefix: str = cwd.absolute().relative_to(work_tree).as_posix()
+    except ValueError:
+        return None
+    if cwd_prefix == ".":
+        cwd_prefix = ""
+    else:
+        cwd_prefix += "/"
+    tracked_files: typing.Dict[str, None] = {}  # unique, in index order
+    for entry in git_index["entries"]:
+        if entry["path"].startswith(cwd_prefix):
+            tracked_files[entry["path"][len(cwd_prefix) :]] = None
+    return list(tracked_files)
+
+
+def _object_id(file_path: str, file_mode: int, hash_name: str) -> bytes:
+    """Returns the object id git would give the file's current content."""
+    content: bytes
+    if stat.S_ISLNK(file_mode):
+        content = os.fsencode(os.readlink(file_path))
+    else:
+        with open(file_path, "rb") as file_handle:
+            content = file_handle.read()
+    object_hash = hashlib.new(hash_name, b"blob %d\0" % len(content))
+    object_hash.update(content)
+    return object_hash.digest()
+
+
+def _is_modified(
+    entry: GitIndexEntry, file_path: str, git_index: GitIndex, include_deleted: bool
+) -> bool:
+    """Returns True if the work-tree file differs from the staged one.
+
+    Deleted files only count as modified if `include_deleted`.
+
+    Like git, we compare the file's `stat()` info with the index's first, and
+    only look at the content when that differs, or can't be trusted.
+
+    NOTE: unlike git we don't apply git's filters, e.g. line-ending conversion,
+          so this is only used where git has none, see `converts_content()`.
+    """
+    try:
+        file_stat: os.stat_result = os.lstat(file_path)
+    except OSError:
+        # deleted
+        return include_deleted
+    entry_stat: typing.Tuple[int, ...] = entry["stat"]
+    if stat.S_IFMT(file_stat.st_mode) != stat.S_IFMT(entry_stat[6]):
+        return True
+    if entry_stat[9] != file_stat.st_size & _UINT32_MASK:
+        return True
+    ctime_s, ctime_ns = divmod(file_stat.st_ctime_ns, _NS_PER_S)
+    mtime_s, mtime_ns = divmod(file_stat.st_mtime_ns, _NS_PER_S)
+    # like git's defaults we don't check the dev, or the executable bit.
+    # Files written in the same instant as the index, 'racily clean' files, may
+    # have changed since without their stat info changing.
+    if (
+        entry_stat[3] == mtime_ns
+        and entry_stat[2] == mtime_s & _UINT32_MASK
+        and entry_stat[1] == ctime_ns
+        and entry_stat[0] == ctime_s & _UINT32_MASK
+        and entry_stat[5] == file_stat.st_ino & _UINT32_MASK
+        and entry_stat[7] == file_stat.st_uid & _UINT32_MASK
+        and entry_stat[8] == file_stat.st_gid & _UINT32_MASK
+        and file_stat.st_mtime_ns < git_index["mtime_ns"]
+    ):
+        return False
+    try:
+        return (
+            _object_id(file_path, file_stat.st_mode, git_index["hash_name"])
+            != entry["object_id"]
+        )
+    except OSError:
+        return True
+
+
+def list_unstaged_files(
+    cwd: pathlib.Path, include_deleted: bool = True
+) -> typing.Optional[typing.List[str]]:
+    """Returns files with unstaged changes, like `git diff --name-only`.
+
+    Without `include_deleted` files deleted from the work-tree are left out, like
+    `git diff --name-only --diff-filter=d`.
+
+    Paths are relative to the root of the work-tree, as git's are. Returns None
+    if the index can't be read, or git converts files' content, use `git diff
+    --name-only` instead.
+    """
+    repo: typing.Optional[typing.Tuple[pathlib.Path, pathlib.Path, GitIndex]] = (
+        _find_repo(cwd)
+    )
+    if repo is None:
+        return None
+    work_tree, git_dir, git_index = repo
+    if converts_content(work_tree, git_dir, git_index):
+        return None
+    # plain strings are much quicker than pathlib for 100,000s of files
+    work_tree_prefix: str = f"{work_tree}{os.sep}"
+    unstaged_files: typing.Dict[str, None] = {}  # unique, in index order
+    for entry in git_index["entries"]:
+        if (
+            entry["flags"] & _FLAG_ASSUME_VALID
+            or entry["extended_flags"] & _EXTENDED_FLAG_SKIP_WORKTREE
+            or stat.S_IFMT(entry["stat"][6]) == _GITLINK_MODE
+        ):
+            # git doesn't look at these in the work-tree
+            continue
+        if (
+            entry["flags"] & _FLAG_STAGE_MASK  # unmerged
+            or entry["extended_flags"] & _EXTENDED_FLAG_INTENT_TO_ADD
+            or _is_modified(
+                entry, work_tree_prefix + entry["path"], git_index, include_deleted
+            )
+        ):
+            unstaged_files[entry["path"]] = None
+    return list(unstaged_files)
@@ -78,7 +78,6 @@ class HookManager:
         for hook_config in hooks:
             job_config: JobConfig = {
                 "label": str(hook_name),
-                "ctx": None,
                 "when": {"phase": str(hook_name), "tags": {str(hook_name)}},
             }
             if "addr" in hook_config:
@@ -89,8 +88,6 @@ class HookManager:
             file_lists[str(hook_name)] = [__file__]
             job_execute(
                 job_config,
-                running_jobs={},
-                completed_jobs={},
                 config_metadata=config_metadata,
                 file_lists=file_lists,
                 **kwargs,
@@ -0,0 +1,179 @@
+"""Reads how busy the host is, so that we don't oversubscribe it.
+
+On shared hosts, e.g. ci/cd runners, other processes compete with our jobs. The
+`AdmissionController` holds back new jobs whilst the CPUs, or memory, are
+saturated by processes other than our own, using pressure-stall information
+(PSI) where the kernel has it and, failing that, the load-average.
+"""
+
+import os
+import pathlib
+import typing
+from datetime import timedelta
+
+PROC_DIR = pathlib.Path("/proc")
+PROC_LOADAVG = PROC_DIR / "loadavg"
+PROC_PRESSURE_DIR = PROC_DIR / "pressure"
+
+# The process states the kernel counts in the load-average
+_LOADED_STATES = ("R", "D")
+
+# Hold back jobs when the load not caused by our own jobs reaches this, per-cpu
+LOAD_PER_CPU_LIMIT = 1.0
+
+# Hold back jobs when, over the last 10s, some tasks were stalled on cpu, or
+# memory, for at least this percentage of the time.
+CPU_PRESSURE_LIMIT = 60.0
+MEMORY_PRESSURE_LIMIT = 20.0
+
+# How often to re-check the host whilst holding jobs back
+ADMISSION_POLL_INTERVAL_S = 0.5
+
+
+def read_load_average(
+    loadavg_path: pathlib.Path = PROC_LOADAVG,
+) -> typing.Optional[float]:
+    """Returns the 1-minute load-average, or None if it isn't available."""
+    try:
+        return float(loadavg_path.read_text(encoding="utf-8").split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_pressure(
+    resource: str, pressure_dir: pathlib.Path = PROC_PRESSURE_DIR
+) -> typing.Optional[float]:
+    """Returns the PSI 'some avg10' percentage for 'cpu', 'memory' or 'io'.
+
+    Returns None if the kernel doesn't support PSI, or it is disabled.
+    """
+    try:
+        pressure_text: str = (pressure_dir / resource).read_text(encoding="utf-8")
+    except OSError:
+        return None
+    for line in pressure_text.splitlines():
+        # e.g. "some avg10=0.40 avg60=1.85 avg300=2.77 total=50579324"
+        fields: typing.List[str] = line.split()
+        if not fields or fields[0] != "some":
+            continue
+        for field in fields[1:]:
+            key, _, value = field.partition("=")
+            if key == "avg10":
+                try:
+                    return float(value)
+                except ValueError:
+                    return None
+    return None
+
+
+def count_loaded_descendants(
+    root_pid: int, proc_dir: pathlib.Path = PROC_DIR
+) -> typing.Optional[int]:
+    """Returns how many of `root_pid`'s descendants are running, or waiting on i/o.
+
+    That is, how much of the host's load is ours, including any processes our
+    jobs start themselves, e.g. `pytest -n` workers or `make -j`. Returns None if
+    /proc isn't available.
+    """
+    children: typing.Dict[int, typing.List[int]] = {}
+    states: typing.Dict[int, str] = {}
+    try:
+        proc_entries: typing.List[str] = os.listdir(proc_dir)
+    except OSError:
+        return None
+    for entry in proc_entries:
+        if not entry.isdigit():
+            continue
+        try:
+            stat_text: str = (proc_dir / entry / "stat").read_text(encoding="utf-8")
+        except OSError:
+            # exited as we were looking
+            continue
+        # e.g. "123 (a (command)) R 1 ...", the command may hold spaces & parens
+        fields: typing.List[str] = stat_text.rpartition(")")[2].split()
+        if len(fields) < 2 or not fields[1].isdigit():
+            continue
+        pid: int = int(entry)
+        states[pid] = fields[0]
+        children.setdefault(int(fields[1]), []).append(pid)
+    loaded: int = 0
+    to_visit: typing.List[int] = list(children.get(root_pid, []))
+    while to_visit:
+        pid = to_visit.pop()
+        if states[pid] in _LOADED_STATES:
+            loaded += 1
+        to_visit.extend(children.get(pid, []))
+    return loaded
+
+
+class AdmissionController:
+    """Decides whether the host has the capacity to start another job.
+
+    To guarantee progress a job is always allowed to start when none of ours are
+    running.
+
+    Load we cause ourselves is never counted against the host: our own processes
+    are subtracted from the load-average and cpu pressure is ignored whilst they
+    alone can fill the cpus. The load-average is only used without PSI, as it
+    lags by about a minute and, in containers, is the whole host's.
+    """
+
+    def __init__(
+        self,
+        num_cpus: int,
+        poll_interval_s: float = ADMISSION_POLL_INTERVAL_S,
+        loadavg_path: pathlib.Path = PROC_LOADAVG,
+        pressure_dir: pathlib.Path = PROC_PRESSURE_DIR,
+        proc_dir: pathlib.Path = PROC_DIR,
+        root_pid: typing.Optional[int] = None,
+    ) -> None:
+        self.num_cpus: int = max(num_cpus, 1)
+        self.poll_interval_s: float = poll_interval_s
+        self.throttled: timedelta = timedelta()  # time spent holding jobs back
+        self._loadavg_path: pathlib.Path = loadavg_path
+        self._pressure_dir: pathlib.Path = pressure_dir
+        self._proc_dir: pathlib.Path = proc_dir
+        self._root_pid: int = os.getpid() if root_pid is None else root_pid
+
+    def _own_load(self, running_slots: int) -> int:
+        """Returns how many cpus our jobs, and everything they started, are using."""
+        loaded: typing.Optional[int] = count_loaded_descendants(
+            self._root_pid, self._proc_dir
+        )
+        if loaded is None:
+            return running_slots
+        return max(loaded, running_slots)
+
+    def saturation(self, running_slots: int) -> typing.Optional[str]:
+        """Returns why the host is saturated, or None if it has capacity.
+
+        `running_slots` is the number of cpus used by our running jobs, at least
+        that much load is ours and isn't counted against the host.
+        """
+        own_load: int = self._own_load(running_slots)
+        cpu_pressure: typing.Optional[float] = read_pressure("cpu", self._pressure_dir)
+        if cpu_pressure is None:
+            load: typing.Optional[float] = read_load_average(self._loadavg_path)
+            if load is not None:
+                other_load: float = load - own_load
+                if other_load / self.num_cpus >= LOAD_PER_CPU_LIMIT:
+                    return f"load-average {load:.2f} on {self.num_cpus} cpus"
+        elif cpu_pressure >= CPU_PRESSURE_LIMIT and own_load < self.num_cpus:
+            # we can't fill the cpus alone, so others are contending for them
+            return f"cpu pressure {cpu_pressure:.1f}%"
+        memory_pressure: typing.Optional[float] = read_pressure(
+            "memory", self._pressure_dir
+        )
+        if memory_pressure is not None and memory_pressure >= MEMORY_PRESSURE_LIMIT:
+            return f"memory pressure {memory_pressure:.1f}%"
+        return None
+
+    def hold_back_reason(self, running_slots: int) -> typing.Optional[str]:
+        """Returns why the next job must wait, or None if it may start now."""
+        if running_slots == 0:
+            return None
+        return self.saturation(running_slots)
+
+    def record_throttled(self, duration: timedelta) -> None:
+        """Records time spent with jobs held back."""
+        self.throttled += duration
@@ -1,8 +1,8 @@
 import typing
 
-from runem.types.common import FilePathList, JobTags
+from runem.types.common import FilePathList, JobName, JobNames, JobTags
 from runem.types.filters import FilePathListLookup
-from runem.types.runem_config import JobConfig, JobWhen
+from runem.types.runem_config import JobConfig, JobShardConfig, JobWhen
 
 
 class NoJobName(ValueError):
@@ -52,6 +52,81 @@ class Job:
         job_tags: JobTags = when["tags"]
         return set(job_tags)
 
+    @staticmethod
+    def get_job_dependencies(job: JobConfig) -> typing.Optional[JobNames]:
+        """Returns the labels of the jobs this job must run after.
+
+        None means the job has no explicit dependencies and instead runs after
+        all the jobs in earlier phases.
+        """
+        if "when" not in job or "after" not in job["when"]:
+            return None
+        return set(job["when"]["after"])
+
+    @staticmethod
+    def is_dependency_match(job_name: JobName, dependency: JobName) -> bool:
+        """Whether the named job satisfies the given `after` dependency.
+
+        A dependency on a job that has a list of `cwd`s is a dependency on all
+        the per-cwd jobs generated from it, e.g. 'label(path/a)', 'label(path/b)'.
+        """
+        return job_name == dependency or (
+            job_name.startswith(f"{dependency}(") and job_name.endswith(")")
+        )
+
+    @staticmethod
+    def get_cpu_slots(job: JobConfig) -> typing.Optional[int]:
+        """Returns how many cpus the job says it uses, None if it doesn't say.
+
+        Jobs that don't say are counted as using one cpu.
+        """
+        ctx = job.get("ctx", None)
+        if not ctx or "cpu_slots" not in ctx:
+            return None
+        return ctx["cpu_slots"]
+
+    @staticmethod
+    def get_shard_config(job: JobConfig) -> typing.Optional[JobShardConfig]:
+        """Returns how the job's files should be sharded, None if they shouldn't.
+
+        Jobs can only be sharded if they are given their files, that is, simple
+        commands must use `{file_list}`.
+        """
+        ctx = job.get("ctx", None)
+        if not ctx or "shard" not in ctx:
+            return None
+        if "command" in job and "{file_list}" not in job["command"]:
+            return None
+        return ctx["shard"]
+
+    @staticmethod
+    def get_timeout_s(
+        job: JobConfig, default_timeout_s: typing.Optional[float]
+    ) -> typing.Optional[float]:
+        """Returns how long the job may run for, None if it may run for ever.
+
+        The job's own `ctx.timeout_s` takes precedence over the `--job-timeout`,
+        the `default_timeout_s`.
+        """
+        ctx = job.get("ctx", None)
+        if not ctx or "timeout_s" not in ctx:
+            return default_timeout_s
+        return ctx["timeout_s"]
+
+    @staticmethod
+    def get_incremental_mode(job: JobConfig) -> typing.Optional[str]:
+        """Returns how the job only runs on changed files, None if it doesn't.
+
+        Only simple commands that use `{file_list}` can be incremental, as runem
+        has to choose the files they are given.
+        """
+        ctx = job.get("ctx", None)
+        if not ctx or "incremental" not in ctx:
+            return None
+        if "command" not in job or "{file_list}" not in job["command"]:
+            return None
+        return ctx["incremental"]
+
     @staticmethod
     def get_job_files(
         file_lists: FilePathListLookup, job_tags: typing.Optional[JobTags]
@@ -0,0 +1,257 @@
+"""Caches the results of jobs, so that unchanged jobs are skipped on later runs.
+
+Most runs re-run lint and type-check jobs over exactly the files they passed on
+last time. Jobs opt in with `ctx.cache: true`, and a job's result is keyed on
+everything that can change it, that we know of:
+- the job's config, including its command,
+- the source file of the job's function,
+- the values of the options,
+- the contents of every file in the job's `file_list`,
+- the contents of the files matching the job's `ctx.cache_inputs` globs, e.g.
+  the tool's own config,
+- the values of the env-vars named in the job's `ctx.cache_env`,
+- the executable a `command` runs, and the python env runem runs in, so that
+  upgrading either misses the cache,
+- and runem's version.
+
+Only jobs that succeed, and that don't change their own files, e.g. formatters
+that re-formatted something, are cached. Failing jobs always run again.
+
+The results are kept in a cache-store, see `runem.cache_store`, locally in the
+JOB_CACHE_DIRNAME dir of the state-dir and, if configured, on a shared server.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import shlex
+import shutil
+import sys
+import typing
+
+from runem.cache_store import CacheStore
+from runem.log import warn
+from runem.runem_version import get_runem_version
+from runem.types.common import FilePathList
+from runem.types.options import OptionName, OptionValue
+from runem.types.runem_config import JobConfig, JobContextConfig
+from runem.types.types_jobs import JobFunction, JobReturn
+
+JOB_CACHE_DIRNAME = "job_cache"
+
+# Bump when the cached data, or how it is made, changes
+_CACHE_FORMAT = 1
+
+# How much of a file to hash at a time
+_HASH_READ_SIZE = 1024 * 1024
+
+# The stat info that changes when a job re-writes a file
+FileStats = typing.List[typing.Optional[typing.Tuple[int, int]]]
+
+
+class CachedJobResult(typing.TypedDict):
+    """What a job did, replayed instead of running the job again."""
+
+    duration_s: float  # how long the job took when it ran
+    output: typing.List[typing.Tuple[str, str]]  # each command's label and stdout
+    reports: JobReturn  # the reports the job returned
+
+
+def _json_default(obj: typing.Any) -> typing.Any:
+    """Makes the job-config's sets, and anything else odd, json-able."""
+    if isinstance(obj, (set, frozenset)):
+        return sorted(str(item) for item in obj)
+    return str(obj)
+
+
+def _function_source_digest(function: JobFunction) -> typing.Optional[str]:
+    """Returns the hash of the file the job's function is in, or None if unknown.
+
+    We hash the whole file, not just the function, as the function may call
+    anything else in it.
+    """
+    try:
+        source_file: typing.Optional[str] = inspect.getsourcefile(function)
+    except TypeError:
+        # built-ins and the like, which have no source
+        return None
+    if source_file is None:
+        return None
+    try:
+        return hashlib.sha256(pathlib.Path(source_file).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _hash_file(file_hash: "hashlib._Hash", file_path: pathlib.Path) -> None:
+    with open(file_path, "rb") as file_handle:
+        for chunk in iter(lambda: file_handle.read(_HASH_READ_SIZE), b""):
+            file_hash.update(chunk)
+
+
+def file_digest(file_path: pathlib.Path) -> typing.Optional[str]:
+    """Returns the hash of the file's contents, or None if it can't be read."""
+    file_hash = hashlib.sha256()
+    try:
+        _hash_file(file_hash, file_path)
+    except OSError:
+        return None
+    return file_hash.hexdigest()
+
+
+def job_config_digest(
+    job_config: JobConfig, options: typing.Mapping[OptionName, OptionValue]
+) -> str:
+    """Returns the hash of the job's config and the option values it is run with."""
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "format": _CACHE_FORMAT,
+                "runem": str(get_runem_version()),
+                "job": job_config,
+                "options": dict(options),
+            },
+            sort_keys=True,
+            default=_json_default,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def _command_executable(job_config: JobConfig) -> typing.Optional[pathlib.Path]:
+    """Returns the executable a `command` job runs, if we can find it."""
+    if "command" not in job_config:
+        return None
+    try:
+        words: typing.List[str] = shlex.split(job_config["command"])
+    except ValueError:
+        return None
+    executable: typing.Optional[str] = shutil.which(words[0]) if words else None
+    if executable is None:
+        return None
+    return pathlib.Path(executable).resolve()
+
+
+def job_inputs_digest(job_config: JobConfig, root_path: pathlib.Path) -> str:
+    """Returns the hash of what, outside its files, the job declares it reads.
+
+    That is the files matching `ctx.cache_inputs`, relative to `root_path`, the
+    env-vars in `ctx.cache_env`, the `command`'s executable and the python env.
+    Executables are keyed on their size and mtime, rather than their contents,
+    as they can be large; installing a new version changes both.
+    """
+    key_hash = hashlib.sha256()
+    key_hash.update(f"{sys.version}\0{sys.prefix}".encode("utf-8", "surrogateescape"))
+    executable: typing.Optional[pathlib.Path] = _command_executable(job_config)
+    if executable is not None:
+        try:
+            executable_stat: os.stat_result = executable.stat()
+        except OSError:
+            pass
+        else:
+            key_hash.update(
+                f"\0{executable}\0{executable_stat.st_size}"
+                f"\0{executable_stat.st_mtime_ns}".encode("utf-8", "surrogateescape")
+            )
+    ctx: typing.Optional[JobContextConfig] = job_config.get("ctx", None)
+    for env_var in (ctx or {}).get("cache_env", None) or []:
+        env_value: typing.Optional[str] = os.environ.get(env_var, None)
+        key_hash.update(
+            f"\0{env_var}={env_value}".encode("utf-8", "surrogateescape")
+            if env_value is not None
+            else f"\0{env_var} unset".encode("utf-8")
+        )
+    for pattern in (ctx or {}).get("cache_inputs", None) or []:
+        for input_path in sorted(root_path.glob(pattern)):
+            if not input_path.is_file():
+                continue
+            key_hash.update(
+                b"\0"
+                + str(input_path.relative_to(root_path)).encode(
+                    "utf-8", "surrogateescape"
+                )
+            )
+            try:
+                _hash_file(key_hash, input_path)
+            except OSError:
+                key_hash.update(b"\0unreadable")
+    return key_hash.hexdigest()
+
+
+def job_cache_key(
+    job_config: JobConfig,
+    function: JobFunction,
+    options: typing.Mapping[OptionName, OptionValue],
+    root_path: pathlib.Path,
+    file_list: FilePathList,
+) -> typing.Optional[str]:
+    """Returns the key for a run of a job, or None if the job can't be cached."""
+    function_digest: typing.Optional[str] = _function_source_digest(function)
+    if function_digest is None:
+        return None
+    key_hash = hashlib.sha256()
+    key_hash.update(job_config_digest(job_config, options).encode("utf-8"))
+    key_hash.update(function_digest.encode("utf-8"))
+    key_hash.update(job_inputs_digest(job_config, root_path).encode("utf-8"))
+    for file_path in file_list:
+        key_hash.update(b"\0" + str(file_path).encode("utf-8", "surrogateescape"))
+        try:
+            _hash_file(key_hash, root_path / file_path)
+        except OSError:
+            # e.g. deleted, keyed as such
+            key_hash.update(b"\0missing")
+    return key_hash.hexdigest()
+
+
+def stat_files(root_path: pathlib.Path, file_list: FilePathList) -> FileStats:
+    """Returns the size and mtime of each file, to tell if a job changed them."""
+    stats: FileStats = []
+    for file_path in file_list:
+        try:
+            file_stat: os.stat_result = os.stat(root_path / file_path)
+        except OSError:
+            stats.append(None)
+        else:
+            stats.append((file_stat.st_size, file_stat.st_mtime_ns))
+    return stats
+
+
+def load_cached_job_result(
+    cache_store: CacheStore, key: str
+) -> typing.Optional[CachedJobResult]:
+    """Returns the job's cached result, if it has one under `key`."""
+    serialised: typing.Optional[bytes] = cache_store.get(key)
+    if serialised is None:
+        return None
+    try:
+        cached: typing.Any = json.loads(serialised.decode("utf-8"))
+    except ValueError:
+        warn(f"ignoring unreadable job cache entry for {key}")
+        return None
+    if not isinstance(cached, dict):
+        return None
+    reports: typing.Any = cached.get("reports", None)
+    if reports is not None:
+        # json turns the (name, url) tuples into lists
+        reports = {
+            **reports,
+            "reportUrls": [tuple(report) for report in reports.get("reportUrls", [])],
+        }
+    return {
+        "duration_s": float(cached.get("duration_s", 0.0)),
+        "output": [tuple(output) for output in cached.get("output", [])],
+        "reports": reports,
+    }
+
+
+def save_cached_job_result(
+    cache_store: CacheStore, key: str, result: CachedJobResult
+) -> None:
+    """Writes the job's result to the cache."""
+    try:
+        serialised: str = json.dumps(result, default=_json_default)
+    except ValueError as err:
+        warn(f"failed to write the job cache for {key}: {str(err)}")
+        return
+    cache_store.put(key, serialised.encode("utf-8"))
@@ -1,22 +1,37 @@
 import os
 import pathlib
 import typing
-import uuid
 from datetime import timedelta
 from timeit import default_timer as timer
 
 from typing_extensions import Unpack
 
+from runem.cache_store import CacheStore, open_cache_store
 from runem.config_metadata import ConfigMetadata
 from runem.informative_dict import ReadOnlyInformativeDict
 from runem.job import Job
+from runem.job_cache import (
+    JOB_CACHE_DIRNAME,
+    CachedJobResult,
+    FileStats,
+    job_cache_key,
+    load_cached_job_result,
+    save_cached_job_result,
+    stat_files,
+)
+from runem.job_progress import report_job_event
+from runem.job_shard import JobShard
 from runem.job_wrapper import get_job_wrapper
 from runem.log import error, log, warn
+from runem.run_command import log_command_stdout
+from runem.state_dir import find_state_dir
 from runem.types.common import FilePathList, JobTags
 from runem.types.filters import FilePathListLookup
 from runem.types.runem_config import JobConfig
 from runem.types.types_jobs import (
     AllKwargs,
+    CommandResourceEntries,
+    CommandResources,
     HookSpecificKwargs,
     JobFunction,
     JobKwargs,
@@ -27,14 +42,67 @@ from runem.types.types_jobs import (
 )
 
 
+def _job_is_cacheable(job_config: JobConfig, config_metadata: ConfigMetadata) -> bool:
+    """Returns True if the job opted in to the job-cache, and it isn't disabled."""
+    if "ctx" not in job_config or job_config["ctx"] is None:
+        return False
+    return bool(job_config["ctx"].get("cache", False) and config_metadata.args.cache)
+
+
+def _open_job_cache(config_metadata: ConfigMetadata) -> typing.Optional[CacheStore]:
+    """Returns the store for cached job results, or None if there is nowhere."""
+    state_dir: typing.Optional[pathlib.Path] = find_state_dir(
+        config_metadata.cfg_filepath
+    )
+    return open_cache_store(
+        state_dir / JOB_CACHE_DIRNAME if state_dir is not None else None,
+        config_metadata.cache_config,
+    )
+
+
+def _replay_cached_job(
+    label: str,
+    cached_result: CachedJobResult,
+    config_metadata: ConfigMetadata,
+    cache_store: CacheStore,
+    time_taken: timedelta,
+) -> typing.Tuple[JobTiming, JobReturn]:
+    """Returns the cached job's timing and reports, showing its output again."""
+    if config_metadata.args.verbose:
+        log(
+            f"job: cached: '{label}', unchanged since it ran in "
+            f"{timedelta(seconds=cached_result['duration_s'])}"
+        )
+        for command_label, command_stdout in cached_result["output"]:
+            log_command_stdout(command_label, command_stdout)
+    job_timing: JobTiming = {
+        "job": (label, time_taken),
+        "commands": [],
+        "cached": True,
+        "cache_stats": cache_store.get_stats(),
+    }
+    return job_timing, cached_result["reports"]
+
+
 def job_execute_inner(
     job_config: JobConfig,
     config_metadata: ConfigMetadata,
     file_lists: FilePathListLookup,
+    cpu_slots: typing.Optional[int] = None,
+    shard: typing.Optional[JobShard] = None,
     **kwargs: Unpack[HookSpecificKwargs],
 ) -> typing.Tuple[JobTiming, JobReturn]:
     """Wrapper for running a job inside a sub-process.
 
+    `cpu_slots`, if given, is the number of cpus granted to the job, and is
+    passed to it as `procs` instead of the `--procs` value.
+
+    `shard`, if given, is the part of the job's files this run works on.
+
+    Jobs whose config, code, options and files haven't changed since they last
+    succeeded are skipped, their cached output and reports used instead, see
+    `runem.job_cache`.
+
     Returns the time information and any reports the job generated
     """
     label = Job.get_job_name(job_config)
@@ -46,7 +114,11 @@ def job_execute_inner(
     function: JobFunction = get_job_wrapper(job_config, config_metadata.cfg_filepath)
 
     # get the files for all files found for this job's tags
-    file_list: FilePathList = Job.get_job_files(file_lists, job_tags)
+    file_list: FilePathList = (
+        shard["file_list"]
+        if shard is not None
+        else Job.get_job_files(file_lists, job_tags)
+    )
 
     if not file_list:
         # no files to work on
@@ -66,6 +138,21 @@ def job_execute_inner(
         """
         sub_command_timings.append((label, timing))
 
+    sub_command_resources: CommandResourceEntries = []
+    max_rss_bytes: typing.List[int] = []
+
+    def _record_sub_job_resources(label: str, resources: CommandResources) -> None:
+        """Record the resources used by sub-commands, e.g. by run_command()."""
+        sub_command_resources.append((label, resources))
+        if "max_rss_bytes" in resources:
+            max_rss_bytes.append(resources["max_rss_bytes"])
+
+    sub_command_outputs: typing.List[typing.Tuple[str, str]] = []
+
+    def _record_sub_job_output(label: str, stdout: str) -> None:
+        """Record the output of sub-commands, to replay on cache hits."""
+        sub_command_outputs.append((label, stdout))
+
     if (
         "ctx" in job_config
         and job_config["ctx"] is not None
@@ -78,6 +165,29 @@ def job_execute_inner(
         os.chdir(root_path)
 
     start = timer()
+    cache_store: typing.Optional[CacheStore] = None
+    cache_key: typing.Optional[str] = None
+    if _job_is_cacheable(job_config, config_metadata):
+        cache_store = _open_job_cache(config_metadata)
+    if cache_store is not None:
+        cache_key = job_cache_key(
+            job_config, function, config_metadata.options, root_path, file_list
+        )
+    file_stats: FileStats = []
+    if cache_store is not None and cache_key is not None:
+        cached_result: typing.Optional[CachedJobResult] = load_cached_job_result(
+            cache_store, cache_key
+        )
+        if cached_result is not None:
+            return _replay_cached_job(
+                label,
+                cached_result,
+                config_metadata,
+                cache_store,
+                timedelta(seconds=timer() - start),
+            )
+        file_stats = stat_files(root_path, file_list)
+
     if config_metadata.args.verbose:
         log(f"job: running: '{Job.get_job_name(job_config)}'")
     reports: JobReturn
@@ -89,7 +199,11 @@ def job_execute_inner(
             "job": job_config,
             "label": Job.get_job_name(job_config),
             "options": ReadOnlyInformativeDict(config_metadata.options),
-            "procs": config_metadata.args.procs,
+            "procs": (
+                cpu_slots if cpu_slots is not None else config_metadata.args.procs
+            ),
+            "record_sub_job_output": _record_sub_job_output,
+            "record_sub_job_resources": _record_sub_job_resources,
             "record_sub_job_time": _record_sub_job_time,
             "root_path": root_path,
             "verbose": config_metadata.args.verbose,
@@ -115,32 +229,65 @@ def job_execute_inner(
     if config_metadata.args.verbose:
         log(f"job: DONE: '{label}': {time_taken}")
     this_job_timing_data: TimingEntry = (label, time_taken)
-    return ({"job": this_job_timing_data, "commands": sub_command_timings}, reports)
+    job_timing: JobTiming = {
+        "job": this_job_timing_data,
+        "commands": sub_command_timings,
+    }
+    if sub_command_resources:
+        job_timing["command_resources"] = sub_command_resources
+    if max_rss_bytes:
+        # the commands run one after another, so it's the biggest that matters
+        job_timing["max_rss_bytes"] = max(max_rss_bytes)
+    if (
+        cache_store is not None
+        and cache_key is not None
+        # a job that changed its files, e.g. a formatter, must run again on the
+        # files as they were
+        and stat_files(root_path, file_list) == file_stats
+    ):
+        save_cached_job_result(
+            cache_store,
+            cache_key,
+            {
+                "duration_s": time_taken.total_seconds(),
+                "output": sub_command_outputs,
+                "reports": reports,
+            },
+        )
+    if cache_store is not None:
+        job_timing["cache_stats"] = cache_store.get_stats()
+    return (job_timing, reports)
 
 
 def job_execute(
     job_config: JobConfig,
-    running_jobs: typing.Dict[str, str],
-    completed_jobs: typing.Dict[str, str],
     config_metadata: ConfigMetadata,
     file_lists: FilePathListLookup,
+    job_id: int = 0,
+    cpu_slots: typing.Optional[int] = None,
+    shard: typing.Optional[JobShard] = None,
     **kwargs: Unpack[HookSpecificKwargs],
 ) -> typing.Tuple[JobTiming, JobReturn]:
     """Thin-wrapper around job_execute_inner needed for mocking in tests.
 
+    Also reports the job's progress, under `job_id`, when run on a worker.
+
     Needed for faster tests.
     """
-    this_id: str = str(uuid.uuid4())
-    running_jobs[this_id] = Job.get_job_name(job_config)
+    label: str = Job.get_job_name(job_config)
+    if shard is not None:
+        label = f"{label} (shard {shard['index'] + 1}/{shard['count']})"
+    report_job_event(job_id, label, finished=False)
     try:
         results = job_execute_inner(
             job_config,
             config_metadata,
             file_lists,
+            cpu_slots,
+            shard,
             **kwargs,
         )
     finally:
         # Always tidy-up job statuses
-        completed_jobs[this_id] = running_jobs[this_id]
-        del running_jobs[this_id]
+        report_job_event(job_id, label, finished=True)
     return results
@@ -0,0 +1,416 @@
+import functools
+import heapq
+import itertools
+import multiprocessing
+import multiprocessing.pool
+import os
+import queue
+import signal
+import types
+import typing
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from runem.config_metadata import ConfigMetadata
+from runem.host_load import AdmissionController
+from runem.job import Job
+from runem.job_execute import job_execute
+from runem.job_progress import (
+    ProgressEvents,
+    init_worker_progress,
+    new_progress_events,
+)
+from runem.job_scheduler import JobDependencies
+from runem.job_shard import JobShard
+from runem.log import log
+from runem.run_command import RunemJobError, RunemJobTimeoutError
+from runem.types.filters import FilePathListLookup
+from runem.types.runem_config import Jobs
+from runem.types.types_jobs import JobRunMetadata
+
+# What a worker sends back for a job: the worker's pid, how long it was busy
+# for, and either the job's results or the error it failed with.
+_WorkerResult = typing.Tuple[
+    int, timedelta, typing.Optional[JobRunMetadata], typing.Optional[RunemJobError]
+]
+
+# A finished job: its index, and either its results or the exception it raised
+_JobOutcome = typing.Tuple[
+    int, typing.Optional[_WorkerResult], typing.Optional[BaseException]
+]
+
+
+class JobExecutor:
+    """The worker pool, and progress channel, shared by every phase of a run.
+
+    Spawning the worker processes is a noticeable part of runem's own overhead.
+    So we do it once per run instead of once per phase.
+
+    The workers report job progress as a one-way stream of events, see
+    `runem.job_progress`, which is read by the progress display.
+
+    If given an `admission` controller, new jobs are held back whilst the host
+    is saturated.
+
+    Jobs are handed out one at a time, only when a worker is free, so a worker
+    never holds a backlog of jobs whilst others are idle. How long each worker
+    spends busy is recorded, see `worker_utilisation()`.
+
+    Jobs that run for longer than their timeout are stopped, and recorded in
+    `timed_out`, so that they can be reported apart from other failures.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        admission: typing.Optional[AdmissionController] = None,
+    ) -> None:
+        self.num_workers: int = num_workers
+        self.admission: typing.Optional[AdmissionController] = admission
+        self.progress_events: ProgressEvents = new_progress_events()
+        # cheap, run-unique, ids for the progress events
+        self._job_ids: typing.Iterator[int] = itertools.count()
+        # how long each worker, by pid, has spent running jobs
+        self.worker_busy: typing.Dict[int, timedelta] = {}
+        # the jobs that were stopped as they ran for longer than their timeout
+        self.timed_out: typing.List[JobRunMetadata] = []
+        self._start: float = timer()
+        try:
+            self.pool: multiprocessing.pool.Pool = multiprocessing.Pool(
+                processes=num_workers,
+                initializer=_init_worker,
+                initargs=(self.progress_events,),
+            )
+        except BaseException:
+            self.progress_events.close()
+            raise
+
+    def run_jobs(
+        self,
+        jobs: Jobs,
+        dependencies: JobDependencies,
+        priority_order: typing.List[int],
+        max_concurrent: int,
+        config_metadata: ConfigMetadata,
+        file_lists: FilePathListLookup,
+        fail_fast: bool = False,
+        cpu_budget: typing.Optional[int] = None,
+        mem_budget: typing.Optional[int] = None,
+        memory_estimates: typing.Optional[typing.List[int]] = None,
+        shards: typing.Optional[typing.List[typing.Optional[JobShard]]] = None,
+    ) -> typing.Tuple[
+        typing.List[typing.Optional[JobRunMetadata]], typing.Optional[RunemJobError]
+    ]:
+        """Runs the jobs on the workers, each as soon as its dependencies are done.
+
+        `dependencies` maps each job's index in `jobs` to the indices of the jobs
+        that must complete first. Of the jobs that are ready, those earlier in
+        `priority_order` are started first. Jobs are only handed to the pool
+        when a worker is free, so that decision is made as late as possible.
+
+        When a job fails the jobs that depend on it, directly or not, are never
+        started, but every other job still is, and the first error is returned
+        alongside the results. Jobs that did not run have None results.
+
+        With `fail_fast` we return as soon as a job fails, without waiting for
+        the running jobs, which are stopped when the executor is terminated.
+
+        Jobs are weighted by their `ctx.cpu_slots`, default one, and a job is
+        only started when that many of the `cpu_budget` cpus are free, that is
+        a weighted semaphore. The highest priority ready job waits for its slots
+        rather than being overtaken. Jobs that ask for slots are told how many
+        they were granted, via `procs`.
+
+        Likewise, with a `mem_budget`, a job is only started when its peak
+        memory, going by `memory_estimates`, fits alongside the running jobs'.
+        A job that is bigger than the whole budget runs on its own.
+
+        If given, each job is run on its `shards` files only, see
+        `runem.job_shard`.
+
+        Whilst the `admission` controller holds jobs back we re-check the host
+        periodically, recording the time spent waiting.
+
+        Jobs are stopped after their `ctx.timeout_s`, or the `--job-timeout`,
+        which fails them, see `_execute_on_worker()`.
+        """
+        priority: typing.Dict[int, int] = {
+            job_idx: rank for rank, job_idx in enumerate(priority_order)
+        }
+        waiting_on: typing.Dict[int, typing.Set[int]] = {
+            job_idx: set(dependencies.get(job_idx, ())) for job_idx in range(len(jobs))
+        }
+        dependents: typing.Dict[int, typing.List[int]] = {
+            job_idx: [] for job_idx in range(len(jobs))
+        }
+        for job_idx, job_dependencies in waiting_on.items():
+            for dependency_idx in job_dependencies:
+                dependents[dependency_idx].append(job_idx)
+        ready: typing.List[typing.Tuple[int, int]] = [
+            (priority[job_idx], job_idx)
+            for job_idx, job_dependencies in waiting_on.items()
+            if not job_dependencies
+        ]
+        heapq.heapify(ready)
+
+        if cpu_budget is None:
+            cpu_budget = max_concurrent
+        requested_slots: typing.List[typing.Optional[int]] = [
+            Job.get_cpu_slots(job) for job in jobs
+        ]
+        # a job can never have more than the whole budget
+        granted_slots: typing.List[int] = [
+            min(slots or 1, cpu_budget) for slots in requested_slots
+        ]
+        slots_in_use: int = 0
+        if memory_estimates is None:
+            memory_estimates = [0] * len(jobs)
+        memory_in_use: int = 0
+
+        results: typing.List[typing.Optional[JobRunMetadata]] = [None] * len(jobs)
+        outcomes: "queue.SimpleQueue[_JobOutcome]" = queue.SimpleQueue()
+        failure: typing.Optional[RunemJobError] = None
+        num_running: int = 0
+        last_hold_back_reason: typing.Optional[str] = None
+        while True:
+            hold_back_reason: typing.Optional[str] = None
+            while ready and num_running < max_concurrent:
+                _, job_idx = ready[0]
+                if slots_in_use + granted_slots[job_idx] > cpu_budget:
+                    # wait for enough cpus to be freed up
+                    break
+                if (
+                    mem_budget is not None
+                    and num_running > 0
+                    and memory_in_use + memory_estimates[job_idx] > mem_budget
+                ):
+                    # wait for enough memory to be freed up
+                    break
+                if self.admission is not None:
+                    hold_back_reason = self.admission.hold_back_reason(slots_in_use)
+                    if hold_back_reason is not None:
+                        break
+                heapq.heappop(ready)
+                self.pool.apply_async(
+                    _execute_on_worker,  # no kwargs passed for jobs here
+                    (
+                        Job.get_timeout_s(
+                            jobs[job_idx], config_metadata.args.job_timeout
+                        ),
+                        jobs[job_idx],
+                        config_metadata,
+                        file_lists,
+                        next(self._job_ids),
+                        (
+                            granted_slots[job_idx]
+                            if requested_slots[job_idx] is not None
+                            else None
+                        ),
+                        shards[job_idx] if shards is not None else None,
+                    ),
+                    callback=functools.partial(_on_job_done, outcomes, job_idx),
+                    error_callback=functools.partial(_on_job_error, outcomes, job_idx),
+                )
+                num_running += 1
+                slots_in_use += granted_slots[job_idx]
+                memory_in_use += memory_estimates[job_idx]
+            if num_running == 0:
+                break
+            if (
+                config_metadata.args.verbose
+                and hold_back_reason is not None
+                and last_hold_back_reason is None
+            ):
+                log(f"holding back jobs, the host is busy: {hold_back_reason}")
+            last_hold_back_reason = hold_back_reason
+
+            wait_start: float = timer()
+            try:
+                job_idx, worker_result, job_error = outcomes.get(
+                    timeout=(
+                        None
+                        if (self.admission is None or hold_back_reason is None)
+                        else self.admission.poll_interval_s
+                    )
+                )
+            except queue.Empty:
+                # time to re-check the host
+                continue
+            finally:
+                if self.admission is not None and hold_back_reason is not None:
+                    self.admission.record_throttled(
+                        timedelta(seconds=timer() - wait_start)
+                    )
+            num_running -= 1
+            slots_in_use -= granted_slots[job_idx]
+            memory_in_use -= memory_estimates[job_idx]
+            if worker_result is not None:
+                # failed jobs kept their worker busy too
+                worker_pid, busy, results[job_idx], job_error = worker_result
+                self.worker_busy[worker_pid] = (
+                    self.worker_busy.get(worker_pid, timedelta()) + busy
+                )
+            if job_error is not None:
+                if not isinstance(job_error, RunemJobError):
+                    raise job_error
+                if isinstance(job_error, RunemJobTimeoutError):
+                    log(
+                        f"[red]timed out[/red]: '{job_error.label}' ran for longer "
+                        f"than {job_error.timeout_s}s, stopped it"
+                    )
+                    self.timed_out.append(
+                        (
+                            {
+                                "job": (
+                                    job_error.label,
+                                    timedelta(seconds=job_error.timeout_s),
+                                ),
+                                "commands": [],
+                                "timed_out": True,
+                            },
+                            None,
+                        )
+                    )
+                if failure is None:
+                    failure = job_error
+                if fail_fast:
+                    if num_running:
+                        log(f"fail-fast: stopping {num_running} running jobs")
+                    break
+                continue
+            for dependent_idx in dependents[job_idx]:
+                waiting_on[dependent_idx].discard(job_idx)
+                if not waiting_on[dependent_idx]:
+                    heapq.heappush(ready, (priority[dependent_idx], dependent_idx))
+
+        return results, failure
+
+    def worker_utilisation(self) -> typing.List[typing.Tuple[timedelta, float]]:
+        """Returns how long each worker was busy, and for what fraction of the time.
+
+        The fraction is of the time since the workers were started. Workers are
+        listed busiest first, including those that never ran a job.
+        """
+        lifetime_s: float = max(timer() - self._start, 1e-9)
+        busy_times: typing.List[timedelta] = sorted(
+            self.worker_busy.values(), reverse=True
+        )
+        busy_times.extend([timedelta()] * max(self.num_workers - len(busy_times), 0))
+        return [
+            (busy, min(busy.total_seconds() / lifetime_s, 1.0)) for busy in busy_times
+        ]
+
+    def stop_jobs(self) -> None:
+        """Stops any running jobs, and the workers, e.g. on `--fail-fast`.
+
+        Call it whilst the progress events are still being read. The workers
+        may log as they stop, and would block on a full progress channel.
+        """
+        self.pool.terminate()
+        self.pool.join()
+
+    def close(self, terminate: bool = False) -> None:
+        """Shuts down the workers and the progress channel.
+
+        Use `terminate` when jobs may still be running, e.g. on errors. The
+        workers are sent SIGTERM, and stop any commands they are running.
+        """
+        if terminate:
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+        self.progress_events.close()
+
+    def __enter__(self) -> "JobExecutor":
+        """Use as a context manager so the workers are always cleaned up."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: typing.Optional[typing.Type[BaseException]],
+        exc_value: typing.Optional[BaseException],
+        traceback: typing.Optional[types.TracebackType],
+    ) -> None:
+        """Terminates any running jobs on errors, otherwise waits for them."""
+        self.close(terminate=exc_type is not None)
+
+
+def _execute_on_worker(
+    timeout_s: typing.Optional[float], *args: typing.Any
+) -> _WorkerResult:
+    """Runs a job on a worker, noting which worker it was, and for how long.
+
+    SIGTERM is only trapped whilst the job runs. An idle worker is blocked on
+    the pool's queue, where a python signal-handler may never get to run, so it
+    is left to the default handler, which just stops the worker.
+
+    With a `timeout_s` an alarm is set for the job, on which the job is
+    unwound, and its commands stopped, by raising `RunemJobTimeoutError`.
+
+    Jobs that fail, or time out, return their error, rather than raising it, so
+    that the time the worker spent on them is counted too.
+    """
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    timeout_set: bool = timeout_s is not None and hasattr(signal, "setitimer")
+    if timeout_set:
+        assert timeout_s is not None  # for type checkers
+        signal.signal(
+            signal.SIGALRM,
+            functools.partial(_raise_timeout, Job.get_job_name(args[0]), timeout_s),
+        )
+        signal.setitimer(signal.ITIMER_REAL, timeout_s)
+    start: float = timer()
+    try:
+        job_run_metadata: JobRunMetadata = job_execute(*args)
+    except RunemJobError as err:
+        return os.getpid(), timedelta(seconds=timer() - start), None, err
+    else:
+        return os.getpid(), timedelta(seconds=timer() - start), job_run_metadata, None
+    finally:
+        if timeout_set:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _on_job_done(
+    outcomes: "queue.SimpleQueue[_JobOutcome]",
+    job_idx: int,
+    worker_result: _WorkerResult,
+) -> None:
+    """Called, on the pool's result thread, when a job completes."""
+    outcomes.put((job_idx, worker_result, None))
+
+
+def _on_job_error(
+    outcomes: "queue.SimpleQueue[_JobOutcome]",
+    job_idx: int,
+    job_error: BaseException,
+) -> None:
+    """Called, on the pool's result thread, when a job raises."""
+    outcomes.put((job_idx, None, job_error))
+
+
+def _init_worker(progress_events: ProgressEvents) -> None:
+    """Sets up each worker process when the pool starts it."""
+    init_worker_progress(progress_events)
+
+
+def _exit_on_sigterm(signum: int, frame: typing.Optional[types.FrameType]) -> None:
+    """Unwinds the worker on SIGTERM, e.g. on `pool.terminate()`.
+
+    Killing the worker outright would orphan any commands it is running, raising
+    lets `run_command` stop them first.
+    """
+    raise SystemExit(128 + signum)
+
+
+def _raise_timeout(
+    label: str,
+    timeout_s: float,
+    signum: int,
+    frame: typing.Optional[types.FrameType],
+) -> None:
+    """Unwinds the job when its timeout expires, stopping its commands."""
+    raise RunemJobTimeoutError(label, timeout_s)
@@ -0,0 +1,137 @@
+"""Records how jobs performed on previous runs.
+
+The history is used to make scheduling decisions, for example starting the
+longest-running jobs first, or not starting too many memory-hungry jobs at once.
+"""
+
+import json
+import os
+import pathlib
+import tempfile
+import typing
+from datetime import timedelta
+
+from runem.log import warn
+from runem.types.common import JobName
+from runem.types.types_jobs import JobRunMetadatasByPhase, JobTiming
+
+HISTORY_FILENAME = "job_history.json"
+
+# How much weight the latest run has vs. the history, smooths out the odd
+# slow, or fast, run.
+DURATION_SMOOTHING = 0.5
+
+# How much weight the latest run has when a job's peak memory has come down
+MAX_RSS_SMOOTHING = 0.5
+
+
+class JobHistoryEntry(typing.TypedDict, total=False):
+    """What we know about a job from previous runs."""
+
+    duration_s: float  # smoothed wall-clock duration of the job
+    max_rss_bytes: int  # peak memory of the job, decays slowly if it shrinks
+
+
+JobHistory = typing.Dict[JobName, JobHistoryEntry]
+
+
+def load_job_history(state_dir: typing.Optional[pathlib.Path]) -> JobHistory:
+    """Loads the job-history from disk, returning an empty history if we have none."""
+    if state_dir is None:
+        return {}
+    history_path: pathlib.Path = state_dir / HISTORY_FILENAME
+    if not history_path.exists():
+        return {}
+    try:
+        history: typing.Any = json.loads(history_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        # a corrupt history file isn't fatal, we just start over
+        warn(f"ignoring unreadable job history at {str(history_path)}")
+        return {}
+    if not isinstance(history, dict):
+        return {}
+    return history
+
+
+def save_job_history(
+    state_dir: typing.Optional[pathlib.Path], history: JobHistory
+) -> None:
+    """Atomically writes the job-history to disk."""
+    if state_dir is None:
+        return
+    try:
+        state_dir.mkdir(parents=True, exist_ok=True)
+        # write to a temp file and move it into place so that concurrent runem
+        # runs never see a half-written file.
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=state_dir,
+            prefix=f".{HISTORY_FILENAME}.",
+            delete=False,
+        ) as file_handle:
+            json.dump(history, file_handle, indent=1, sort_keys=True)
+        os.replace(file_handle.name, state_dir / HISTORY_FILENAME)
+    except OSError as err:
+        warn(f"failed to write job history to {str(state_dir)}: {str(err)}")
+
+
+def update_job_history(
+    history: JobHistory, job_run_metadatas: JobRunMetadatasByPhase
+) -> None:
+    """Folds the timings from this run into the history."""
+    for phase, metadatas in job_run_metadatas.items():
+        if phase == "_app":
+            # runem's own timings are not jobs
+            continue
+        job_timing: JobTiming
+        for job_timing, _ in metadatas:
+            label, duration = job_timing["job"]
+            if duration == timedelta(0) or job_timing.get("cached", False):
+                # skipped jobs, e.g. no files or cached, tell us nothing
+                continue
+            entry: JobHistoryEntry = history.setdefault(label, {})
+            this_run_s: float = duration.total_seconds()
+            if "duration_s" in entry:
+                entry["duration_s"] = (DURATION_SMOOTHING * this_run_s) + (
+                    (1.0 - DURATION_SMOOTHING) * entry["duration_s"]
+                )
+            else:
+                entry["duration_s"] = this_run_s
+            if "max_rss_bytes" in job_timing:
+                entry["max_rss_bytes"] = _fold_max_rss(
+                    job_timing["max_rss_bytes"], entry.get("max_rss_bytes", None)
+                )
+
+
+def _fold_max_rss(this_run_bytes: int, previous_bytes: typing.Optional[int]) -> int:
+    """Returns the new peak-memory estimate for a job.
+
+    Over-estimating only costs us some concurrency, whereas under-estimating can
+    run the host out of memory. So a bigger peak is taken as-is, and a smaller
+    one only pulls the estimate down gradually.
+    """
+    if previous_bytes is None or this_run_bytes >= previous_bytes:
+        return this_run_bytes
+    return int(
+        (MAX_RSS_SMOOTHING * this_run_bytes)
+        + ((1.0 - MAX_RSS_SMOOTHING) * previous_bytes)
+    )
+
+
+def expected_duration(
+    history: JobHistory, label: JobName
+) -> typing.Optional[timedelta]:
+    """Returns how long we expect a job to take, or None if we do not know."""
+    entry: typing.Optional[JobHistoryEntry] = history.get(label, None)
+    if not entry or "duration_s" not in entry:
+        return None
+    return timedelta(seconds=entry["duration_s"])
+
+
+def expected_max_rss(history: JobHistory, label: JobName) -> typing.Optional[int]:
+    """Returns the peak memory, in bytes, we expect a job to use, or None."""
+    entry: typing.Optional[JobHistoryEntry] = history.get(label, None)
+    if not entry or "max_rss_bytes" not in entry:
+        return None
+    return entry["max_rss_bytes"]
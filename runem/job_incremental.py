@@ -0,0 +1,157 @@
+"""Runs per-file checkers, e.g. ruff, eslint or prettier, on changed files only.
+
+Commands that check each file on its own, and that use `{file_list}`, can set
+`ctx.incremental: per-file`. We record the contents, by hash, of the files the
+command passed on, and next time only give it the files that have changed since,
+or that it hasn't passed on yet, e.g. because it failed on them.
+
+The record is kept per command, keyed on the job's config, the option values
+and the job's declared inputs, see `runem.job_cache.job_inputs_digest`, so
+changing any of them, e.g. the tool's config or version, re-checks every file.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import typing
+
+from runem.job_cache import (
+    FileStats,
+    file_digest,
+    job_config_digest,
+    job_inputs_digest,
+    stat_files,
+)
+from runem.log import warn
+from runem.types.common import FilePathList
+from runem.types.options import OptionName, OptionValue
+from runem.types.runem_config import JobConfig
+
+INCREMENTAL_DIRNAME = "incremental"
+
+# Only give the command the files that changed since it last passed on them
+INCREMENTAL_PER_FILE = "per-file"
+
+# The hash of each file's contents, by file-path
+FileDigests = typing.Dict[str, str]
+
+
+class IncrementalRun(typing.TypedDict):
+    """The files to run an incremental command on, and how to record them."""
+
+    key: str  # the key of the command's record of passed files
+    file_list: FilePathList  # the files that changed since they last passed
+    digests: typing.Dict[str, typing.Optional[str]]  # of `file_list`, as they were
+    stats: FileStats  # of `file_list`, to tell if the command re-wrote any
+
+
+def _record_path(state_dir: pathlib.Path, key: str) -> pathlib.Path:
+    return state_dir / INCREMENTAL_DIRNAME / f"{key}.json"
+
+
+def load_passed_files(state_dir: pathlib.Path, key: str) -> FileDigests:
+    """Returns the files the command last passed on, and their hashes then."""
+    record_path: pathlib.Path = _record_path(state_dir, key)
+    try:
+        passed: typing.Any = json.loads(record_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        warn(f"ignoring unreadable incremental record at {str(record_path)}")
+        return {}
+    if not isinstance(passed, dict):
+        return {}
+    return passed
+
+
+def plan_incremental_run(
+    state_dir: pathlib.Path,
+    job_config: JobConfig,
+    options: typing.Mapping[OptionName, OptionValue],
+    root_path: pathlib.Path,
+    file_list: FilePathList,
+) -> IncrementalRun:
+    """Returns the files the command should be run on, the ones that changed."""
+    key: str = hashlib.sha256(
+        (
+            job_config_digest(job_config, options)
+            + job_inputs_digest(job_config, root_path)
+        ).encode("utf-8")
+    ).hexdigest()
+    passed: FileDigests = load_passed_files(state_dir, key)
+    changed_files: FilePathList = []
+    digests: typing.Dict[str, typing.Optional[str]] = {}
+    for file_path in file_list:
+        digest: typing.Optional[str] = file_digest(root_path / file_path)
+        if digest is not None and passed.get(str(file_path), None) == digest:
+            continue
+        changed_files.append(file_path)
+        digests[str(file_path)] = digest
+    return {
+        "key": key,
+        "file_list": changed_files,
+        "digests": digests,
+        "stats": stat_files(root_path, changed_files),
+    }
+
+
+@contextlib.contextmanager
+def _record_lock(record_path: pathlib.Path) -> typing.Iterator[None]:
+    """Serialises updates to the record, e.g. by the shards of a job.
+
+    The shards finish at about the same time, and without it the last to write
+    would drop the files the others recorded.
+    """
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover
+        # e.g. on Windows, where the shards may re-check some files next time
+        yield
+        return
+    lock_path: pathlib.Path = record_path.with_name(f".{record_path.name}.lock")
+    with open(lock_path, "a", encoding="utf-8") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def record_passed_files(
+    state_dir: pathlib.Path, root_path: pathlib.Path, incremental_run: IncrementalRun
+) -> None:
+    """Records that the command passed on its files, as they were when it started.
+
+    If the command re-wrote any of its files, e.g. a formatter, nothing is
+    recorded, so that it checks the files as they are now, next time.
+    """
+    if stat_files(root_path, incremental_run["file_list"]) != incremental_run["stats"]:
+        return
+    record_path: pathlib.Path = _record_path(state_dir, incremental_run["key"])
+    try:
+        record_path.parent.mkdir(parents=True, exist_ok=True)
+        with _record_lock(record_path):
+            # other shards of the job may have recorded their files since we
+            # started
+            passed: FileDigests = load_passed_files(state_dir, incremental_run["key"])
+            passed.update(
+                (file_path, digest)
+                for file_path, digest in incremental_run["digests"].items()
+                if digest is not None
+            )
+            # write to a temp file and move it into place so that jobs reading
+            # it, without the lock, never see a half-written record.
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=record_path.parent,
+                prefix=f".{record_path.name}.",
+                delete=False,
+            ) as file_handle:
+                json.dump(passed, file_handle)
+            os.replace(file_handle.name, record_path)
+    except OSError as err:
+        warn(f"failed to write the incremental record to {str(record_path)}: {err}")
@@ -0,0 +1,72 @@
+"""A one-way stream of job events, and output, from the workers to the display.
+
+Workers write small events to a pipe and never wait on a reply, the progress
+display is the only reader. Because the pipe is FIFO, and the workers write
+their 'finished' event before returning their results, the display always sees
+a job finish before the main process tells it that the jobs are all done.
+
+The workers' log messages, including the output of commands on `--verbose`,
+go the same way, see `report_output()`. So the display prints everything, and
+whole messages from parallel jobs interleave as they happen, without garbling
+each other or the spinner.
+"""
+
+import multiprocessing
+import multiprocessing.queues
+import typing
+
+from runem.types.common import JobName
+
+# (job-id, job-label, has-finished)
+JobEvent = typing.Tuple[int, JobName, bool]
+
+# (message, end), a log message to print, see `runem.log.log()`
+OutputEvent = typing.Tuple[str, str]
+
+ProgressEvent = typing.Union[JobEvent, OutputEvent]
+
+# None tells the display that no more events are coming
+if typing.TYPE_CHECKING:  # pragma: no cover
+    ProgressEvents = multiprocessing.queues.SimpleQueue[typing.Optional[ProgressEvent]]
+else:
+    ProgressEvents = multiprocessing.queues.SimpleQueue
+
+# Set, per worker process, by the pool's initialiser
+_WORKER_EVENTS: typing.Optional[ProgressEvents] = None
+
+
+def new_progress_events() -> ProgressEvents:
+    """Creates the channel the workers report their job events on."""
+    events: ProgressEvents = multiprocessing.SimpleQueue()
+    return events
+
+
+def init_worker_progress(events: typing.Optional[ProgressEvents]) -> None:
+    """Pool initialiser, connects the worker process to the progress channel.
+
+    The channel can only be shared by inheritance, so it cannot be passed along
+    with each job.
+    """
+    global _WORKER_EVENTS  # pylint: disable=global-statement
+    _WORKER_EVENTS = events
+
+
+def report_job_event(job_id: int, label: JobName, finished: bool) -> None:
+    """Tells the progress display that a job has started, or finished.
+
+    Does nothing outside of the workers, e.g. for hooks.
+    """
+    if _WORKER_EVENTS is not None:
+        _WORKER_EVENTS.put((job_id, label, finished))
+
+
+def report_output(msg: str, end: str) -> bool:
+    """Sends a log message to the display to print, if we're on a worker.
+
+    Returns False, and does nothing, outside of the workers, where the caller
+    should print the message itself.
+    """
+    if _WORKER_EVENTS is None:
+        return False
+    _WORKER_EVENTS.put((msg, end))
+    return True
@@ -1,15 +1,43 @@
+import concurrent.futures
+import os
+import pathlib
 import shlex
+import struct
 import typing
 
 from typing_extensions import Unpack
 
 from runem.config_metadata import ConfigMetadata
-from runem.run_command import run_command
+from runem.job import Job
+from runem.job_incremental import (
+    INCREMENTAL_PER_FILE,
+    IncrementalRun,
+    plan_incremental_run,
+    record_passed_files,
+)
+from runem.log import log
+from runem.run_command import (
+    OUTPUT_TAIL_CHARS,
+    RunCommandBadExitCode,
+    RunemJobTimeoutError,
+    run_command,
+    stop_running_commands,
+)
+from runem.state_dir import find_state_dir
 from runem.types.common import FilePathList
 from runem.types.options import OptionsWritable
 from runem.types.runem_config import JobConfig
 from runem.types.types_jobs import AllKwargs
 
+# The size of the pointer the kernel keeps to each of a command's args
+_POINTER_SIZE = struct.calcsize("P")
+
+# Room left for what the kernel and the loader add to a command's args
+_ARG_MAX_HEADROOM = 2048
+
+# The longest command line Windows takes, used where there is no sysconf
+_WINDOWS_ARG_MAX = 32767
+
 
 def validate_simple_command(command_string: str) -> typing.List[str]:
     """Use shlex to handle parsing of the command string, a non-trivial problem."""
@@ -17,36 +45,208 @@ def validate_simple_command(command_string: str) -> typing.List[str]:
     return split_command
 
 
+def _command_for_files(
+    command_string: str, file_list: FilePathList
+) -> typing.List[str]:
+    """Returns the command, split into its args, with `file_list` in `{file_list}`."""
+    file_list_with_quotes: typing.List[str] = [
+        f'"{str(file_path)}"' for file_path in file_list
+    ]
+    # use shlex to handle parsing of the command string, a non-trivial problem.
+    cmd = validate_simple_command(
+        command_string.replace("{file_list}", " ".join(file_list_with_quotes))
+    )
+
+    # preserve quotes for consistent handling of strings and avoid the "word
+    # splitting" problem for unix-like shells.
+    return [f'"{token}"' if " " in token else token for token in cmd]
+
+
+def _arg_max() -> int:
+    """Returns how many bytes of args and environment a command can be given.
+
+    Less some headroom, as xargs does, for what the kernel and the loader add.
+    """
+    try:
+        arg_max: int = os.sysconf("SC_ARG_MAX")
+    except (AttributeError, ValueError, OSError):  # pragma: no cover
+        # no sysconf, e.g. on Windows, whose command-line limit is 32K chars
+        return _WINDOWS_ARG_MAX
+    if arg_max <= 0:  # pragma: no cover
+        return _WINDOWS_ARG_MAX
+    return arg_max - _ARG_MAX_HEADROOM
+
+
+def _arg_cost(arg: str) -> int:
+    """Returns the bytes `arg` takes in a command's args: its pointer & string."""
+    return _POINTER_SIZE + len(arg.encode("utf-8", "surrogateescape")) + 1
+
+
+def _environ_cost() -> int:
+    """Returns the bytes runem's environment takes in each command's args."""
+    return sum(_arg_cost(f"{name}={value}") for name, value in os.environ.items())
+
+
+def batch_file_list(
+    command_string: str, file_list: FilePathList
+) -> typing.List[FilePathList]:
+    """Splits `file_list` into batches whose commands fit under the ARG_MAX limit.
+
+    Each file is passed quoted and as one arg. The environment shares the limit,
+    so it is taken off first, and commands are only split when they must be.
+    """
+    budget: int = (
+        _arg_max()
+        - _environ_cost()
+        - sum(_arg_cost(arg) for arg in _command_for_files(command_string, []))
+    )
+    batches: typing.List[FilePathList] = []
+    batch: FilePathList = []
+    batch_cost: int = 0
+    for file_path in file_list:
+        # at most, as it may be quoted, see _command_for_files()
+        file_cost: int = _arg_cost(f'"{str(file_path)}"')
+        if batch and batch_cost + file_cost > budget:
+            batches.append(batch)
+            batch = []
+            batch_cost = 0
+        batch.append(file_path)
+        batch_cost += file_cost
+    if batch or not batches:
+        batches.append(batch)
+    return batches
+
+
+def _run_batches(command_string: str, **kwargs: Unpack[AllKwargs]) -> None:
+    """Runs the `{file_list}` command on its files, in as many batches as it takes.
+
+    The batches are run in parallel, up to the job's `cpu_slots`, and all of them
+    are run even if some fail, so that every file is checked. Their failures are
+    combined into one.
+    """
+    batches: typing.List[FilePathList] = batch_file_list(
+        command_string, kwargs["file_list"]
+    )
+    if len(batches) == 1:
+        # the output is only shown, not returned, so only keep its end in memory
+        run_command(
+            cmd=_command_for_files(command_string, batches[0]),
+            capture_tail_chars=OUTPUT_TAIL_CHARS,
+            **kwargs,
+        )
+        return
+
+    label: str = kwargs["label"]
+    if kwargs["verbose"]:
+        log(
+            f"job: '{label}': {len(kwargs['file_list'])} files are too many for one "
+            f"command, running them in {len(batches)} batches"
+        )
+
+    def _run_batch(batch_idx: int) -> None:
+        batch_kwargs: AllKwargs = {
+            **kwargs,
+            "label": f"{label} ({batch_idx + 1}/{len(batches)})",
+            "file_list": batches[batch_idx],
+        }
+        run_command(
+            cmd=_command_for_files(command_string, batches[batch_idx]),
+            capture_tail_chars=OUTPUT_TAIL_CHARS,
+            **batch_kwargs,
+        )
+
+    # jobs count as one cpu, unless they say they use more, see `cpu_slots`
+    max_workers: int = (
+        kwargs["procs"] if Job.get_cpu_slots(kwargs["job"]) is not None else 1
+    )
+    errors: typing.List[BaseException] = []
+    if max_workers <= 1:
+        for batch_idx in range(len(batches)):
+            try:
+                _run_batch(batch_idx)
+            except RunemJobTimeoutError:
+                # the job is being stopped, see `ctx.timeout_s`
+                raise
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                errors.append(err)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(max_workers, len(batches))
+        )
+        futures: typing.List[concurrent.futures.Future[None]] = [
+            executor.submit(_run_batch, batch_idx) for batch_idx in range(len(batches))
+        ]
+        try:
+            for future in futures:
+                error: typing.Optional[BaseException] = future.exception()
+                if error is not None:
+                    errors.append(error)
+        except BaseException:
+            # runem is stopping the job, e.g. on --fail-fast, which the commands
+            # on the other threads don't see, so stop them here.
+            for future in futures:
+                future.cancel()
+            stop_running_commands()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+    if not errors:
+        return
+    bad_exits: typing.List[RunCommandBadExitCode] = []
+    for batch_error in errors:
+        if not isinstance(batch_error, RunCommandBadExitCode):
+            raise batch_error
+        bad_exits.append(batch_error)
+    # one failure for the job, showing each failed batch's output
+    raise RunCommandBadExitCode("\n".join(bad_exit.stdout for bad_exit in bad_exits))
+
+
 def job_runner_simple_command(
     **kwargs: Unpack[AllKwargs],
 ) -> None:
     """Parses the command and tries to run it via the system.
 
-    Commands inherit the environment.
+    Commands inherit the environment. Only the end of their output is kept in
+    memory, see `run_command()`'s `capture_tail_chars`.
+
+    Incremental commands, see `runem.job_incremental`, are only given the files
+    that changed since they last passed, and aren't run if none have.
     """
     # assume we have the job.command entry, allowing KeyError to propagate up
     job_config: JobConfig = kwargs["job"]
     command_string: str = job_config["command"]
+    config_metadata: ConfigMetadata = kwargs["config_metadata"]
 
-    command_string_files: str = command_string
-    if "{file_list}" in command_string:
-        file_list: FilePathList = kwargs["file_list"]
-        file_list_with_quotes: typing.List[str] = [
-            f'"{str(file_path)}"' for file_path in file_list
-        ]
-        command_string_files = command_string.replace(
-            "{file_list}", " ".join(file_list_with_quotes)
+    incremental_run: typing.Optional[IncrementalRun] = None
+    state_dir: typing.Optional[pathlib.Path] = None
+    if (
+        Job.get_incremental_mode(job_config) == INCREMENTAL_PER_FILE
+        and config_metadata.args.cache
+    ):
+        state_dir = find_state_dir(config_metadata.cfg_filepath)
+    if state_dir is not None:
+        incremental_run = plan_incremental_run(
+            state_dir,
+            job_config,
+            config_metadata.options,
+            kwargs["root_path"],
+            kwargs["file_list"],
         )
+        if not incremental_run["file_list"]:
+            if kwargs["verbose"]:
+                log(f"job: '{kwargs['label']}': no changed files, skipping")
+            return
+        kwargs = {**kwargs, "file_list": incremental_run["file_list"]}
 
-    config_metadata: ConfigMetadata = kwargs["config_metadata"]
     options: OptionsWritable = config_metadata.options
-    command_string_options: str = command_string_files
+    command_string_options: str = command_string
     for name, value in options.items():
         # For now, just pass `--option-name`, `--check` or similar to the
         # command line. At some point we will want this to be cleverer, but
         # this will do for now.
         option_search = f"{{{name}}}"
-        if option_search in command_string_files:
+        if option_search in command_string:
             replacement = ""
             if value:
                 replacement = f"--{name}"
@@ -54,11 +254,15 @@ def job_runner_simple_command(
                 option_search, replacement
             )
 
-    # use shlex to handle parsing of the command string, a non-trivial problem.
-    cmd = validate_simple_command(command_string_options)
-
-    # preserve quotes for consistent handling of strings and avoid the "word
-    # splitting" problem for unix-like shells.
-    cmd_with_quotes = [f'"{token}"' if " " in token else token for token in cmd]
+    if "{file_list}" not in command_string_options:
+        # the output is only shown, not returned, so only keep its end in memory
+        run_command(
+            cmd=_command_for_files(command_string_options, []),
+            capture_tail_chars=OUTPUT_TAIL_CHARS,
+            **kwargs,
+        )
+    else:
+        _run_batches(command_string_options, **kwargs)
 
-    run_command(cmd=cmd_with_quotes, **kwargs)
+    if state_dir is not None and incremental_run is not None:
+        record_passed_files(state_dir, kwargs["root_path"], incremental_run)
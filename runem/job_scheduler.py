@@ -0,0 +1,152 @@
+"""Decides the order in which jobs are handed to the workers."""
+
+import typing
+from collections import defaultdict
+from datetime import timedelta
+
+from runem.job import Job
+from runem.job_history import JobHistory, expected_duration, expected_max_rss
+from runem.types.common import JobNames, OrderedPhases, PhaseName
+from runem.types.runem_config import JobConfig, Jobs, PhaseGroupedJobs
+from runem.utils import printable_set
+
+
+def longest_first_order(jobs: Jobs, history: JobHistory) -> typing.List[int]:
+    """Returns the indices of `jobs` ordered longest-expected-duration first.
+
+    This is the 'longest processing time' (LPT) heuristic, starting the slowest
+    jobs first means the quicker jobs complete around them, shortening the
+    wall-clock time of the phase.
+
+    Jobs we have no history for are started first, in config order, as we have
+    to assume they could be slow. With no history at all this is just the config
+    order.
+    """
+
+    def _sort_key(job_idx: int) -> float:
+        duration: typing.Optional[timedelta] = expected_duration(
+            history, Job.get_job_name(jobs[job_idx])
+        )
+        if duration is None:
+            return float("-inf")
+        return -duration.total_seconds()
+
+    # NOTE: `sorted()` is stable so equal keys keep their config order
+    return sorted(range(len(jobs)), key=_sort_key)
+
+
+def memory_estimates(
+    jobs: Jobs, history: JobHistory, mem_budget: int, max_concurrent: int
+) -> typing.List[int]:
+    """Returns the peak memory, in bytes, we expect each of `jobs` to use.
+
+    Jobs we have no history for are assumed to need an even share of the
+    `mem_budget`, between the `max_concurrent` jobs.
+    """
+    unknown_estimate: int = mem_budget // max(max_concurrent, 1)
+    estimates: typing.List[int] = []
+    for job in jobs:
+        max_rss: typing.Optional[int] = expected_max_rss(history, Job.get_job_name(job))
+        estimates.append(unknown_estimate if max_rss is None else max_rss)
+    return estimates
+
+
+class JobDependencyCycle(ValueError):
+    """The `when.after` config, along with the phase order, has a cycle in it."""
+
+
+# For each job, by its index in a list of jobs, the indices of the jobs it must
+# run after.
+JobDependencies = typing.Dict[int, typing.Set[int]]
+PhasedJobs = typing.List[typing.Tuple[PhaseName, JobConfig]]
+
+
+def uses_job_dependencies(
+    phases: OrderedPhases, jobs_by_phase: PhaseGroupedJobs
+) -> bool:
+    """Whether any of the jobs to be run declare `when.after` dependencies."""
+    return any(
+        Job.get_job_dependencies(job) is not None
+        for phase in phases
+        for job in jobs_by_phase[phase]
+    )
+
+
+def phased_job_dependencies(
+    phases: OrderedPhases, jobs_by_phase: PhaseGroupedJobs
+) -> typing.Tuple[PhasedJobs, JobDependencies]:
+    """Builds the dependency graph for the jobs, augmenting the phases.
+
+    Jobs with `when.after` run as soon as the jobs they name are done, ignoring
+    the phases. All other jobs keep the phase semantics, running after every job
+    in the earlier phases.
+
+    Dependencies on jobs that are not being run, e.g. that have been filtered
+    out on the command line, are ignored.
+
+    Raises JobDependencyCycle if the graph cannot be run.
+    """
+    phased_jobs: PhasedJobs = [
+        (phase, job) for phase in phases for job in jobs_by_phase[phase]
+    ]
+    job_names: typing.List[str] = [Job.get_job_name(job) for _, job in phased_jobs]
+    dependencies: JobDependencies = {}
+    earlier_phase_jobs: typing.Set[int] = set()
+    this_phase_jobs: typing.Set[int] = set()
+    current_phase: typing.Optional[PhaseName] = None
+    for job_idx, (phase, job) in enumerate(phased_jobs):
+        if phase != current_phase:
+            earlier_phase_jobs.update(this_phase_jobs)
+            this_phase_jobs = set()
+            current_phase = phase
+        this_phase_jobs.add(job_idx)
+
+        job_dependencies: typing.Optional[JobNames] = Job.get_job_dependencies(job)
+        if job_dependencies is None:
+            dependencies[job_idx] = set(earlier_phase_jobs)
+            continue
+        dependencies[job_idx] = {
+            dependency_idx
+            for dependency_idx, dependency_name in enumerate(job_names)
+            if dependency_idx != job_idx
+            and any(
+                Job.is_dependency_match(dependency_name, dependency)
+                for dependency in job_dependencies
+            )
+        }
+
+    _check_for_cycles(job_names, dependencies)
+    return phased_jobs, dependencies
+
+
+def _check_for_cycles(
+    job_names: typing.List[str], dependencies: JobDependencies
+) -> None:
+    """Raises JobDependencyCycle if the jobs can't be put in a run order.
+
+    Uses Kahn's algorithm, whatever can't be ordered is in, or after, a cycle.
+    """
+    waiting_on: typing.Dict[int, int] = {
+        job_idx: len(job_dependencies)
+        for job_idx, job_dependencies in dependencies.items()
+    }
+    dependents: typing.Dict[int, typing.List[int]] = defaultdict(list)
+    for job_idx, job_dependencies in dependencies.items():
+        for dependency_idx in job_dependencies:
+            dependents[dependency_idx].append(job_idx)
+    runnable: typing.List[int] = [
+        job_idx for job_idx, count in waiting_on.items() if count == 0
+    ]
+    while runnable:
+        job_idx = runnable.pop()
+        del waiting_on[job_idx]
+        for dependent_idx in dependents[job_idx]:
+            waiting_on[dependent_idx] -= 1
+            if waiting_on[dependent_idx] == 0:
+                runnable.append(dependent_idx)
+    if waiting_on:
+        stuck_jobs: typing.Set[str] = {job_names[job_idx] for job_idx in waiting_on}
+        raise JobDependencyCycle(
+            "job dependencies, from 'when.after' and the phase order, have a "
+            f"cycle in them, involving: {printable_set(stuck_jobs)}"
+        )
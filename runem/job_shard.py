@@ -0,0 +1,234 @@
+"""Splits a job's files into shards, that are run as separate tasks, in parallel.
+
+Jobs like linters, or per-file formatters, get all of their files at once and
+run as a single process, leaving the other cores idle once the quicker jobs are
+done. Jobs with `ctx.shard` instead have their files split into balanced shards,
+each of which is run as a task of its own. The results of the shards are merged
+back together, so that the rest of runem sees a single job.
+"""
+
+import heapq
+import os
+import pathlib
+import typing
+from datetime import timedelta
+
+from runem.cache_store import merge_cache_stats
+from runem.job import Job
+from runem.job_scheduler import JobDependencies
+from runem.types.common import FilePathList
+from runem.types.filters import FilePathListLookup
+from runem.types.runem_config import JobConfig, Jobs, JobShardConfig
+from runem.types.types_jobs import (
+    CacheStatsByStore,
+    CommandResourceEntries,
+    JobReturn,
+    JobRunMetadata,
+    JobTiming,
+    ReportUrls,
+    TimingEntries,
+)
+
+# Without a `min_files_per_shard` don't make shards smaller than this
+DEFAULT_MIN_FILES_PER_SHARD = 10
+
+
+class JobShard(typing.TypedDict):
+    """The files one task of a sharded job works on."""
+
+    index: int  # the shard's index, from zero
+    count: int  # how many shards the job was split into
+    file_list: FilePathList  # the files for this shard
+
+
+class ShardedJobs(typing.TypedDict):
+    """Jobs split into tasks, sharded jobs have a task per shard."""
+
+    tasks: Jobs  # the job to run for each task
+    shards: typing.List[typing.Optional[JobShard]]  # None for un-sharded jobs
+    job_indices: typing.List[int]  # the index of each task's job
+
+
+def get_num_shards(
+    shard_config: JobShardConfig, num_files: int, max_concurrent: int
+) -> int:
+    """Returns how many shards to split a job's `num_files` files into."""
+    max_shards: int = shard_config.get("max_shards", max_concurrent)
+    min_files_per_shard: int = shard_config.get(
+        "min_files_per_shard", DEFAULT_MIN_FILES_PER_SHARD
+    )
+    return max(1, min(max_shards, max_concurrent, num_files // min_files_per_shard))
+
+
+def get_job_num_shards(
+    job: JobConfig, file_lists: FilePathListLookup, max_concurrent: int
+) -> int:
+    """Returns how many tasks the job will be run as, one if it isn't sharded."""
+    shard_config: typing.Optional[JobShardConfig] = Job.get_shard_config(job)
+    if shard_config is None:
+        return 1
+    num_files: int = len(Job.get_job_files(file_lists, Job.get_job_tags(job)))
+    return get_num_shards(shard_config, num_files, max_concurrent)
+
+
+def count_tasks(jobs: Jobs, file_lists: FilePathListLookup, max_concurrent: int) -> int:
+    """Returns how many tasks the jobs will be run as, once sharded."""
+    return sum(get_job_num_shards(job, file_lists, max_concurrent) for job in jobs)
+
+
+def _file_cost(root_path: pathlib.Path, file_path: str) -> int:
+    """Estimates how long a job takes on a file, from its size."""
+    try:
+        return max(os.stat(root_path / file_path).st_size, 1)
+    except OSError:
+        return 1
+
+
+def split_file_list(
+    file_list: FilePathList, num_shards: int, root_path: pathlib.Path
+) -> typing.List[FilePathList]:
+    """Splits the files into `num_shards` shards of about the same total size.
+
+    Files are handed out biggest first, each to the shard with the least in it,
+    and each shard keeps its files in the original order.
+    """
+    costs: typing.List[int] = [
+        _file_cost(root_path, file_path) for file_path in file_list
+    ]
+    # (total-cost, shard-index)
+    shard_costs: typing.List[typing.Tuple[int, int]] = [
+        (0, shard_idx) for shard_idx in range(num_shards)
+    ]
+    file_shards: typing.List[int] = [0] * len(file_list)
+    for file_idx in sorted(
+        range(len(file_list)), key=lambda file_idx: costs[file_idx], reverse=True
+    ):
+        shard_cost, shard_idx = heapq.heappop(shard_costs)
+        file_shards[file_idx] = shard_idx
+        heapq.heappush(shard_costs, (shard_cost + costs[file_idx], shard_idx))
+    shards: typing.List[FilePathList] = [[] for _ in range(num_shards)]
+    for file_path, shard_idx in zip(file_list, file_shards):
+        shards[shard_idx].append(file_path)
+    return shards
+
+
+def shard_jobs(
+    jobs: Jobs,
+    file_lists: FilePathListLookup,
+    max_concurrent: int,
+    root_path: pathlib.Path,
+) -> ShardedJobs:
+    """Splits the jobs that have `ctx.shard` config into a task per shard."""
+    sharded: ShardedJobs = {"tasks": [], "shards": [], "job_indices": []}
+    for job_idx, job in enumerate(jobs):
+        num_shards: int = get_job_num_shards(job, file_lists, max_concurrent)
+        if num_shards == 1:
+            sharded["tasks"].append(job)
+            sharded["shards"].append(None)
+            sharded["job_indices"].append(job_idx)
+            continue
+        file_list: FilePathList = Job.get_job_files(file_lists, Job.get_job_tags(job))
+        for shard_idx, shard_files in enumerate(
+            split_file_list(file_list, num_shards, root_path)
+        ):
+            sharded["tasks"].append(job)
+            sharded["shards"].append(
+                {"index": shard_idx, "count": num_shards, "file_list": shard_files}
+            )
+            sharded["job_indices"].append(job_idx)
+    return sharded
+
+
+def shard_dependencies(
+    sharded: ShardedJobs, dependencies: JobDependencies
+) -> JobDependencies:
+    """Maps the jobs' dependencies onto their tasks.
+
+    Every task of a job waits for every task of the jobs it depends on.
+    """
+    tasks_by_job: typing.Dict[int, typing.List[int]] = {}
+    for task_idx, job_idx in enumerate(sharded["job_indices"]):
+        tasks_by_job.setdefault(job_idx, []).append(task_idx)
+    task_dependencies: JobDependencies = {}
+    for task_idx, job_idx in enumerate(sharded["job_indices"]):
+        task_dependencies[task_idx] = {
+            dependency_task_idx
+            for dependency_idx in dependencies.get(job_idx, ())
+            for dependency_task_idx in tasks_by_job[dependency_idx]
+        }
+    return task_dependencies
+
+
+def shard_priority_order(
+    sharded: ShardedJobs, priority_order: typing.List[int]
+) -> typing.List[int]:
+    """Maps the jobs' priority order onto their tasks, shards stay together."""
+    job_rank: typing.Dict[int, int] = {
+        job_idx: rank for rank, job_idx in enumerate(priority_order)
+    }
+    # NOTE: `sorted()` is stable so shards keep their order
+    return sorted(
+        range(len(sharded["tasks"])),
+        key=lambda task_idx: job_rank[sharded["job_indices"][task_idx]],
+    )
+
+
+def _merge_shard_results(shard_results: typing.List[JobRunMetadata]) -> JobRunMetadata:
+    """Merges the timings, and reports, of a job's shards into one job's."""
+    label: str = shard_results[0][0]["job"][0]
+    commands: TimingEntries = []
+    command_resources: CommandResourceEntries = []
+    report_urls: ReportUrls = []
+    max_rss_bytes: typing.List[int] = []
+    cache_stats: CacheStatsByStore = {}
+    duration: timedelta = timedelta(0)
+    for job_timing, job_return in shard_results:
+        # the shards' durations are summed, like the durations of jobs are
+        duration += job_timing["job"][1]
+        commands.extend(job_timing["commands"])
+        command_resources.extend(job_timing.get("command_resources", []))
+        if "max_rss_bytes" in job_timing:
+            max_rss_bytes.append(job_timing["max_rss_bytes"])
+        if "cache_stats" in job_timing:
+            merge_cache_stats(cache_stats, job_timing["cache_stats"])
+        if job_return is not None:
+            report_urls.extend(job_return.get("reportUrls", []))
+    merged_timing: JobTiming = {"job": (label, duration), "commands": commands}
+    if command_resources:
+        merged_timing["command_resources"] = command_resources
+    if max_rss_bytes:
+        merged_timing["max_rss_bytes"] = max(max_rss_bytes)
+    if all(job_timing.get("cached", False) for job_timing, _ in shard_results):
+        merged_timing["cached"] = True
+    if cache_stats:
+        merged_timing["cache_stats"] = cache_stats
+    merged_return: JobReturn = {"reportUrls": report_urls} if report_urls else None
+    return merged_timing, merged_return
+
+
+def merge_shard_results(
+    sharded: ShardedJobs,
+    num_jobs: int,
+    task_results: typing.List[typing.Optional[JobRunMetadata]],
+) -> typing.List[typing.Optional[JobRunMetadata]]:
+    """Maps the tasks' results back onto their jobs.
+
+    A sharded job only has results if all of its shards completed.
+    """
+    results_by_job: typing.List[typing.List[typing.Optional[JobRunMetadata]]] = [
+        [] for _ in range(num_jobs)
+    ]
+    for job_idx, task_result in zip(sharded["job_indices"], task_results):
+        results_by_job[job_idx].append(task_result)
+    job_results: typing.List[typing.Optional[JobRunMetadata]] = []
+    for shard_results in results_by_job:
+        completed: typing.List[JobRunMetadata] = [
+            result for result in shard_results if result is not None
+        ]
+        if len(completed) != len(shard_results):
+            job_results.append(None)
+        elif len(completed) == 1:
+            job_results.append(completed[0])
+        else:
+            job_results.append(_merge_shard_results(completed))
+    return job_results
@@ -1,6 +1,7 @@
 import typing
 
 from runem.blocking_print import blocking_print
+from runem.job_progress import report_output
 
 
 def log(
@@ -33,6 +34,11 @@ def log(
         # Make it clear that the message comes from `runem` internals.
         msg = f"[light_slate_grey]runem[/light_slate_grey]: {msg}"
 
+    # on the workers, hand the message to the progress display to print, so
+    # parallel jobs' messages don't garble each other, or the spinner.
+    if report_output(msg, end if end is not None else "\n"):
+        return
+
     # print in a blocking manner, waiting for system resources to free up if a
     # runem job is contending on stdout or similar.
     blocking_print(msg, end=end)
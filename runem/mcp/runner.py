@@ -18,15 +18,19 @@ import yaml
 from typing_extensions import Literal
 
 from runem.command_line import parse_args
-from runem.config import load_project_config, load_user_configs
+from runem.config_cache import load_cached_config_metadata
 from runem.config_metadata import ConfigMetadata
-from runem.config_parse import load_config_metadata
 from runem.job import Job
 from runem.job_filter import filter_jobs
+from runem.report import cpu_efficiency, total_command_resources
 from runem.runem import _main
 from runem.types.common import PhaseName
 from runem.types.runem_config import JobConfig, PhaseGroupedJobs
-from runem.types.types_jobs import JobRunMetadatasByPhase, JobTiming
+from runem.types.types_jobs import (
+    CommandResources,
+    JobRunMetadatasByPhase,
+    JobTiming,
+)
 
 Format = Literal["yaml", "json"]
 JsonLike = typing.Union[
@@ -124,7 +128,7 @@ def _with_error_handling(
 def _load_metadata() -> ConfigMetadata:  # pragma: FIXME: add code coverage
     """Load and validate the active runem config using runem's discovery logic."""
     try:
-        config, cfg_filepath = load_project_config()
+        return load_cached_config_metadata(silent=True)
     except SystemExit as err:
         raise RunemMcpError(
             "config_not_found",
@@ -132,9 +136,6 @@ def _load_metadata() -> ConfigMetadata:  # pragma: FIXME: add code coverage
             "Run this MCP server from a runem project root.",
         ) from err
 
-    user_configs = load_user_configs()
-    return load_config_metadata(config, cfg_filepath, user_configs, silent=True)
-
 
 def _job_name(job: JobConfig) -> str:
     return Job.get_job_name(job)
@@ -542,22 +543,48 @@ def _timing_summary(
     return timing
 
 
+def _resources_entry(
+    resources: CommandResources, duration: timedelta
+) -> typing.Dict[str, JsonLike]:
+    entry: typing.Dict[str, JsonLike] = {
+        name: typing.cast(JsonLike, value) for name, value in resources.items()
+    }
+    entry["cpu_efficiency"] = round(cpu_efficiency(resources, duration), 3)
+    return entry
+
+
 def _timing_entry(phase: str, job_timing: JobTiming) -> typing.Dict[str, JsonLike]:
     name, duration = job_timing["job"]
-    return {
+    # the resources each command used, in the order they were recorded
+    resources_by_label: typing.Dict[str, typing.List[CommandResources]] = defaultdict(
+        list
+    )
+    for label, resources in job_timing.get("command_resources", []):
+        resources_by_label[label].append(resources)
+    commands: typing.List[JsonLike] = []
+    for label, timing in job_timing["commands"]:
+        command: typing.Dict[str, JsonLike] = {
+            "sub_job": label,
+            "duration": timing.total_seconds(),
+            "status": "recorded",
+        }
+        if resources_by_label[label]:
+            command["resources"] = _resources_entry(
+                resources_by_label[label].pop(0), timing
+            )
+        commands.append(command)
+    entry: typing.Dict[str, JsonLike] = {
         "phase": phase,
         "job": name,
         "duration": duration.total_seconds(),
-        "status": "recorded",
-        "commands": [
-            {
-                "sub_job": label,
-                "duration": timing.total_seconds(),
-                "status": "recorded",
-            }
-            for label, timing in job_timing["commands"]
-        ],
+        "status": "timed out" if job_timing.get("timed_out", False) else "recorded",
+        "commands": commands,
     }
+    if job_timing.get("command_resources", None):
+        entry["resources"] = _resources_entry(
+            total_command_resources(job_timing["command_resources"]), duration
+        )
+    return entry
 
 
 def _compact_text(text: str) -> str:  # pragma: FIXME: add code coverage
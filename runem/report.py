@@ -3,9 +3,13 @@ import typing
 from collections import defaultdict
 from datetime import timedelta
 
+from runem.cache_store import merge_cache_stats
 from runem.log import log
 from runem.types.common import OrderedPhases, PhaseName
 from runem.types.types_jobs import (
+    CacheStatsByStore,
+    CommandResourceEntries,
+    CommandResources,
     JobReturn,
     JobRunMetadatasByPhase,
     JobRunReportByPhase,
@@ -16,11 +20,6 @@ from runem.types.types_jobs import (
     TimingEntries,
 )
 
-try:
-    import termplotlib
-except ImportError:  # pragma: FIXME: add code coverage
-    termplotlib = None
-
 
 def _align_bar_graphs_workaround(original_text: str) -> str:
     """Module termplotlib doesn't align floats, this fixes that.
@@ -132,6 +131,11 @@ def _plot_times(
         times.insert(0, job_time_total.total_seconds())
     labels.insert(0, "runem (total wall-clock)")
     times.insert(0, wall_clock_for_runem_main.total_seconds())
+    # imported here, as it brings in numpy, to keep runem's start-up quick
+    try:
+        import termplotlib  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: FIXME: add code coverage
+        termplotlib = None
     if termplotlib:
         fig = termplotlib.figure()
         # cspell:disable-next-line
@@ -181,6 +185,8 @@ def _gen_jobs_report(
         utf8_sub_jobs = "│" if not_last else " "
         job_label, job_time_total = job_timing["job"]
         job_bar_label: str = f"{job_label}"
+        if job_timing.get("cached", False):
+            job_bar_label = f"{job_label} (cached)"
         labels.append(f"{utf8_phase_group}{utf8_job}{job_bar_label}")
         times.append(job_time_total.total_seconds())
         job_time_sum += job_time_total
@@ -202,6 +208,116 @@ def _gen_jobs_report(
     return job_time_sum
 
 
+def _format_bytes(num_bytes: int) -> str:
+    """Returns the size in the largest unit that keeps it above 1, e.g. '1.5 MB'."""
+    size: float = float(num_bytes)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _print_cache_stats(timing_data: JobRunTimesByPhase) -> None:
+    """Logs how well the job-cache's stores did, to help tune their sizes."""
+    cache_stats: CacheStatsByStore = {}
+    for job_timings in timing_data.values():
+        for job_timing in job_timings:
+            if "cache_stats" in job_timing:
+                merge_cache_stats(cache_stats, job_timing["cache_stats"])
+    for store_name, store_stats in sorted(cache_stats.items()):
+        lookups: int = store_stats["hits"] + store_stats["misses"]
+        hit_rate: float = store_stats["hits"] / lookups if lookups else 0.0
+        log(
+            f"cache: [blue]{store_name}[/blue]: "
+            f"{store_stats['hits']} hits, {store_stats['misses']} misses "
+            f"({hit_rate:.0%}), "
+            f"read {_format_bytes(store_stats['bytes_read'])}, "
+            f"wrote {_format_bytes(store_stats['bytes_written'])}, "
+            f"evicted {_format_bytes(store_stats['bytes_evicted'])}"
+        )
+
+
+def total_command_resources(
+    command_resources: CommandResourceEntries,
+) -> CommandResources:
+    """Returns the resources used by all of a job's commands, added together.
+
+    Apart from the peak memory, which is that of the biggest command.
+    """
+    total: CommandResources = {
+        "user_cpu_s": 0.0,
+        "system_cpu_s": 0.0,
+        "block_reads": 0,
+        "block_writes": 0,
+        "voluntary_ctx_switches": 0,
+        "involuntary_ctx_switches": 0,
+    }
+    for _, resources in command_resources:
+        total["user_cpu_s"] += resources.get("user_cpu_s", 0.0)
+        total["system_cpu_s"] += resources.get("system_cpu_s", 0.0)
+        total["block_reads"] += resources.get("block_reads", 0)
+        total["block_writes"] += resources.get("block_writes", 0)
+        total["voluntary_ctx_switches"] += resources.get("voluntary_ctx_switches", 0)
+        total["involuntary_ctx_switches"] += resources.get(
+            "involuntary_ctx_switches", 0
+        )
+        if "max_rss_bytes" in resources:
+            total["max_rss_bytes"] = max(
+                total.get("max_rss_bytes", 0), resources["max_rss_bytes"]
+            )
+    return total
+
+
+def cpu_efficiency(resources: CommandResources, wall_time: timedelta) -> float:
+    """Returns the cpu time used per second of wall-clock time.
+
+    Under 1.0 the job was waiting, on i/o, the network or other jobs, above 1.0
+    it was using more than one cpu.
+    """
+    wall_s: float = wall_time.total_seconds()
+    if wall_s <= 0:
+        return 0.0
+    return (resources["user_cpu_s"] + resources["system_cpu_s"]) / wall_s
+
+
+def _print_resource_usage(timing_data: JobRunTimesByPhase) -> None:
+    """Logs the cpu, i/o and waiting of each job's commands.
+
+    To tell whether a slow job is cpu-bound, i/o-bound or waiting on something.
+    """
+    for job_timings in timing_data.values():
+        for job_timing in job_timings:
+            if not job_timing.get("command_resources", None):
+                continue
+            job_label, job_time = job_timing["job"]
+            resources: CommandResources = total_command_resources(
+                job_timing["command_resources"]
+            )
+            log(
+                f"resources: [blue]{job_label}[/blue]: "
+                f"{cpu_efficiency(resources, job_time):.0%} cpu "
+                f"({resources['user_cpu_s']:.2f}s user, "
+                f"{resources['system_cpu_s']:.2f}s sys, "
+                f"in {job_time.total_seconds():.2f}s), "
+                f"peak {_format_bytes(resources.get('max_rss_bytes', 0))}, "
+                f"{resources['block_reads']} blocks read, "
+                f"{resources['block_writes']} written, "
+                f"{resources['voluntary_ctx_switches']} waits, "
+                f"{resources['involuntary_ctx_switches']} preemptions"
+            )
+
+
+def _print_timed_out(timing_data: JobRunTimesByPhase) -> None:
+    """Logs the jobs that were stopped as they ran for longer than their timeout."""
+    for job_timing in timing_data.get("_timed_out", []):
+        job_label, timeout = job_timing["job"]
+        log(
+            f"[red]timed out[/red]: [blue]{job_label}[/blue]: stopped after "
+            f"{timeout.total_seconds()}s"
+        )
+
+
 def _print_reports_by_phase(
     phase_run_oder: OrderedPhases, report_data: JobRunReportByPhase
 ) -> None:
@@ -222,9 +338,12 @@ def report_on_run(
     phase_run_oder: OrderedPhases,
     job_run_metadatas: JobRunMetadatasByPhase,
     wall_clock_for_runem_main: timedelta,
+    verbose: bool = False,
 ) -> typing.Tuple[timedelta, timedelta]:
     """Generate high-level reports AND prints out any reports returned by jobs.
 
+    With `verbose` the resources each job's commands used are shown too.
+
     IMPORTANT: returns the wall-clock time saved to the user.
     """
     log("reports:")
@@ -250,6 +369,16 @@ def report_on_run(
         timing_data=timing_data,
     )
 
+    # Then what the jobs' commands spent their time on, a line per job
+    if verbose:
+        _print_resource_usage(timing_data)
+
+    # Then how well the job-cache did, if it was used
+    _print_cache_stats(timing_data)
+
+    # Jobs that hung, or were just too slow, aren't in the timings above
+    _print_timed_out(timing_data)
+
     # Penultimate-ly print out the available reports grouped by run-phase.
     _print_reports_by_phase(phase_run_oder, report_data)
 
@@ -1,17 +1,56 @@
+import codecs
+import collections
+import contextlib
+import io
 import os
 import pathlib
+import signal
+import sys
+import tempfile
+import threading
 import typing
 from subprocess import PIPE as SUBPROCESS_PIPE
 from subprocess import STDOUT as SUBPROCESS_STDOUT
-from subprocess import Popen
+from subprocess import Popen, TimeoutExpired
 
 from rich.markup import escape
 
 from runem.log import log
 from runem.timer import RecordSubJobTimeType, runem_timer
+from runem.types.types_jobs import (
+    CommandResources,
+    RecordSubJobOutputType,
+    RecordSubJobResourcesType,
+)
 
 TERMINAL_WIDTH = 86
 
+# How long a command gets to exit, after SIGTERM, before we SIGKILL it
+STOP_GRACE_PERIOD_S = 5.0
+
+# How much of a command's output `command` jobs keep in memory, for the error
+# report. The full output goes to a temp file.
+OUTPUT_TAIL_CHARS = 256 * 1024
+
+# How much of a command's output to read at a time, when streaming it
+_READ_CHUNK_BYTES = 64 * 1024
+
+# Popen args to start commands in their own process-group, so that we can stop
+# everything they start. Unlike `start_new_session` they stay in our session, so
+# keep the controlling terminal, for tools that size their output to it or
+# prompt on it.
+_NEW_PROCESS_GROUP: typing.Dict[str, typing.Any] = (
+    {"process_group": 0}
+    if sys.version_info >= (3, 11)
+    else {"preexec_fn": os.setpgrp}
+    if hasattr(os, "setpgrp")
+    else {}
+)
+
+# The commands being run, by any thread, so that they can all be stopped
+_RUNNING_PROCESSES: typing.Set["Popen[str]"] = set()
+_RUNNING_PROCESSES_LOCK = threading.Lock()
+
 
 class RunemJobError(RuntimeError):
     """An exception type that stores the stdout/stderr.
@@ -35,6 +74,28 @@ class RunCommandUnhandledError(RunemJobError):
         super().__init__(friendly_message="Unhandled job error", stdout=stdout)
 
 
+class RunemJobTimeoutError(RunemJobError):
+    """Raised, in the job, when it runs for longer than its timeout.
+
+    See `ctx.timeout_s` and `--job-timeout`.
+    """
+
+    def __init__(self, label: str, timeout_s: float) -> None:
+        self.label = label
+        self.timeout_s = timeout_s
+        super().__init__(
+            friendly_message=f"Timed out after {timeout_s}s",
+            stdout=(
+                f"runem: [red bold]TIMEOUT[/red bold]: job [blue]{label}[/blue] ran "
+                f"for longer than its {timeout_s}s timeout, so was stopped"
+            ),
+        )
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        """Pickles the error, to send it from the job's worker back to runem."""
+        return (self.__class__, (self.label, self.timeout_s))
+
+
 class RunemJobInternalError(RuntimeError):  # pragma: no cover
     """An exception type that is not ignorable and has right information."""
 
@@ -127,47 +188,115 @@ def _log_command_execution(
             log(f"cwd: {str(cwd)}", prefix=decorate_logs)
 
 
-def _watch_process(
+def _max_rss_bytes(ru_maxrss: int) -> int:
+    """Converts `ru_maxrss` to bytes, it is in kilobytes everywhere but macOS."""
+    if sys.platform == "darwin":  # pragma: no cover
+        return ru_maxrss
+    return ru_maxrss * 1024
+
+
+def _reap_process(process: Popen[str]) -> typing.Optional[CommandResources]:
+    """Waits for the command to exit, returning the resources it used.
+
+    Returns None if the platform can't tell us, or something else reaped it.
+    """
+    if hasattr(os, "wait4"):
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:  # pragma: no cover
+            pass  # already reaped, e.g. by a signal handler
+        else:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return {
+                "max_rss_bytes": _max_rss_bytes(rusage.ru_maxrss),
+                "user_cpu_s": rusage.ru_utime,
+                "system_cpu_s": rusage.ru_stime,
+                "block_reads": rusage.ru_inblock,
+                "block_writes": rusage.ru_oublock,
+                "voluntary_ctx_switches": rusage.ru_nvcsw,
+                "involuntary_ctx_switches": rusage.ru_nivcsw,
+            }
+    process.wait()  # pragma: no cover
+    return None  # pragma: no cover
+
+
+def log_command_stdout(label: str, stdout: str) -> None:
+    """Logs a command's stdout, each line prefixed with the command's label.
+
+    The lines are logged as one message, so that they stay together when jobs
+    run in parallel.
+    """
+    if not stdout:
+        return
+    log(
+        parse_stdout(
+            stdout,
+            prefix=f"[green]| [/green][blue]{label}[/blue]: ",
+        ),
+        prefix=False,
+    )
+
+
+class _OutputTail:
+    """A ring-buffer of the last `max_chars` of a command's output."""
+
+    def __init__(self, max_chars: int) -> None:
+        self.max_chars = max_chars
+        self._chunks: typing.Deque[str] = collections.deque()
+        self._size: int = 0
+        self._dropped: bool = False
+
+    def append(self, text: str) -> None:
+        """Adds `text`, dropping the oldest chunks we no longer need."""
+        self._chunks.append(text)
+        self._size += len(text)
+        while self._size - len(self._chunks[0]) >= self.max_chars:
+            self._size -= len(self._chunks.popleft())
+            self._dropped = True
+
+    @property
+    def truncated(self) -> bool:
+        """True if the output was longer than `max_chars`."""
+        return self._dropped or self._size > self.max_chars
+
+    def getvalue(self) -> str:
+        """Returns the tail, starting at a whole line if it was truncated."""
+        tail: str = "".join(self._chunks)
+        if not self.truncated:
+            return tail
+        tail = tail[-self.max_chars :]
+        first_line_end: int = tail.find("\n")
+        if first_line_end != -1:
+            tail = tail[first_line_end + 1 :]
+        return tail
+
+
+def _communicate(
     label: str,
     process: Popen[str],
     verbose: bool,
 ) -> str:
-    """Watches a job-process capturing all stdout and stderr.
+    """Captures all of stdout and stderr, when stderr has its own pipe.
 
-    The main intent of this function is to marshall stdio so that the various
-    buffers do not get full and cause a hang.
+    `communicate()` consumes BOTH stdout and stderr atomically and safely, so
+    there are no partial reads and no deadlocks, but the output is only logged
+    once the process has exited.
     """
-    if process.stdout is None:  # pragma: no cover
-        raise RunemJobInternalError("Process must be started with stdout=PIPE.")
-
-    # This consumes BOTH stdout and stderr atomically and safely.
-    # No partial reads → no deadlocks.
+    stdout: str
+    stderr: typing.Optional[str]
     stdout, stderr = process.communicate()
-
-    # Stream stdout after we have it.
-    # This removes the risk of blocking on partial reads.
     if verbose:
-        for line in stdout.splitlines(keepends=True):
+        log_command_stdout(label, stdout)
+        if stderr:
             log(
                 parse_stdout(
-                    line,
-                    prefix=f"[green]| [/green][blue]{label}[/blue]: ",
+                    stderr,
+                    prefix=f"[red]! [/red][blue]{label} stderr[/blue]: ",
                 ),
                 prefix=False,
             )
 
-        if stderr:
-            for line in stderr.splitlines(keepends=True):
-                log(
-                    parse_stdout(
-                        line,
-                        prefix=f"[red]! [/red][blue]{label} stderr[/blue]: ",
-                    ),
-                    prefix=False,
-                )
-
     stdio: str = ""
-    # assert process.text_mode, "proc should be configured for text over bytes"
     if stdout is not None:  # pragma: no cover
         stdio += str(stdout)
     if stderr is not None:  # pragma: no cover
@@ -177,6 +306,140 @@ def _watch_process(
     return stdio
 
 
+def _watch_process(
+    label: str,
+    process: Popen[str],
+    verbose: bool,
+    tail_chars: typing.Optional[int] = None,
+) -> typing.Tuple[
+    str, typing.Optional[CommandResources], typing.Optional[pathlib.Path]
+]:
+    """Watches a job-process, capturing its output as it comes.
+
+    The main intent of this function is to marshall stdio so that the pipe does
+    not get full and cause a hang. stderr is merged into stdout, so there is one
+    pipe to read and reading it can't deadlock. Each read returns as soon as
+    there is any output, up to _READ_CHUNK_BYTES of it. On `verbose` whole lines
+    are logged as they arrive, so that slow jobs show their progress.
+
+    If `tail_chars` is given, only the last `tail_chars` of the output are kept
+    in memory, in a ring-buffer, and all of it is written to a temp file.
+
+    Returns the output, or its tail, the resources the process used, if we can
+    measure them, and, if the tail isn't all of the output, the path of the temp
+    file holding all of it, which the caller should remove.
+    """
+    if process.stdout is None:  # pragma: no cover
+        raise RunemJobInternalError("Process must be started with stdout=PIPE.")
+    if process.stderr is not None:
+        return _communicate(label, process, verbose), None, None
+
+    # read the raw bytes, avoiding the copies the text-layer makes, and decode
+    # them as the text-layer would.
+    text_pipe: typing.TextIO = typing.cast(typing.TextIO, process.stdout)
+    pipe_fd: int = text_pipe.fileno()
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(text_pipe.encoding)(
+            errors=text_pipe.errors or "strict"
+        ),
+        translate=True,
+    )
+    captured: _OutputTail = _OutputTail(
+        tail_chars if tail_chars is not None else sys.maxsize
+    )
+    unlogged: str = ""
+    spill_path: typing.Optional[pathlib.Path] = None
+    spill_file: typing.Optional[typing.IO[bytes]] = None
+    if tail_chars is not None:
+        spill_file = tempfile.NamedTemporaryFile(  # pylint: disable=consider-using-with
+            "wb", prefix="runem-output-", suffix=".log", delete=False
+        )
+        spill_path = pathlib.Path(spill_file.name)
+    try:
+        try:
+            while True:
+                chunk: bytes = os.read(pipe_fd, _READ_CHUNK_BYTES)
+                finished: bool = not chunk
+                if spill_file is not None:
+                    spill_file.write(chunk)
+                text: str = decoder.decode(chunk, final=finished)
+                captured.append(text)
+                if verbose:
+                    unlogged += text
+                    # log whole lines, or everything if there are no more lines
+                    # or the line is unreasonably long.
+                    log_up_to: int = unlogged.rfind("\n") + 1
+                    if finished or len(unlogged) >= _READ_CHUNK_BYTES:
+                        log_up_to = len(unlogged)
+                    if log_up_to:
+                        log_command_stdout(label, unlogged[:log_up_to])
+                        unlogged = unlogged[log_up_to:]
+                if finished:
+                    break
+        finally:
+            if spill_file is not None:
+                spill_file.close()
+        # We reap the process ourselves, via wait4(), to get its resource usage.
+        resources: typing.Optional[CommandResources] = _reap_process(process)
+    except BaseException:
+        _remove_spill_file(spill_path)
+        raise
+    if not captured.truncated:
+        # we have all of it
+        _remove_spill_file(spill_path)
+        return captured.getvalue(), resources, None
+    return captured.getvalue(), resources, spill_path
+
+
+def _remove_spill_file(spill_path: typing.Optional[pathlib.Path]) -> None:
+    if spill_path is not None:
+        with contextlib.suppress(OSError):
+            os.remove(spill_path)
+
+
+def _signal_process_group(process: Popen[str], sig: int) -> None:
+    """Sends `sig` to the command and to any processes it started."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, sig)
+        else:  # pragma: no cover
+            # no process-groups on this platform, just signal the command
+            process.send_signal(sig)
+    except ProcessLookupError:
+        # already gone
+        pass
+
+
+def stop_process(
+    process: Popen[str], grace_period_s: float = STOP_GRACE_PERIOD_S
+) -> None:
+    """Stops a still-running command, and its process group.
+
+    Sends SIGTERM so that the command can tidy up, then SIGKILL if it hasn't
+    exited after `grace_period_s`.
+    """
+    _signal_process_group(process, signal.SIGTERM)
+    try:
+        process.wait(timeout=grace_period_s)
+    except TimeoutExpired:
+        _signal_process_group(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+        process.wait()
+
+
+def stop_running_commands() -> None:
+    """Stops every command that is still running, e.g. on other threads.
+
+    Commands run on the main thread are stopped by run_command() itself when
+    the job is stopped, this is for commands run on other threads, which can't
+    see the job being stopped.
+    """
+    with _RUNNING_PROCESSES_LOCK:
+        processes: typing.List[Popen[str]] = list(_RUNNING_PROCESSES)
+    for process in processes:
+        if process.returncode is None:
+            stop_process(process)
+
+
 def run_command(  # noqa: C901
     cmd: typing.List[str],  # 'cmd' is the only thing that can't be optionally kwargs
     label: str,
@@ -186,10 +449,19 @@ def run_command(  # noqa: C901
     valid_exit_ids: typing.Optional[typing.Tuple[int, ...]] = None,
     cwd: typing.Optional[pathlib.Path] = None,
     record_sub_job_time: typing.Optional[RecordSubJobTimeType] = None,
+    record_sub_job_resources: typing.Optional[RecordSubJobResourcesType] = None,
+    record_sub_job_output: typing.Optional[RecordSubJobOutputType] = None,
     decorate_logs: bool = True,
+    capture_tail_chars: typing.Optional[int] = None,
     **kwargs: typing.Any,
 ) -> str:
-    """Runs the given command, returning stdout or throwing on any error."""
+    """Runs the given command, returning stdout or throwing on any error.
+
+    By default all of the command's output is kept in memory and returned. Set
+    `capture_tail_chars` for commands with a lot of output, to only keep, and
+    return, the last `capture_tail_chars` of it. On errors, the full output is
+    left in a temp file, named in the error.
+    """
     with runem_timer(label, record_sub_job_time):
         cmd_string = " ".join(cmd)
 
@@ -213,6 +485,7 @@ def run_command(  # noqa: C901
         # convert the command to a list of strings.
         process: typing.Optional[Popen[str]] = None
         stdout: str = ""
+        spill_path: typing.Optional[pathlib.Path] = None
 
         try:
             process = Popen(  # pylint: disable=consider-using-with
@@ -224,14 +497,23 @@ def run_command(  # noqa: C901
                 text=True,
                 bufsize=1,  # buffer it for every character return
                 universal_newlines=True,
+                **_NEW_PROCESS_GROUP,
             )
             assert process.stdout is not None  # for type checkers
+            with _RUNNING_PROCESSES_LOCK:
+                _RUNNING_PROCESSES.add(process)
 
-            stdout += _watch_process(
+            command_stdout: str
+            resources: typing.Optional[CommandResources]
+            command_stdout, resources, spill_path = _watch_process(
                 label,
                 process,
                 verbose,
+                capture_tail_chars,
             )
+            stdout += command_stdout
+            if record_sub_job_resources is not None and resources is not None:
+                record_sub_job_resources(label, resources)
 
             if process.returncode not in valid_exit_ids:
                 valid_exit_strs = ",".join(
@@ -243,6 +525,13 @@ def run_command(  # noqa: C901
                         f"[green]{valid_exit_strs}[/green]) from {cmd_string}"
                     )
                 )
+        except (KeyboardInterrupt, SystemExit, RunemJobTimeoutError):
+            # runem is stopping this job, e.g. on --fail-fast or as it timed out,
+            # so stop the command and get out of the way.
+            if process is not None and process.returncode is None:
+                stop_process(process)
+            _remove_spill_file(spill_path)
+            raise
         except RunemJobInternalError:  # pragma: no cover
             # Treat *internal runem* errors as systemic errors.
             # ... so we do not allow silent-erroring.
@@ -250,7 +539,10 @@ def run_command(  # noqa: C901
             raise  # re-raise internal errors and do NOT fall through
         except BaseException as err:
             # A non-internal error occurred, make it user friendly.
+            if process is not None and process.returncode is None:
+                stop_process(process)
             if ignore_fails:
+                _remove_spill_file(spill_path)
                 return ""
             parsed_stdout: str = (
                 parse_stdout(stdout, prefix="[red]| [/red]") if process else ""
@@ -268,11 +560,24 @@ def run_command(  # noqa: C901
                 f"\n{str(parsed_stdout)}"
                 f"\n[red underline]| ERROR END[/red underline]: [blue]{label}[/blue]"
             )
+            if spill_path is not None:
+                error_string += (
+                    f"\n[yellow]only the end of the output is shown, all of it is in "
+                    f"{str(spill_path)}[/yellow]"
+                )
 
             if isinstance(err, RunCommandBadExitCode):
                 raise RunCommandBadExitCode(error_string) from err
             # fallback to raising a RunCommandUnhandledError
             raise RunCommandUnhandledError(error_string) from err
+        finally:
+            if process is not None:
+                with _RUNNING_PROCESSES_LOCK:
+                    _RUNNING_PROCESSES.discard(process)
+
+        _remove_spill_file(spill_path)
+        if record_sub_job_output is not None:
+            record_sub_job_output(label, stdout)
 
         if verbose:
             log(
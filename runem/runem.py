@@ -2,20 +2,17 @@
 """`runem`, runs Lursight's dev-ops tools, hopefully as fast as possible.
 
 We don't yet:
-- account for load
 - check for diffs in code to only test changed code
 - do any git-related stuff, like:
   - compare head to merge-target branch
   - check for changed files
-- support non-git repos
-- not stream stdout to terminal
-- have inter-job dependencies as that requires a smarter scheduler, we workaround
-  this with phases, for now
 
 We do:
-- use git ls-files
+- use git ls-files, or walk the filesystem for non-git projects
 - run as many jobs as possible
-- hope that resources are enough i.e. we DO NOT measure resource use, yet.
+- run jobs in phases, or as soon as the jobs they depend on are done
+- hold back starting jobs whilst the host's CPUs or memory are saturated, going
+  by the load-average and pressure-stall info.
 - time tests and tell you what used the most time, and how much time run-tests saved
   you
 """
@@ -25,34 +22,55 @@ import multiprocessing
 import os
 import pathlib
 import sys
-import time
 import typing
 from collections import defaultdict
 from datetime import timedelta
-from itertools import repeat
-from multiprocessing.managers import DictProxy, ValueProxy
 from timeit import default_timer as timer
 
-from rich.spinner import Spinner
-from rich.status import Status
 from rich.text import Text
 
-from runem.blocking_print import RICH_CONSOLE
+from runem.blocking_print import RICH_CONSOLE, blocking_print
 from runem.command_line import error_on_log_logic, parse_args
-from runem.config import load_project_config, load_user_configs
+from runem.config_cache import load_cached_config_metadata
 from runem.config_metadata import ConfigMetadata
-from runem.config_parse import load_config_metadata
 from runem.files import find_files
-from runem.job_execute import job_execute
+from runem.host_load import AdmissionController
+from runem.job import Job
+from runem.job_executor import JobExecutor
 from runem.job_filter import filter_jobs
+from runem.job_history import (
+    JobHistory,
+    load_job_history,
+    save_job_history,
+    update_job_history,
+)
+from runem.job_progress import JobEvent, OutputEvent, ProgressEvent, ProgressEvents
+from runem.job_scheduler import (
+    JobDependencies,
+    JobDependencyCycle,
+    PhasedJobs,
+    longest_first_order,
+    memory_estimates,
+    phased_job_dependencies,
+    uses_job_dependencies,
+)
+from runem.job_shard import (
+    ShardedJobs,
+    count_tasks,
+    merge_shard_results,
+    shard_dependencies,
+    shard_jobs,
+    shard_priority_order,
+)
 from runem.log import error, log, warn
 from runem.report import report_on_run
 from runem.run_command import RunemJobError
+from runem.state_dir import find_state_dir
 from runem.types.common import OrderedPhases, PhaseName
 from runem.types.errors import SystemExitBad
 from runem.types.filters import FilePathListLookup
 from runem.types.hooks import HookName
-from runem.types.runem_config import Config, Jobs, PhaseGroupedJobs
+from runem.types.runem_config import Jobs, PhaseGroupedJobs
 from runem.types.types_jobs import (
     JobReturn,
     JobRunMetadata,
@@ -76,12 +94,8 @@ def _determine_run_parameters(argv: typing.List[str]) -> ConfigMetadata:
     silent = ("--silent" in argv) or ("-s" in argv)
     error_on_log_logic(verbose, silent)
 
-    config: Config
-    cfg_filepath: pathlib.Path
-    config, cfg_filepath = load_project_config()
-    user_configs: typing.List[typing.Tuple[Config, pathlib.Path]] = load_user_configs()
-    config_metadata: ConfigMetadata = load_config_metadata(
-        config, cfg_filepath, user_configs, silent, verbose=("--verbose" in argv)
+    config_metadata: ConfigMetadata = load_cached_config_metadata(
+        silent, verbose=("--verbose" in argv)
     )
 
     # Now we parse the cli arguments extending them with information from the
@@ -89,34 +103,41 @@ def _determine_run_parameters(argv: typing.List[str]) -> ConfigMetadata:
     config_metadata = parse_args(config_metadata, argv)
 
     if config_metadata.args.verbose:
-        log(f"loaded config from {cfg_filepath}")
+        log(f"loaded config from {config_metadata.cfg_filepath}")
 
     return config_metadata
 
 
 def _update_progress(
     phase: str,
-    running_jobs: typing.Dict[str, str],
-    completed_jobs: typing.Dict[str, str],
+    events: ProgressEvents,
     all_jobs: Jobs,
-    is_running: ValueProxy[bool],
     num_workers: int,
     show_spinner: bool,
 ) -> None:
-    """Updates progress report periodically for running tasks.
+    """Shows the progress of the running tasks, as the workers report it.
+
+    Blocks on the stream of job events, so it only does work when something has
+    changed, until it reads the None event. Also prints the workers' log
+    messages, including the output of commands as it happens.
 
     Args:
         phase (str): The currently running phase.
-        running_jobs (Dict[str, str]): The currently running jobs.
-        completed_jobs (Dict[str, str]): The jobs that have finished work.
+        events (ProgressEvents): The job start/finish events, and log messages,
+            from the workers.
         all_jobs (Jobs): All jobs, encompassing both completed and running jobs.
-        is_running (ValueProxy[bool]): Flag indicating if jobs are still running.
         num_workers (int): Indicates the number of workers performing the jobs.
         show_spinner (bool): Whether to show the animated spinner or not.
     """
+    running_jobs: typing.Dict[int, str] = {}
+    num_completed: int = 0
     last_running_jobs_set: typing.Set[str] = set()
 
-    # Using the `rich` module to show a loading spinner on console
+    # Using the `rich` module to show a loading spinner on console, imported
+    # here as only the progress display uses it, see `runem.cli`.
+    from rich.spinner import Spinner  # pylint: disable=import-outside-toplevel
+    from rich.status import Status  # pylint: disable=import-outside-toplevel
+
     spinner_ctx: typing.Union[Status, typing.ContextManager[None]] = (
         RICH_CONSOLE.status(Spinner("dots", text="Starting tasks..."))
         if show_spinner
@@ -124,11 +145,26 @@ def _update_progress(
     )
 
     with spinner_ctx:
-        while is_running.value:
+        while True:
+            event: typing.Optional[ProgressEvent] = events.get()
+            if event is None:
+                break
+            if len(event) == 2:
+                # a job's log message, printed above the spinner
+                msg, end = typing.cast(OutputEvent, event)
+                blocking_print(msg, end=end)
+                continue
+            job_id, label, finished = typing.cast(JobEvent, event)
+            if finished:
+                running_jobs.pop(job_id, None)
+                num_completed += 1
+            else:
+                running_jobs[job_id] = label
+
             running_jobs_set: typing.Set[str] = set(running_jobs.values())
 
             # Progress report
-            progress: str = f"{len(completed_jobs)}/{len(all_jobs)}"
+            progress: str = f"{num_completed}/{len(all_jobs)}"
             running_jobs_list = printable_set_coloured(
                 running_jobs_set,
                 "blue",
@@ -145,8 +181,28 @@ def _update_progress(
                     RICH_CONSOLE.log(report)
                     last_running_jobs_set = running_jobs_set
 
-            # Sleep for reduced CPU usage
-            time.sleep(0.1)
+
+def _max_num_concurrent_procs(config_metadata: ConfigMetadata) -> int:
+    """The max number of jobs to run at once, from the cli or the core-count."""
+    max_num_concurrent_procs: int = (
+        config_metadata.args.procs
+        if config_metadata.args.procs != -1
+        else multiprocessing.cpu_count()
+    )
+    return max_num_concurrent_procs
+
+
+def _memory_estimates(
+    config_metadata: ConfigMetadata,
+    jobs: Jobs,
+    job_history: typing.Optional[JobHistory],
+    num_concurrent_procs: int,
+) -> typing.Optional[typing.List[int]]:
+    """The peak memory we expect each job to use, when `--mem-budget` is set."""
+    mem_budget: typing.Optional[int] = config_metadata.args.mem_budget
+    if mem_budget is None:
+        return None
+    return memory_estimates(jobs, job_history or {}, mem_budget, num_concurrent_procs)
 
 
 def _process_jobs(
@@ -156,24 +212,28 @@ def _process_jobs(
     phase: PhaseName,
     jobs: Jobs,
     show_spinner: bool,
+    job_history: typing.Optional[JobHistory] = None,
+    executor: typing.Optional[JobExecutor] = None,
 ) -> typing.Optional[RunemJobError]:
     """Execute each given job asynchronously.
 
     This is where the major real-world time savings happen, and it could be
     better, much, much better.
 
-    TODO: this is where we do the scheduling, if we wanted to be smarter about
-          it and, for instance, run the longest-running job first with quicker
-          jobs completing around it, then we would work out that schedule here.
+    Jobs are started longest-running first, according to the `job_history`, so
+    that quicker jobs complete around them. The results are still recorded in
+    config order.
+
+    The jobs are run on the `executor`'s workers, which are shared between
+    phases. If no executor is given one is created just for these jobs.
 
     returns the exception if the any of sub-procs fails, None otherwise
     """
-    max_num_concurrent_procs: int = (
-        config_metadata.args.procs
-        if config_metadata.args.procs != -1
-        else multiprocessing.cpu_count()
+    max_num_concurrent_procs: int = _max_num_concurrent_procs(config_metadata)
+    num_concurrent_procs: int = min(
+        max_num_concurrent_procs,
+        count_tasks(jobs, file_lists, max_num_concurrent_procs),
     )
-    num_concurrent_procs: int = min(max_num_concurrent_procs, len(jobs))
     log(
         (
             f"Running '[green]{phase}[/green]' with {num_concurrent_procs} workers (of "
@@ -181,56 +241,210 @@ def _process_jobs(
         )
     )
 
-    subprocess_error: typing.Optional[RunemJobError] = None
-
-    with multiprocessing.Manager() as manager:
-        running_jobs: DictProxy[typing.Any, typing.Any] = manager.dict()
-        completed_jobs: DictProxy[typing.Any, typing.Any] = manager.dict()
-        is_running: ValueProxy[bool] = manager.Value("b", True)
-
-        terminal_writer_process = multiprocessing.Process(
-            target=_update_progress,
-            args=(
-                phase,
-                running_jobs,
-                completed_jobs,
-                jobs,
-                is_running,
-                num_concurrent_procs,
-                show_spinner,
-            ),
+    schedule: typing.List[int] = longest_first_order(jobs, job_history or {})
+    scheduled_jobs: Jobs = [jobs[job_idx] for job_idx in schedule]
+    if config_metadata.args.verbose and schedule != list(range(len(jobs))):
+        log(
+            f"scheduled '[green]{phase}[/green]' longest-first: "
+            f"{', '.join(Job.get_job_name(job) for job in scheduled_jobs)}"
         )
-        terminal_writer_process.start()
 
+    subprocess_error: typing.Optional[RunemJobError] = None
+
+    with contextlib.ExitStack() as exit_stack:
         try:
-            with multiprocessing.Pool(processes=num_concurrent_procs) as pool:
-                # use starmap so we can pass down the job-configs and the args and the files
-                in_out_job_run_metadatas[phase] = pool.starmap(
-                    job_execute,  # no kwargs passed for jobs here
-                    zip(
-                        jobs,
-                        repeat(running_jobs),
-                        repeat(completed_jobs),
-                        repeat(config_metadata),
-                        repeat(file_lists),
-                    ),
-                )
+            if executor is None:
+                executor = exit_stack.enter_context(JobExecutor(num_concurrent_procs))
         except RunemJobError as err:  # pylint: disable=broad-exception-caught
-            subprocess_error = err
-        finally:
-            # Signal the terminal_writer process to exit
-            is_running.value = False
-            terminal_writer_process.join()
+            return err
+
+        # jobs within a phase have no dependencies on each other
+        job_run_metadatas: typing.List[typing.Optional[JobRunMetadata]]
+        job_run_metadatas, subprocess_error = _run_jobs(
+            executor,
+            phase,
+            config_metadata,
+            file_lists,
+            jobs,
+            {},
+            schedule,
+            num_concurrent_procs,
+            show_spinner,
+            job_history,
+        )
+        if subprocess_error is None:
+            # results are in config order, for deterministic reports
+            in_out_job_run_metadatas[phase] = [
+                job_run_metadata
+                for job_run_metadata in job_run_metadatas
+                if job_run_metadata is not None
+            ]
+
+    return subprocess_error
+
+
+def _process_jobs_by_dependency(
+    config_metadata: ConfigMetadata,
+    file_lists: FilePathListLookup,
+    in_out_job_run_metadatas: JobRunMetadatasByPhase,
+    phased_jobs: PhasedJobs,
+    dependencies: JobDependencies,
+    show_spinner: bool,
+    executor: JobExecutor,
+    job_history: typing.Optional[JobHistory] = None,
+) -> typing.Optional[RunemJobError]:
+    """Execute all jobs at once, each as soon as the jobs it depends on are done.
 
+    Of the jobs that are ready to run the longest-running are started first. The
+    results are recorded against each job's phase, in config order.
+
+    returns the exception if the any of sub-procs fails, None otherwise
+    """
+    jobs: Jobs = [job for _, job in phased_jobs]
+    max_num_concurrent_procs: int = _max_num_concurrent_procs(config_metadata)
+    num_concurrent_procs: int = min(
+        max_num_concurrent_procs,
+        count_tasks(jobs, file_lists, max_num_concurrent_procs),
+    )
+    log(
+        (
+            f"Running {len(jobs)} jobs by dependency with {num_concurrent_procs} "
+            f"workers (of {max_num_concurrent_procs} max)"
+        )
+    )
+
+    schedule: typing.List[int] = longest_first_order(jobs, job_history or {})
+    job_run_metadatas: typing.List[typing.Optional[JobRunMetadata]]
+    subprocess_error: typing.Optional[RunemJobError]
+    job_run_metadatas, subprocess_error = _run_jobs(
+        executor,
+        "jobs",
+        config_metadata,
+        file_lists,
+        jobs,
+        dependencies,
+        schedule,
+        num_concurrent_procs,
+        show_spinner,
+        job_history,
+    )
+
+    for (phase, _), job_run_metadata in zip(phased_jobs, job_run_metadatas):
+        if job_run_metadata is not None:
+            in_out_job_run_metadatas.setdefault(phase, []).append(job_run_metadata)
     return subprocess_error
 
 
+def _run_jobs(
+    executor: JobExecutor,
+    label: str,
+    config_metadata: ConfigMetadata,
+    file_lists: FilePathListLookup,
+    jobs: Jobs,
+    dependencies: JobDependencies,
+    schedule: typing.List[int],
+    num_concurrent_procs: int,
+    show_spinner: bool,
+    job_history: typing.Optional[JobHistory],
+) -> typing.Tuple[
+    typing.List[typing.Optional[JobRunMetadata]], typing.Optional[RunemJobError]
+]:
+    """Runs the jobs on the `executor`, showing their progress.
+
+    Jobs with `ctx.shard` config are run as a task per shard, and their results
+    merged, see `runem.job_shard`. The results are in the order of `jobs`.
+    """
+    max_num_concurrent_procs: int = _max_num_concurrent_procs(config_metadata)
+    sharded: ShardedJobs = shard_jobs(
+        jobs,
+        file_lists,
+        max_num_concurrent_procs,
+        config_metadata.cfg_filepath.parent,
+    )
+    tasks: Jobs = sharded["tasks"]
+    if config_metadata.args.verbose and len(tasks) != len(jobs):
+        log(f"sharded {len(jobs)} jobs into {len(tasks)} tasks")
+    with _progress_reporter(executor, label, tasks, num_concurrent_procs, show_spinner):
+        task_run_metadatas: typing.List[typing.Optional[JobRunMetadata]]
+        subprocess_error: typing.Optional[RunemJobError]
+        task_run_metadatas, subprocess_error = executor.run_jobs(
+            tasks,
+            shard_dependencies(sharded, dependencies),
+            shard_priority_order(sharded, schedule),
+            num_concurrent_procs,
+            config_metadata,
+            file_lists,
+            fail_fast=config_metadata.args.fail_fast,
+            cpu_budget=max_num_concurrent_procs,
+            mem_budget=config_metadata.args.mem_budget,
+            memory_estimates=_memory_estimates(
+                config_metadata, tasks, job_history, num_concurrent_procs
+            ),
+            shards=sharded["shards"],
+        )
+        if subprocess_error is not None and config_metadata.args.fail_fast:
+            # stop the jobs that are still running before we stop reading their
+            # progress, and output, so that they never block writing it
+            executor.stop_jobs()
+    return merge_shard_results(sharded, len(jobs), task_run_metadatas), subprocess_error
+
+
+@contextlib.contextmanager
+def _progress_reporter(
+    executor: JobExecutor,
+    label: str,
+    jobs: Jobs,
+    num_workers: int,
+    show_spinner: bool,
+) -> typing.Iterator[None]:
+    """Shows the progress of the `jobs` for as long as the context is open."""
+    terminal_writer_process = multiprocessing.Process(
+        target=_update_progress,
+        args=(
+            label,
+            executor.progress_events,
+            jobs,
+            num_workers,
+            show_spinner,
+        ),
+    )
+    terminal_writer_process.start()
+    try:
+        yield
+    finally:
+        # Signal the terminal_writer process to exit
+        executor.progress_events.put(None)
+        terminal_writer_process.join()
+
+
+def _num_workers_for_run(
+    config_metadata: ConfigMetadata,
+    filtered_jobs_by_phase: PhaseGroupedJobs,
+    file_lists: FilePathListLookup,
+) -> int:
+    """The number of workers needed by the busiest phase."""
+    max_num_concurrent_procs: int = _max_num_concurrent_procs(config_metadata)
+    return max(
+        (
+            min(
+                max_num_concurrent_procs,
+                count_tasks(
+                    filtered_jobs_by_phase[phase], file_lists, max_num_concurrent_procs
+                ),
+            )
+            for phase in config_metadata.phases
+        ),
+        default=0,
+    )
+
+
 def _process_jobs_by_phase(
     config_metadata: ConfigMetadata,
     file_lists: FilePathListLookup,
     filtered_jobs_by_phase: PhaseGroupedJobs,
     in_out_job_run_metadatas: JobRunMetadatasByPhase,
     show_spinner: bool,
+    job_history: typing.Optional[JobHistory] = None,
 ) -> typing.Optional[RunemJobError]:
     """Execute each job asynchronously, grouped by phase.
 
@@ -240,36 +454,140 @@ def _process_jobs_by_phase(
     a quick and dirty solution up and running, Phases are probably a very good
     idea and easy to grasp.
 
-    TODO: augment (NOT REPLACE) with dependency graph. New users and hacker
-          dev-ops/SREs find phases useful and, more importantly, quick to
-          implement.
+    Phases are augmented, NOT REPLACED, with a dependency graph: if any job
+    declares `when.after` every job is run as soon as the jobs it depends on are
+    done, with the phases becoming dependencies for jobs that don't. New users
+    and hacker dev-ops/SREs find phases useful and, more importantly, quick to
+    implement.
+
+    The worker pool is started once and shared by all phases, its start-up and
+    shut-down overheads are recorded against runem itself, under '_app'. As is
+    any time spent holding jobs back because the host was busy, and how busy
+    each worker was.
 
     returns the exception, if any thrown during run.
     """
-    for phase in config_metadata.phases:
-        jobs = filtered_jobs_by_phase[phase]
-        if not jobs:
-            # As previously reported, no jobs for this phase
-            continue
+    num_workers: int = _num_workers_for_run(
+        config_metadata, filtered_jobs_by_phase, file_lists
+    )
+    if num_workers == 0:
+        # As previously reported, no jobs for any phase
+        return None
 
-        if config_metadata.args.verbose:
-            log(f"Running Phase {phase}")
+    by_dependency: bool = uses_job_dependencies(
+        config_metadata.phases, filtered_jobs_by_phase
+    )
+    phased_jobs: PhasedJobs = []
+    dependencies: JobDependencies = {}
+    if by_dependency:
+        try:
+            phased_jobs, dependencies = phased_job_dependencies(
+                config_metadata.phases, filtered_jobs_by_phase
+            )
+        except JobDependencyCycle as err:
+            error(str(err))
+            raise SystemExitBad(1) from err
+        max_num_concurrent_procs: int = _max_num_concurrent_procs(config_metadata)
+        num_workers = min(
+            max_num_concurrent_procs,
+            count_tasks(
+                [job for _, job in phased_jobs], file_lists, max_num_concurrent_procs
+            ),
+        )
 
-        failure_exception: typing.Optional[RunemJobError] = _process_jobs(
-            config_metadata,
-            file_lists,
-            in_out_job_run_metadatas,
-            phase,
-            jobs,
-            show_spinner,
+    admission: typing.Optional[AdmissionController] = None
+    if config_metadata.args.load_aware:
+        admission = AdmissionController(multiprocessing.cpu_count())
+
+    start = timer()
+    executor: JobExecutor = JobExecutor(num_workers, admission)
+    end = timer()
+    app_metadatas: typing.List[JobRunMetadata] = in_out_job_run_metadatas.setdefault(
+        "_app", []
+    )
+    app_metadatas.append(
+        (
+            {"job": ("executor-start", timedelta(seconds=end - start)), "commands": []},
+            None,
         )
-        if failure_exception is not None:
-            if config_metadata.args.verbose:
-                error(f"running phase {phase}: aborting run")
-            return failure_exception
+    )
 
-    # ALl phases completed aok.
-    return None
+    failure_exception: typing.Optional[RunemJobError] = None
+    try:
+        if by_dependency:
+            failure_exception = _process_jobs_by_dependency(
+                config_metadata,
+                file_lists,
+                in_out_job_run_metadatas,
+                phased_jobs,
+                dependencies,
+                show_spinner,
+                executor,
+                job_history,
+            )
+        else:
+            for phase in config_metadata.phases:
+                jobs = filtered_jobs_by_phase[phase]
+                if not jobs:
+                    # As previously reported, no jobs for this phase
+                    continue
+
+                if config_metadata.args.verbose:
+                    log(f"Running Phase {phase}")
+
+                failure_exception = _process_jobs(
+                    config_metadata,
+                    file_lists,
+                    in_out_job_run_metadatas,
+                    phase,
+                    jobs,
+                    show_spinner,
+                    job_history,
+                    executor,
+                )
+                if failure_exception is not None:
+                    if config_metadata.args.verbose:
+                        error(f"running phase {phase}: aborting run")
+                    break
+    finally:
+        worker_utilisation: typing.List[typing.Tuple[timedelta, float]] = (
+            executor.worker_utilisation()
+        )
+        start = timer()
+        executor.close(terminate=failure_exception is not None)
+        end = timer()
+        app_metadatas.append(
+            (
+                {
+                    "job": ("executor-stop", timedelta(seconds=end - start)),
+                    "commands": [],
+                },
+                None,
+            )
+        )
+        if admission is not None and admission.throttled:
+            # time that jobs were held back because the host was busy
+            app_metadatas.append(
+                ({"job": ("throttled", admission.throttled), "commands": []}, None)
+            )
+        if executor.timed_out:
+            # reported apart from the phases, see report_on_run()
+            in_out_job_run_metadatas.setdefault("_timed_out", []).extend(
+                executor.timed_out
+            )
+        for worker_idx, (busy, utilisation) in enumerate(worker_utilisation, start=1):
+            app_metadatas.append(
+                (
+                    {
+                        "job": (f"worker-{worker_idx} ({utilisation:.0%} busy)", busy),
+                        "commands": [],
+                    },
+                    None,
+                )
+            )
+
+    # None if all phases completed aok.
+    return failure_exception
 
 
 MainReturnType = typing.Tuple[
@@ -302,6 +620,10 @@ def _main(
     filtered_jobs_by_phase: PhaseGroupedJobs = filter_jobs(
         config_metadata=config_metadata,
     )
+    state_dir: typing.Optional[pathlib.Path] = find_state_dir(
+        config_metadata.cfg_filepath
+    )
+    job_history: JobHistory = load_job_history(state_dir)
     end = timer()
 
     job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
@@ -319,10 +641,15 @@ def _main(
         filtered_jobs_by_phase,
         job_run_metadatas,
         show_spinner=config_metadata.args.show_spinner,
+        job_history=job_history,
     )
 
     end = timer()
 
+    # remember how long jobs took so the next run can schedule better
+    update_job_history(job_history, job_run_metadatas)
+    save_job_history(state_dir, job_history)
+
     phase_run_timing: JobTiming = {
         "job": ("run-phases", timedelta(seconds=end - start)),
         "commands": [],
@@ -350,7 +677,10 @@ def timed_main(argv: typing.List[str]) -> None:
     wall_clock_time_saved: timedelta
     system_time_spent: timedelta
     system_time_spent, wall_clock_time_saved = report_on_run(
-        phase_run_oder, job_run_metadatas, time_taken
+        phase_run_oder,
+        job_run_metadatas,
+        time_taken,
+        verbose=config_metadata.args.verbose,
     )
     message: str = "[green bold]DONE[/green bold]: runem took"
     if failure_exception:
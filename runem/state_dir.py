@@ -0,0 +1,66 @@
+"""Locates where runem persists state between runs.
+
+State is things like job-timing history, which runem uses to make better
+scheduling decisions on later runs.
+
+We keep state inside the `.git` dir so that it is never picked up by `git
+ls-files`, never shows up in `git status` and is naturally per-checkout.
+"""
+
+import os
+import pathlib
+import typing
+
+# Overrides the state dir, useful for ci/cd caches and for tests.
+STATE_DIR_ENV_VAR = "RUNEM_STATE_DIR"
+
+STATE_SUB_DIR = "runem"
+
+
+def find_work_tree(start_dir: pathlib.Path) -> typing.Optional[pathlib.Path]:
+    """Search 'up' from start_dir for the root of the checkout, the dir with `.git`."""
+    search_dir: pathlib.Path = start_dir.absolute()
+    while True:
+        if (search_dir / ".git").exists():
+            return search_dir
+        exhausted_stack: bool = search_dir == search_dir.parent
+        if exhausted_stack:
+            return None
+        search_dir = search_dir.parent
+
+
+def find_git_dir(start_dir: pathlib.Path) -> typing.Optional[pathlib.Path]:
+    """Search 'up' from start_dir for the `.git` dir of the checkout.
+
+    Supports work-trees and submodules, where `.git` is a file pointing at the
+    real git-dir.
+    """
+    work_tree: typing.Optional[pathlib.Path] = find_work_tree(start_dir)
+    if work_tree is None:
+        return None
+    git_candidate: pathlib.Path = work_tree / ".git"
+    if git_candidate.is_dir():
+        return git_candidate
+    git_file_contents: str = git_candidate.read_text(encoding="utf-8")
+    for line in git_file_contents.splitlines():
+        if line.startswith("gitdir:"):
+            git_dir = pathlib.Path(line[len("gitdir:") :].strip())
+            if not git_dir.is_absolute():
+                git_dir = work_tree / git_dir
+            return git_dir
+    return None
+
+
+def find_state_dir(cfg_filepath: pathlib.Path) -> typing.Optional[pathlib.Path]:
+    """Returns the dir to persist runem state in, or None if we have nowhere.
+
+    NOTE: the dir may not exist yet, writers should create it.
+    """
+    env_override: typing.Optional[str] = os.environ.get(STATE_DIR_ENV_VAR, None)
+    if env_override:
+        return pathlib.Path(env_override)
+
+    git_dir: typing.Optional[pathlib.Path] = find_git_dir(cfg_filepath.parent)
+    if git_dir is None:
+        return None
+    return git_dir / STATE_SUB_DIR
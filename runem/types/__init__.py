@@ -1,9 +1,11 @@
 from runem.types.common import FilePathList, JobName
+from runem.types.filters import FileProviderKwargs
 from runem.types.options import Options
 from runem.types.types_jobs import HookKwargs, JobKwargs, JobReturn, JobReturnData
 
 __all__ = [
     "FilePathList",
+    "FileProviderKwargs",
     "HookKwargs",
     "JobName",
     "JobReturn",
@@ -1,7 +1,11 @@
+import pathlib
 import typing
 
 from runem.types.common import FilePathList, JobTag
 
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from runem.config_metadata import ConfigMetadata
+
 
 class TagFileFilter(typing.TypedDict):
     tag: JobTag
@@ -10,3 +14,14 @@ class TagFileFilter(typing.TypedDict):
 
 TagFileFilters = typing.Dict[JobTag, TagFileFilter]
 FilePathListLookup = typing.DefaultDict[JobTag, FilePathList]
+
+
+class FileProviderKwargs(typing.TypedDict):
+    """The kwargs passed to file-provider functions."""
+
+    config_metadata: "ConfigMetadata"  # the config, e.g. for `cfg_filepath`
+    root_path: pathlib.Path  # the dir to list the files in, and relative to
+
+
+# Returns the files to run jobs on, relative to `root_path`
+FileProviderFunction = typing.Callable[..., FilePathList]
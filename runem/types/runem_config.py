@@ -1,8 +1,15 @@
 import pathlib
 import typing
 
-from runem.types.common import JobName, JobTags, OrderedPhases, PhaseName
-from runem.types.filters import TagFileFilter
+from runem.types.common import (
+    JobName,
+    JobNames,
+    JobPhases,
+    JobTags,
+    OrderedPhases,
+    PhaseName,
+)
+from runem.types.filters import TagFileFilter, TagFileFilters
 from runem.types.hooks import HookName
 
 
@@ -42,6 +49,13 @@ class JobAddressConfig(typing.TypedDict):
     function: str  # the 'function' in module to run
 
 
+class JobShardConfig(typing.TypedDict, total=False):
+    """How to split a job's files between several runs of the job."""
+
+    max_shards: int  # defaults to the number of workers
+    min_files_per_shard: int  # so tiny shards don't cost more than they save
+
+
 class JobContextConfig(typing.TypedDict, total=False):
     # what parameters the job needs # DEFUNCT
     params: typing.Optional[JobParamConfig]
@@ -50,12 +64,38 @@ class JobContextConfig(typing.TypedDict, total=False):
     # duplicated for each given path.
     cwd: typing.Optional[typing.Union[str, typing.List[str]]]
 
+    # how many of the `--procs` cpus the job uses itself, e.g. for pytest-xdist
+    cpu_slots: int
+
+    # run the job as several shards, in parallel, each with some of the files
+    shard: JobShardConfig
+
+    # whether the job's results can be cached, and the job skipped when its
+    # files haven't changed, defaults to False
+    cache: bool
+
+    # globs, relative to the config's dir, of other files that the job's result
+    # depends on, e.g. the tool's config, for `cache` and `incremental`
+    cache_inputs: typing.List[str]
+
+    # env-vars that the job's result depends on, for `cache` and `incremental`
+    cache_env: typing.List[str]
+
+    # 'per-file': only pass the files that changed, or failed, since the command
+    # last passed into `{file_list}`
+    incremental: str
+
+    # stop the job, and everything it started, if it runs for longer than this,
+    # overrides `--job-timeout`
+    timeout_s: float
+
 
 class JobWhen(typing.TypedDict, total=False):
     """Configures WHEN to call the callable i.e. priority."""
 
     tags: JobTags  # the job tags - used for filtering job-types
     phase: PhaseName  # the phase when the job should be run
+    after: typing.List[JobName]  # jobs to wait for, instead of earlier phases
 
 
 class JobWrapper(typing.TypedDict, total=False):
@@ -88,7 +128,34 @@ class TagFileFilterSerialised(typing.TypedDict):
     filter: TagFileFilter
 
 
-class GlobalConfig(typing.TypedDict):
+class FileProviderConfig(JobWrapper, total=False):
+    """Where runem gets the files to run jobs on, instead of `git ls-files`.
+
+    Either a built-in provider's `name`, or an `addr` or `module` of a function.
+    """
+
+    name: str  # a built-in provider, 'git' or 'walk'
+    ignore: typing.List[str]  # gitignore-style patterns of paths to skip, for 'walk'
+
+
+class CacheConfig(typing.TypedDict, total=False):
+    """Where, and how much, runem caches job results."""
+
+    max_size_mb: int  # the cap on the local cache's size
+    url: str  # a server to share results through, via GET and PUT
+
+
+class _GlobalConfigOptional(typing.TypedDict, total=False):
+    """The optional parts of the config for the entire test run."""
+
+    # Where to get the files from, defaults to git
+    file_provider: FileProviderConfig
+
+    # How to cache job results, defaults to a local cache
+    cache: CacheConfig
+
+
+class GlobalConfig(_GlobalConfigOptional):
     """The config for the entire test run."""
 
     # Phases control the order of jobs, jobs earlier in the stack get run earlier
@@ -163,3 +230,21 @@ Hooks = typing.DefaultDict[HookName, typing.List[HookConfig]]
 # A dictionary to hold hooks, with hook names as keys
 HooksStore = typing.Dict[HookName, typing.List[HookConfig]]
 PhaseGroupedJobs = typing.DefaultDict[PhaseName, Jobs]
+
+
+class CompiledConfig(typing.TypedDict):
+    """The parsed and validated configs, what a ConfigMetadata is made from.
+
+    Kept between runs by `runem.config_cache`, see there.
+    """
+
+    hooks: Hooks  # the project's hooks, then the user-configs'
+    phase_order: OrderedPhases
+    options: OptionConfigs
+    file_filters: TagFileFilters
+    jobs_by_phase: PhaseGroupedJobs
+    job_names: JobNames
+    job_phases: JobPhases
+    tags: JobTags
+    file_provider: typing.Optional[FileProviderConfig]
+    cache_config: typing.Optional[CacheConfig]
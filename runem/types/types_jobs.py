@@ -51,17 +51,69 @@ TimingEntry = typing.Tuple[str, timedelta]
 TimingEntries = typing.List[TimingEntry]
 
 
-class JobTiming(typing.TypedDict, total=True):
-    """A hierarchy of timing info. Job->JobCommands.
+class CommandResources(typing.TypedDict, total=False):
+    """The resources a command used, as measured when it exited.
 
-    The overall time for a job is in 'job', the child calls to run_command are in
-    'commands'
+    The counts are for the command and all the processes it waited on.
     """
 
+    max_rss_bytes: int  # peak resident-set-size of the command's largest process
+    user_cpu_s: float  # cpu time spent running the command's own code
+    system_cpu_s: float  # cpu time the kernel spent working for the command
+    block_reads: int  # reads from disk, i.e. that weren't served by the page-cache
+    block_writes: int  # writes to disk
+    voluntary_ctx_switches: int  # waits, e.g. on i/o, locks or child processes
+    involuntary_ctx_switches: int  # preemptions, e.g. for other jobs, when busy
+
+
+# The resources used by each call to `run_command`, by label
+CommandResourceEntries = typing.List[typing.Tuple[str, CommandResources]]
+
+
+class CacheStats(typing.TypedDict):
+    """How well a cache-store served a job, or a run."""
+
+    hits: int  # entries found
+    misses: int  # entries looked for and not found
+    bytes_read: int  # the size of the entries found
+    bytes_written: int  # the size of the entries stored
+    bytes_evicted: int  # the size of the old entries removed to stay under the cap
+
+
+# The stats of each cache-store used, by the store's name, e.g. 'local' or 'http'
+CacheStatsByStore = typing.Dict[str, CacheStats]
+
+
+# A function type for recording the resources used by sub-commands.
+RecordSubJobResourcesType = typing.Callable[[str, CommandResources], None]
+
+# A function type for recording the output of sub-commands, by label.
+RecordSubJobOutputType = typing.Callable[[str, str], None]
+
+
+class _JobTimingRequired(typing.TypedDict, total=True):
     job: TimingEntry  # the overall time for a job
     commands: TimingEntries  # timing for each call to `run_command`
 
 
+class JobTiming(_JobTimingRequired, total=False):
+    """A hierarchy of timing info. Job->JobCommands.
+
+    The overall time for a job is in 'job', the child calls to run_command are in
+    'commands'. The resources each of those used, where the platform can tell us,
+    are in 'command_resources', and the peak memory of the job's biggest command
+    is in 'max_rss_bytes'. Jobs skipped, as their result was cached, are 'cached'.
+    Jobs stopped as they ran for longer than their timeout are 'timed_out'.
+    How the job-cache's stores served the job is in 'cache_stats'.
+    """
+
+    command_resources: CommandResourceEntries
+    max_rss_bytes: int
+    cached: bool
+    timed_out: bool
+    cache_stats: CacheStatsByStore
+
+
 JobReturn = typing.Optional[JobReturnData]
 JobRunMetadata = typing.Tuple[JobTiming, JobReturn]
 JobRunTimesByPhase = typing.Dict[PhaseName, typing.List[JobTiming]]
@@ -107,6 +159,8 @@ class JobTaskKwargs(
 
     file_list: FilePathList
     record_sub_job_time: typing.Optional[typing.Callable[[str, timedelta], None]]
+    record_sub_job_resources: typing.Optional[RecordSubJobResourcesType]
+    record_sub_job_output: typing.Optional[RecordSubJobOutputType]
 
 
 class HookKwargs(CommonKwargs, HookSpecificKwargs):
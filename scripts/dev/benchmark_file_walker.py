@@ -0,0 +1,83 @@
+"""Compares the 'walk' file-provider with `git ls-files` on a synthetic tree.
+
+Usage:
+    python3 scripts/dev/benchmark_file_walker.py [--files 100000] [--repeats 5]
+
+Builds a tree of `--files` files, spread over nested dirs, with a large ignored
+dir, in a temp-dir, commits it to git and times listing the files both ways.
+"""
+
+import argparse
+import pathlib
+import shutil
+import subprocess
+import tempfile
+import timeit
+import typing
+
+from runem.file_walker import walk_files
+
+FILES_PER_DIR = 50
+DIRS_PER_DIR = 8
+IGNORE_PATTERNS: typing.List[str] = ["node_modules/", "*.pyc"]
+
+
+def _make_tree(root: pathlib.Path, num_files: int) -> None:
+    """Writes `num_files` files, FILES_PER_DIR to a dir, breadth-first."""
+    dirs: typing.List[pathlib.Path] = [root]
+    files_written: int = 0
+    dir_idx: int = 0
+    while files_written < num_files:
+        current_dir: pathlib.Path = dirs[dir_idx]
+        dir_idx += 1
+        current_dir.mkdir(parents=True, exist_ok=True)
+        for file_idx in range(min(FILES_PER_DIR, num_files - files_written)):
+            (current_dir / f"file_{file_idx}.py").write_text("")
+        files_written += FILES_PER_DIR
+        dirs.extend(current_dir / f"dir_{idx}" for idx in range(DIRS_PER_DIR))
+    # ignored, so neither git nor the walker should look inside
+    ignored_dir: pathlib.Path = root / "node_modules"
+    for idx in range(num_files // 10):
+        package_dir: pathlib.Path = ignored_dir / f"package_{idx // FILES_PER_DIR}"
+        package_dir.mkdir(parents=True, exist_ok=True)
+        (package_dir / f"index_{idx}.js").write_text("")
+    (root / ".gitignore").write_text("\n".join(IGNORE_PATTERNS) + "\n")
+
+
+def _git(root: pathlib.Path, *args: str) -> bytes:
+    return subprocess.check_output(["git", *args], cwd=root)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    root: pathlib.Path = pathlib.Path(tempfile.mkdtemp(prefix="runem-walk-bench-"))
+    try:
+        print(f"building {args.files} files in {root}")
+        _make_tree(root, args.files)
+        _git(root, "init", "-q")
+        _git(root, "add", "-A")
+
+        git_files: typing.List[bytes] = _git(root, "ls-files", "-z").split(b"\0")[:-1]
+        walked_files: typing.List[str] = walk_files(root, IGNORE_PATTERNS)
+        assert sorted(walked_files) == sorted(
+            git_file.decode() for git_file in git_files
+        ), "the walker and git disagree on the files"
+
+        timings: typing.Dict[str, typing.Callable[[], typing.Any]] = {
+            "git ls-files": lambda: _git(root, "ls-files", "-z"),
+            "walk (1 thread)": lambda: walk_files(root, IGNORE_PATTERNS, max_threads=1),
+            "walk": lambda: walk_files(root, IGNORE_PATTERNS),
+        }
+        for name, func in timings.items():
+            best: float = min(timeit.repeat(func, number=1, repeat=args.repeats))
+            print(f"{name:>16}: {best * 1000:8.1f}ms for {len(git_files)} files")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
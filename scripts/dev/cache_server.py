@@ -0,0 +1,73 @@
+"""A minimal stand-in for a shared job-cache server, for trying `config.cache.url`.
+
+Usage:
+    python3 scripts/dev/cache_server.py [--port 8080] [--dir /tmp/runem-cache]
+
+Then, in another shell:
+    RUNEM_CACHE_URL=http://127.0.0.1:8080/runem runem
+
+Stores each PUT body in a file under `--dir`, named for its path, and serves it
+back on GET. There is no auth or size cap, it is not for real use.
+"""
+
+import argparse
+import http.server
+import pathlib
+import tempfile
+import typing
+import urllib.parse
+
+
+class _CacheHandler(http.server.BaseHTTPRequestHandler):
+    cache_dir: pathlib.Path
+
+    def _blob_path(self) -> pathlib.Path:
+        # flatten the path into one file name, so requests can't escape the dir
+        return self.cache_dir / urllib.parse.quote(self.path, safe="")
+
+    def do_GET(self) -> None:  # noqa: N802
+        blob_path: pathlib.Path = self._blob_path()
+        if not blob_path.is_file():
+            self.send_error(404)
+            return
+        data: bytes = blob_path.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self) -> None:  # noqa: N802
+        length: int = int(self.headers.get("Content-Length", 0))
+        data: bytes = self.rfile.read(length)
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False) as handle:
+            handle.write(data)
+        pathlib.Path(handle.name).replace(self._blob_path())
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--dir", type=pathlib.Path, default=None)
+    args = parser.parse_args(argv)
+
+    cache_dir: pathlib.Path = args.dir or pathlib.Path(
+        tempfile.mkdtemp(prefix="runem-cache-")
+    )
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _CacheHandler.cache_dir = cache_dir
+    server = http.server.ThreadingHTTPServer((args.host, args.port), _CacheHandler)
+    print(f"serving a runem cache from {cache_dir} at http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import argparse
+
+import pytest
+
+from runem.command_line import parse_mem_size
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("1024", 1024),
+        ("512K", 512 * 1024),
+        ("1.5m", 1536 * 1024),
+        ("12G", 12 * 1024**3),
+        ("12GB", 12 * 1024**3),
+        ("1T", 1024**4),
+    ],
+)
+def test_parse_mem_size(value: str, expected: int) -> None:
+    assert parse_mem_size(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value", ["", "G", "lots", "12X", "0", "-1G", "inf", "infG", "nan", "1e400"]
+)
+def test_parse_mem_size_rejects_bad_sizes(value: str) -> None:
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mem_size(value)
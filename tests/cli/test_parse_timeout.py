@@ -0,0 +1,16 @@
+import argparse
+
+import pytest
+
+from runem.command_line import parse_timeout
+
+
+@pytest.mark.parametrize("value, expected", [("30", 30.0), ("0.5", 0.5)])
+def test_parse_timeout(value: str, expected: float) -> None:
+    assert parse_timeout(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "soon", "0", "-1", "nan", "inf", "1e400"])
+def test_parse_timeout_rejects_bad_timeouts(value: str) -> None:
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_timeout(value)
@@ -36,3 +36,11 @@ def go_to_tmp_path(request: FixtureRequest) -> typing.Generator[None, None, None
         yield
     finally:
         os.chdir(origin)
+
+
+# each test gets its own runem state, e.g. job-history
+@pytest.fixture(autouse=True)
+def isolate_runem_state(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.setenv("RUNEM_STATE_DIR", str(tmp_path / "runem-state"))
@@ -0,0 +1,233 @@
+import http.server
+import os
+import pathlib
+import threading
+import typing
+from unittest.mock import patch
+
+import pytest
+
+import runem.cache_store
+from runem.cache_store import (
+    CACHE_URL_ENV_VAR,
+    HttpCacheStore,
+    LayeredCacheStore,
+    LocalCacheStore,
+    merge_cache_stats,
+    new_cache_stats,
+    open_cache_store,
+)
+
+
+@pytest.fixture(autouse=True)
+def _forget_failed_servers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(runem.cache_store, "_FAILED_URLS", set())
+    monkeypatch.setattr(runem.cache_store, "_CACHE_DIR_SIZES", {})
+
+
+class _StandInCacheHandler(http.server.BaseHTTPRequestHandler):
+    """A minimal cache server, keeping blobs in the server's `blobs` dict."""
+
+    server: "_StandInCacheServer"
+
+    def do_GET(self) -> None:  # noqa: N802
+        data: typing.Optional[bytes] = self.server.blobs.get(self.path, None)
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self) -> None:  # noqa: N802
+        length: int = int(self.headers["Content-Length"])
+        self.server.blobs[self.path] = self.rfile.read(length)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: typing.Any) -> None:  # noqa: A002
+        """Keeps the test output quiet."""
+
+
+class _StandInCacheServer(http.server.ThreadingHTTPServer):
+    blobs: typing.Dict[str, bytes]
+
+
+@pytest.fixture(name="cache_server")
+def cache_server_fixture() -> typing.Iterator[_StandInCacheServer]:
+    server = _StandInCacheServer(("127.0.0.1", 0), _StandInCacheHandler)
+    server.blobs = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _server_url(server: _StandInCacheServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{str(host)}:{port}/runem"
+
+
+def test_local_cache_store_round_trips(tmp_path: pathlib.Path) -> None:
+    cache_store = LocalCacheStore(tmp_path, max_size_bytes=1024 * 1024)
+    assert cache_store.get("key") is None
+    cache_store.put("key", b"result")
+    # the same result, under another key, shares the blob
+    cache_store.put("other key", b"result")
+    assert cache_store.get("key") == b"result"
+    assert cache_store.get("other key") == b"result"
+    assert len(list((tmp_path / "blobs").rglob("*"))) == 2  # the fan-out dir & blob
+    assert cache_store.get_stats() == {
+        "local": {
+            "hits": 2,
+            "misses": 1,
+            "bytes_read": 12,
+            "bytes_written": 6,
+            "bytes_evicted": 0,
+        }
+    }
+
+
+def test_local_cache_store_misses_corrupt_blobs(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    cache_store = LocalCacheStore(tmp_path, max_size_bytes=1024 * 1024)
+    cache_store.put("key", b"result")
+    (blob_path,) = (path for path in (tmp_path / "blobs").rglob("*") if path.is_file())
+    blob_path.write_bytes(b"tampered")
+    assert cache_store.get("key") is None
+    assert "ignoring corrupt cache entry" in capsys.readouterr().out
+
+
+def test_local_cache_store_evicts_least_recently_used(tmp_path: pathlib.Path) -> None:
+    # room for about two entries, each a 400 byte blob and a 64 byte ref
+    cache_store = LocalCacheStore(tmp_path, max_size_bytes=1000)
+    cache_store.put("first", b"1" * 400)
+    cache_store.put("second", b"2" * 400)
+    # make the order of use explicit, mtimes can be coarse
+    for mtime, key in enumerate(("second", "first"), start=1):
+        digest: str = (tmp_path / "refs" / key).read_text()
+        os.utime(tmp_path / "refs" / key, ns=(mtime, mtime))
+        os.utime(tmp_path / "blobs" / digest[:2] / digest, ns=(mtime, mtime))
+
+    cache_store.put("third", b"3" * 400)
+    assert cache_store.get("second") is None
+    assert cache_store.get("first") == b"1" * 400
+    assert cache_store.get("third") == b"3" * 400
+    assert cache_store.stats["bytes_evicted"] >= 400
+
+
+def test_local_cache_store_only_walks_the_dir_when_it_may_be_full(
+    tmp_path: pathlib.Path,
+) -> None:
+    with patch("runem.cache_store.os.walk", side_effect=os.walk) as walk_mock:
+        # room for about two entries, each a 400 byte blob and a 64 byte ref
+        for key in ("1", "2"):
+            # stores are opened per job, the running total is shared
+            LocalCacheStore(tmp_path, max_size_bytes=1000).put(key, key.encode() * 400)
+        assert walk_mock.call_count == 1
+        cache_store = LocalCacheStore(tmp_path, max_size_bytes=1000)
+        cache_store.put("third", b"3" * 400)
+        assert walk_mock.call_count == 2
+    assert cache_store.stats["bytes_evicted"] >= 400
+
+
+def test_http_cache_store_round_trips(cache_server: _StandInCacheServer) -> None:
+    cache_store = HttpCacheStore(_server_url(cache_server))
+    assert cache_store.get("key") is None
+    cache_store.put("key", b"result")
+    assert cache_server.blobs == {"/runem/key": b"result"}
+    assert cache_store.get("key") == b"result"
+    assert cache_store.get_stats() == {
+        "http": {
+            "hits": 1,
+            "misses": 1,
+            "bytes_read": 6,
+            "bytes_written": 6,
+            "bytes_evicted": 0,
+        }
+    }
+
+
+def test_http_cache_store_stops_using_a_failed_server(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    # nothing listens on port 9 (discard), or it refuses
+    cache_store = HttpCacheStore("http://127.0.0.1:9/runem", timeout_s=1.0)
+    assert cache_store.get("key") is None
+    assert "cache server at http://127.0.0.1:9/runem failed" in capsys.readouterr().out
+    cache_store.put("key", b"result")
+    assert cache_store.get("key") is None
+    # warned once only
+    assert capsys.readouterr().out == ""
+    assert cache_store.stats["bytes_written"] == 0
+
+
+def test_http_cache_store_tries_a_failed_server_once_per_run(
+    capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The stores are opened per job, but a dead server only costs one timeout."""
+    monkeypatch.delenv(CACHE_URL_ENV_VAR, raising=False)
+    url: str = "http://127.0.0.1:9/runem"
+    with patch(
+        "urllib.request.urlopen", side_effect=TimeoutError("timed out")
+    ) as urlopen_mock:
+        for _ in range(2):
+            cache_store = open_cache_store(None, {"url": url})
+            assert cache_store is not None
+            assert cache_store.get("key") is None
+            cache_store.put("key", b"result")
+    urlopen_mock.assert_called_once()
+    assert capsys.readouterr().out.count("failed, not using it") == 1
+
+
+def test_layered_cache_store_keeps_server_hits_locally(
+    tmp_path: pathlib.Path, cache_server: _StandInCacheServer
+) -> None:
+    cache_server.blobs["/runem/key"] = b"from ci"
+    local_store = LocalCacheStore(tmp_path, max_size_bytes=1024 * 1024)
+    cache_store = LayeredCacheStore(
+        local_store, HttpCacheStore(_server_url(cache_server))
+    )
+    assert cache_store.get("key") == b"from ci"
+    assert local_store.get("key") == b"from ci"
+    cache_store.put("new key", b"from here")
+    # keys are quoted in the url
+    assert cache_server.blobs["/runem/new%20key"] == b"from here"
+    assert set(cache_store.get_stats()) == {"local", "http"}
+
+
+def test_open_cache_store(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv(CACHE_URL_ENV_VAR, raising=False)
+    assert open_cache_store(None, None) is None
+    local_store = open_cache_store(tmp_path, {"max_size_mb": 2})
+    assert isinstance(local_store, LocalCacheStore)
+    assert local_store.max_size_bytes == 2 * 1024 * 1024
+    assert isinstance(open_cache_store(None, {"url": "http://cache"}), HttpCacheStore)
+    assert isinstance(
+        open_cache_store(tmp_path, {"url": "http://cache"}), LayeredCacheStore
+    )
+    monkeypatch.setenv(CACHE_URL_ENV_VAR, "http://ci-cache")
+    http_store = open_cache_store(None, None)
+    assert isinstance(http_store, HttpCacheStore)
+    assert http_store.url == "http://ci-cache"
+
+
+def test_merge_cache_stats() -> None:
+    stats = new_cache_stats()
+    stats["hits"] = 2
+    stats["bytes_read"] = 10
+    total = merge_cache_stats({}, {"local": stats})
+    merge_cache_stats(total, {"local": stats, "http": new_cache_stats()})
+    assert total["local"]["hits"] == 4
+    assert total["local"]["bytes_read"] == 20
+    assert total["http"] == new_cache_stats()
+    # the inputs are left alone
+    assert stats["hits"] == 2
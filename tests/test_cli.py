@@ -6,7 +6,7 @@ import runem.cli
 
 
 @patch(
-    "runem.cli.timed_main",
+    "runem.runem.timed_main",
     return_value=None,
 )
 def test_main(patched_main: Mock) -> None:
@@ -14,8 +14,8 @@ def test_main(patched_main: Mock) -> None:
     patched_main.assert_called_once()
 
 
-@patch("runem.cli.timed_main", return_value=None)
-@patch("runem.cli.help_agents_text", return_value="agent help")
+@patch("runem.runem.timed_main", return_value=None)
+@patch("runem.mcp.help.help_agents_text", return_value="agent help")
 @patch("runem.cli.sys.argv", ["runem", "--help-agents"])
 def test_main_help_agents(
     patched_help_agents_text: Mock,
@@ -29,7 +29,7 @@ def test_main_help_agents(
     assert capsys.readouterr().out == "agent help\n"
 
 
-@patch("runem.cli.timed_main", return_value=None)
+@patch("runem.runem.timed_main", return_value=None)
 @patch("runem.cli.sys.argv", ["runem", "--help-agents"])
 def test_main_help_agents_actual_content(
     patched_main: Mock,
@@ -0,0 +1,97 @@
+import pathlib
+from unittest.mock import patch
+
+import pytest
+
+from runem.config_cache import (
+    CONFIG_CACHE_FILENAME,
+    config_cache_key,
+    load_cached_config_metadata,
+    load_compiled_config,
+    save_compiled_config,
+)
+from runem.config_metadata import ConfigMetadata
+from runem.config_parse import compile_config
+from runem.types.runem_config import CompiledConfig, Config
+
+_CONFIG_YAML = (
+    "- config:\n"
+    "    phases:\n"
+    "      - mock phase\n"
+    "    files:\n"
+    "    options:\n"
+    "- job:\n"
+    "    command: echo hello\n"
+    "    when:\n"
+    "      phase: mock phase\n"
+    "      tags:\n"
+    "        - dummy tag\n"
+)
+
+
+def _compiled(tmp_path: pathlib.Path) -> CompiledConfig:
+    config: Config = [
+        {"config": {"phases": ("mock phase",), "files": [], "options": []}},  # type: ignore[typeddict-item]
+        {"job": {"command": "echo hello", "when": {"phase": "mock phase"}}},
+    ]
+    return compile_config(config, tmp_path / ".runem.yml", [])
+
+
+def test_config_cache_key(tmp_path: pathlib.Path) -> None:
+    cfg_path: pathlib.Path = tmp_path / ".runem.yml"
+    user_cfg_path: pathlib.Path = tmp_path / ".runem.user.yml"
+    cfg_path.write_text(_CONFIG_YAML)
+    user_cfg_path.write_text("")
+
+    key = config_cache_key(cfg_path, [])
+    assert key is not None
+    assert config_cache_key(cfg_path, []) == key
+    with_user_key = config_cache_key(cfg_path, [user_cfg_path])
+    assert with_user_key not in (None, key)
+
+    user_cfg_path.write_text("# a comment\n")
+    assert config_cache_key(cfg_path, [user_cfg_path]) not in (None, with_user_key)
+
+    cfg_path.write_text(_CONFIG_YAML + "# a comment\n")
+    assert config_cache_key(cfg_path, []) != key
+
+    # a config we can't read is never cached
+    assert config_cache_key(cfg_path, [tmp_path / "missing.yml"]) is None
+
+
+def test_compiled_config_round_trips(tmp_path: pathlib.Path) -> None:
+    state_dir: pathlib.Path = tmp_path / "state"
+    assert load_compiled_config(state_dir, "key") is None
+    compiled: CompiledConfig = _compiled(tmp_path)
+    save_compiled_config(state_dir, "key", compiled)
+    assert load_compiled_config(state_dir, "key") == compiled
+    assert load_compiled_config(state_dir, "other key") is None
+
+
+def test_load_compiled_config_ignores_corrupt_caches(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    (tmp_path / CONFIG_CACHE_FILENAME).write_bytes(b"key\nnot a pickle")
+    assert load_compiled_config(tmp_path, "key") is None
+    assert "ignoring unreadable config cache" in capsys.readouterr().out
+
+
+def test_load_cached_config_metadata(tmp_path: pathlib.Path) -> None:
+    cfg_path: pathlib.Path = tmp_path / ".runem.yml"
+    cfg_path.write_text(_CONFIG_YAML)
+
+    compiled_metadata: ConfigMetadata = load_cached_config_metadata(silent=True)
+    assert (tmp_path / "runem-state" / CONFIG_CACHE_FILENAME).exists()
+
+    # an unchanged config isn't loaded again
+    with patch("runem.config_cache.load_project_config") as load_mock:
+        cached_metadata: ConfigMetadata = load_cached_config_metadata(silent=True)
+    load_mock.assert_not_called()
+    assert cached_metadata.cfg_filepath == compiled_metadata.cfg_filepath
+    assert cached_metadata.phases == compiled_metadata.phases == ("mock phase",)
+    assert cached_metadata.jobs == compiled_metadata.jobs
+    assert cached_metadata.all_job_tags == {"dummy tag"}
+
+    # ... but a changed one is
+    cfg_path.write_text(_CONFIG_YAML.replace("dummy tag", "new tag"))
+    assert load_cached_config_metadata(silent=True).all_job_tags == {"new tag"}
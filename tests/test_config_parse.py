@@ -12,6 +12,7 @@ from runem.config_metadata import ConfigMetadata
 from runem.config_parse import (
     _parse_global_config,
     _parse_job,
+    _validate_job_dependencies,
     load_config_metadata,
     parse_hook_config,
     parse_job_config,
@@ -881,3 +882,34 @@ def test_parse_hook_config_with_bad_hook_name_types(hook_type: typing.Any) -> No
     }
     with pytest.raises(ValueError):
         parse_hook_config(hook, cfg_filepath)
+
+
+def test_validate_job_dependencies() -> None:
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["edit"] = [
+        {"label": "install(packages/app)", "when": {"phase": "edit"}},
+        {"label": "reformat", "when": {"phase": "edit", "after": ["install"]}},
+    ]
+    _validate_job_dependencies(jobs_by_phase, {"install(packages/app)", "reformat"})
+
+
+def test_validate_job_dependencies_raises_on_unknown_job() -> None:
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["edit"] = [
+        {"label": "reformat", "when": {"phase": "edit", "after": ["install"]}},
+    ]
+    with pytest.raises(ValueError) as err_info:
+        _validate_job_dependencies(jobs_by_phase, {"reformat"})
+    assert str(err_info.value) == (
+        "job 'reformat' runs after unknown job 'install'. Known jobs are: 'reformat'"
+    )
+
+
+def test_validate_job_dependencies_raises_on_self_dependency() -> None:
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["edit"] = [
+        {"label": "reformat", "when": {"phase": "edit", "after": ["reformat"]}},
+    ]
+    with pytest.raises(ValueError) as err_info:
+        _validate_job_dependencies(jobs_by_phase, {"reformat"})
+    assert str(err_info.value) == "job 'reformat' cannot run after itself"
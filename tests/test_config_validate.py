@@ -56,7 +56,7 @@ def test_load_runem_schema_ok(monkeypatch: pytest.MonkeyPatch) -> None:
         lambda self: True,  # noqa: ANN001
         raising=False,
     )
-    monkeypatch.setattr(uut, "load_yaml_object", lambda _: sentinel)
+    monkeypatch.setattr("runem.yaml_utils.load_yaml_object", lambda _: sentinel)
 
     assert uut._load_runem_schema() is sentinel  # pyright: ignore [private‑access]
 
@@ -92,7 +92,7 @@ def test_validate_runem_file_valid(
     cfg_path.touch()
 
     monkeypatch.setattr(uut, "_load_runem_schema", object, raising=True)
-    monkeypatch.setattr(uut, "validate_yaml", lambda *_: [])
+    monkeypatch.setattr("runem.yaml_validation.validate_yaml", lambda *_: [])
 
     # should run cleanly
     uut.validate_runem_file(cfg_path, all_config={})
@@ -110,8 +110,7 @@ def test_validate_runem_file_invalid(
 
     monkeypatch.setattr(uut, "_load_runem_schema", object, raising=True)
     monkeypatch.setattr(
-        uut,
-        "validate_yaml",
+        "runem.yaml_validation.validate_yaml",
         lambda *_: [
             _DummyErr(path=["options", 0, "type"], message="unknown field"),
             _DummyErr(path=[], message="root issue"),
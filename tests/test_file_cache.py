@@ -0,0 +1,74 @@
+import pathlib
+from collections import defaultdict
+
+import pytest
+
+from runem.file_cache import (
+    FILE_LISTS_CACHE_FILENAME,
+    file_lists_cache_key,
+    load_cached_file_lists,
+    save_cached_file_lists,
+)
+from runem.types.filters import FilePathListLookup, TagFileFilters
+
+FILE_FILTERS: TagFileFilters = {"py": {"tag": "py", "regex": r"\.py$"}}
+
+
+@pytest.fixture(name="git_dir")
+def git_dir_fixture(tmp_path: pathlib.Path) -> pathlib.Path:
+    git_dir: pathlib.Path = tmp_path / ".git"
+    (git_dir / "refs" / "heads").mkdir(parents=True)
+    (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+    (git_dir / "refs" / "heads" / "main").write_text("aaaa\n")
+    (git_dir / "index").write_bytes(b"index")
+    return git_dir
+
+
+def test_file_lists_cache_key_changes_with_tree(
+    git_dir: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    key = file_lists_cache_key(git_dir, tmp_path, FILE_FILTERS)
+    assert key is not None
+    assert file_lists_cache_key(git_dir, tmp_path, FILE_FILTERS) == key
+
+    # different filters, or a different cwd, bucket files differently
+    assert file_lists_cache_key(git_dir, tmp_path, {}) != key
+    assert file_lists_cache_key(git_dir, git_dir, FILE_FILTERS) != key
+
+    # a new commit on the branch
+    (git_dir / "refs" / "heads" / "main").write_text("bbbb\n")
+    new_commit_key = file_lists_cache_key(git_dir, tmp_path, FILE_FILTERS)
+    assert new_commit_key != key
+
+    # a change to the index
+    (git_dir / "index").write_bytes(b"new index")
+    assert file_lists_cache_key(git_dir, tmp_path, FILE_FILTERS) not in (
+        key,
+        new_commit_key,
+    )
+
+
+def test_file_lists_cache_key_none_without_index(
+    git_dir: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    (git_dir / "index").unlink()
+    assert file_lists_cache_key(git_dir, tmp_path, FILE_FILTERS) is None
+
+
+def test_cached_file_lists_round_trip(tmp_path: pathlib.Path) -> None:
+    state_dir: pathlib.Path = tmp_path / "state"
+    file_lists: FilePathListLookup = defaultdict(list, {"py": ["a.py", "b/c.py"]})
+    assert load_cached_file_lists(state_dir, "key") is None
+    save_cached_file_lists(state_dir, "key", file_lists)
+    assert load_cached_file_lists(state_dir, "key") == file_lists
+    assert load_cached_file_lists(state_dir, "other key") is None
+    # the cache is written atomically, leaving no temp files behind
+    assert [path.name for path in state_dir.iterdir()] == [FILE_LISTS_CACHE_FILENAME]
+
+
+def test_load_cached_file_lists_ignores_corrupt_cache(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    (tmp_path / FILE_LISTS_CACHE_FILENAME).write_text("{not json")
+    assert load_cached_file_lists(tmp_path, "key") is None
+    assert "ignoring unreadable file cache" in capsys.readouterr().out
@@ -0,0 +1,124 @@
+import pathlib
+import typing
+
+import pytest
+
+from runem.file_walker import compile_ignore_patterns, walk_files
+
+
+def _make_tree(root: pathlib.Path, file_paths: typing.List[str]) -> None:
+    for file_path in file_paths:
+        (root / file_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / file_path).write_text(file_path)
+
+
+@pytest.mark.parametrize("max_threads", [1, 4])
+def test_walk_files_lists_all_files(tmp_path: pathlib.Path, max_threads: int) -> None:
+    file_paths: typing.List[str] = [
+        "README.md",
+        "src/a.py",
+        "src/pkg/b.py",
+        "src/pkg/deep/er/c.py",
+        "docs/index.md",
+        # enough dirs to be scanned in batches, on the threads
+        *(f"many/dir_{dir_idx}/sub/file.txt" for dir_idx in range(40)),
+    ]
+    _make_tree(tmp_path, file_paths)
+    # empty dirs have no files
+    (tmp_path / "empty").mkdir()
+    assert sorted(walk_files(tmp_path, max_threads=max_threads)) == sorted(file_paths)
+
+
+def test_walk_files_prunes_ignored_paths(tmp_path: pathlib.Path) -> None:
+    _make_tree(
+        tmp_path,
+        [
+            ".git/HEAD",
+            ".hg/store",
+            "node_modules/lib/index.js",
+            "src/node_modules/lib/index.js",
+            "src/a.py",
+            "src/a.pyc",
+            "src/build/out.py",
+            "build/out.py",
+            "build.py",
+            "docs/_build/index.html",
+            "src/docs/_build/index.html",
+            "logs/a/b/run.log",
+            "dist/app/main.js",
+            "dist.js",
+            "src/dist/main.js",
+        ],
+    )
+    ignore_patterns: typing.List[str] = [
+        "# comments and blank lines are skipped",
+        "",
+        "node_modules",  # any file, or dir, with this name
+        "*.pyc",
+        "/build/",  # only the top-level dir
+        "docs/_build",  # anchored to the root, as it contains a '/'
+        "logs/**/*.log",
+        "dist/**",  # everything under the top-level dir
+    ]
+    assert sorted(walk_files(tmp_path, ignore_patterns)) == [
+        "build.py",
+        "dist.js",
+        "src/a.py",
+        "src/build/out.py",
+        "src/dist/main.js",
+        "src/docs/_build/index.html",
+    ]
+
+
+def test_walk_files_ignores_everything_with_a_bare_double_star(
+    tmp_path: pathlib.Path,
+) -> None:
+    _make_tree(tmp_path, ["a.py", "src/b.py"])
+    assert walk_files(tmp_path, ["**"]) == []
+
+
+def test_walk_files_does_not_follow_dir_symlinks(tmp_path: pathlib.Path) -> None:
+    _make_tree(tmp_path, ["src/a.py"])
+    (tmp_path / "link").symlink_to(tmp_path / "src")
+    (tmp_path / "loop").symlink_to(tmp_path)
+    assert sorted(walk_files(tmp_path)) == ["link", "loop", "src/a.py"]
+
+
+def test_compile_ignore_patterns() -> None:
+    compiled = compile_ignore_patterns(["*.py[co]", "a/**/b", "tmp/"])
+    assert compiled["names"] is not None
+    assert compiled["names"].match("x.pyc")
+    assert not compiled["names"].match("x.py")
+    assert compiled["paths"] is not None
+    for path in ("a/b", "a/x/b", "a/x/y/b"):
+        assert compiled["paths"].match(path), path
+    assert not compiled["paths"].match("a/xb")
+    assert compiled["dir_names"] is not None
+    assert compiled["dir_paths"] is None
+
+    # a trailing '/**' is everything under the dir, like 'dist/'
+    compiled = compile_ignore_patterns(["dist/**", "a/**/out/**"])
+    assert compiled["paths"] is None
+    assert compiled["dir_paths"] is not None
+    for path in ("dist", "a/out", "a/x/out"):
+        assert compiled["dir_paths"].match(path), path
+    for path in ("dist.js", "src/dist", "a/outs"):
+        assert not compiled["dir_paths"].match(path), path
+
+    # a bare '**' is everything, anchored or not
+    for pattern in ("**", "/**"):
+        compiled = compile_ignore_patterns([pattern])
+        matcher = compiled["names"] or compiled["paths"]
+        assert matcher is not None
+        for path in ("a", "a.py", "a/b/c.py"):
+            assert matcher.match(path), (pattern, path)
+
+    # no glob, including '[!...]', matches across a '/'
+    compiled = compile_ignore_patterns(["a[!x]b/c", "d[+-0]e/f", "g?h/i"])
+    assert compiled["paths"] is not None
+    for path in ("ayb/c", "d+e/f", "d0e/f", "gyh/i"):
+        assert compiled["paths"].match(path), path
+    for path in ("a/b/c", "d/e/f", "g/h/i"):
+        assert not compiled["paths"].match(path), path
+    with pytest.raises(ValueError):
+        compile_ignore_patterns(["!keep.py"])
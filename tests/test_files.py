@@ -1,4 +1,9 @@
+import io
 import pathlib
+import re
+import shutil
+import subprocess
+import typing
 from argparse import Namespace
 from collections import defaultdict
 from typing import List, Optional
@@ -6,10 +11,17 @@ from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 
+from runem import files
 from runem.config_metadata import ConfigMetadata
-from runem.files import find_files
+from runem.files import (
+    CompiledFileFilters,
+    _bucket_file_by_tag,
+    _read_git_query,
+    compile_file_filters,
+    find_files,
+)
 from runem.informative_dict import InformativeDict
-from runem.types.filters import FilePathListLookup
+from runem.types.filters import FilePathListLookup, TagFileFilters
 
 
 def _prep_config(
@@ -52,6 +64,32 @@ def _prep_config(
     return config_metadata
 
 
+def _fake_git(mock_popen: Mock, file_paths: List[str]) -> None:
+    """Makes every git query print `file_paths`, except the deleted-files query."""
+
+    def _popen(query: List[str], **kwargs: typing.Any) -> MagicMock:
+        git_query = MagicMock()
+        git_query.args = query
+        git_query.stdout = io.BytesIO(
+            b""
+            if "--diff-filter=D" in query
+            else b"\0".join(file_path.encode() for file_path in file_paths) + b"\0"
+        )
+        git_query.wait.return_value = 0
+        return git_query
+
+    mock_popen.side_effect = _popen
+
+
+def _git_queries(mock_popen: Mock) -> List[List[str]]:
+    """Returns the git queries run, other than the deleted-files query."""
+    return [
+        call.args[0]
+        for call in mock_popen.call_args_list
+        if "--diff-filter=D" not in call.args[0]
+    ]
+
+
 @pytest.mark.parametrize(
     "check_head_files",
     [
@@ -75,10 +113,10 @@ def _prep_config(
     ],
 )
 @patch(
-    "runem.files.subprocess_check_output",
+    "runem.files.subprocess.Popen",
 )
 def test_find_files_basic(
-    mock_subprocess_check_output: Mock,
+    mock_popen: Mock,
     always_files: Optional[List[str]],
     check_modified_files: bool,
     check_head_files: bool,
@@ -89,7 +127,7 @@ def test_find_files_basic(
         test_file: pathlib.Path = tmp_path / file_str
         test_file.touch()  # write some empty string aka 'touch' the file
         file_strings.append(str(test_file))
-    mock_subprocess_check_output.return_value = str.encode("\n".join(file_strings))
+    _fake_git(mock_popen, file_strings)
 
     created_always_files: Optional[List[str]] = None
     if always_files is not None:
@@ -110,19 +148,17 @@ def test_find_files_basic(
     )
     results: FilePathListLookup = find_files(config_metadata)
     if check_modified_files and check_head_files:
-        assert mock_subprocess_check_output.call_count == 3, (
-            "twice for modified, once for head"
-        )
+        assert len(_git_queries(mock_popen)) == 3, "twice for modified, once for head"
         assert results == {
             "dummy tag": [file_strings[0]]  # we filter in only the *1* files.
         }
     elif check_modified_files:
-        assert mock_subprocess_check_output.call_count == 2, "twice for modified"
+        assert len(_git_queries(mock_popen)) == 2, "twice for modified"
         assert results == {
             "dummy tag": [file_strings[0]]  # we filter in only the *1* files.
         }
     else:
-        assert mock_subprocess_check_output.call_count == 1, "once for git ls-files"
+        assert len(_git_queries(mock_popen)) == 1, "once for head, or git ls-files"
         assert results == {
             "dummy tag": [file_strings[0]]  # we filter in only the *1* files.
         }
@@ -136,10 +172,10 @@ def test_find_files_basic(
     ],
 )
 @patch(
-    "runem.files.subprocess_check_output",
+    "runem.files.subprocess.Popen",
 )
 def test_find_files_git_since_branch(
-    mock_subprocess_check_output: Mock,
+    mock_popen: Mock,
     git_since_branch: Optional[str],
     tmp_path: pathlib.Path,
 ) -> None:
@@ -148,7 +184,7 @@ def test_find_files_git_since_branch(
         test_file: pathlib.Path = tmp_path / file_str
         test_file.touch()  # write some empty string aka 'touch' the file
         file_strings.append(str(test_file))
-    mock_subprocess_check_output.return_value = str.encode("\n".join(file_strings))
+    _fake_git(mock_popen, file_strings)
 
     config_metadata = _prep_config(
         tmp_path,
@@ -159,12 +195,303 @@ def test_find_files_git_since_branch(
     )
     results: FilePathListLookup = find_files(config_metadata)
     if git_since_branch is None:
-        assert mock_subprocess_check_output.call_count == 1, "once for git ls-files"
+        assert _git_queries(mock_popen) == [["git", "ls-files", "-z"]]
         assert results == {
             "dummy tag": [file_strings[0]]  # we filter in only the *1* files.
         }
     else:
-        assert mock_subprocess_check_output.call_count == 1, "once for git ls-files"
+        assert _git_queries(mock_popen) == [
+            [
+                "git",
+                "diff",
+                "--name-only",
+                "-z",
+                "--diff-filter=d",
+                "/dummy/branch/name...HEAD",
+            ]
+        ]
         assert results == {
             "dummy tag": [file_strings[0]]  # we filter in only the *1* files.
         }
+
+
+@patch(
+    "runem.files.subprocess.Popen",
+)
+def test_find_files_filters_out_deleted_files(
+    mock_popen: Mock,
+    tmp_path: pathlib.Path,
+) -> None:
+    """Files changed in HEAD, but deleted since, are filtered out in one go."""
+
+    def _popen(query: List[str], **kwargs: typing.Any) -> MagicMock:
+        git_query = MagicMock()
+        git_query.args = query
+        git_query.stdout = io.BytesIO(
+            b"deleted_1.txt\0"
+            if "--diff-filter=D" in query
+            else b"kept_1.txt\0deleted_1.txt\0"
+        )
+        git_query.wait.return_value = 0
+        return git_query
+
+    mock_popen.side_effect = _popen
+    config_metadata = _prep_config(
+        tmp_path,
+        check_modified_files=False,
+        check_head_files=True,
+        always_files=None,
+        git_since_branch=None,
+    )
+    assert find_files(config_metadata) == {"dummy tag": ["kept_1.txt"]}
+    # the queries are all started before any are read
+    assert mock_popen.call_count == 3
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_find_files_filters_out_staged_then_deleted_files(
+    tmp_path: pathlib.Path,
+) -> None:
+    """Files staged as new, then deleted, aren't in HEAD but still are filtered out."""
+
+    def _git(*args: str) -> None:
+        subprocess.run(
+            ["git", "-c", "user.name=runem", "-c", "user.email=runem@test", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+        )
+
+    _git("init", "-q")
+    for file_name in ("committed.txt", "removed.txt"):
+        (tmp_path / file_name).write_text("committed\n")
+    _git("add", "-A")
+    _git("commit", "-q", "-m", "initial")
+    (tmp_path / "committed.txt").write_text("changed\n")
+    (tmp_path / "staged_then_deleted.txt").write_text("new\n")
+    (tmp_path / "staged.txt").write_text("new\n")
+    _git("add", "-A")
+    (tmp_path / "staged_then_deleted.txt").unlink()
+    (tmp_path / "removed.txt").unlink()
+    config_metadata = _prep_config(
+        tmp_path,
+        check_modified_files=True,
+        check_head_files=False,
+        always_files=None,
+        git_since_branch=None,
+    )
+    config_metadata.file_filters = {"txt": {"tag": "txt", "regex": r"\.txt$"}}
+    assert find_files(config_metadata) == {"txt": ["committed.txt", "staged.txt"]}
+
+
+def test_read_git_query_parses_nul_delimited_paths() -> None:
+    git_query = MagicMock()
+    git_query.stdout = io.BytesIO(
+        # split across reads, with newlines and non-utf8 bytes in names
+        b"a.py\0" + b"x" * files._GIT_READ_SIZE + b".py\0new\nline.py\0\xff.py\0"
+    )
+    git_query.wait.return_value = 0
+    assert _read_git_query(git_query) == [
+        "a.py",
+        "x" * files._GIT_READ_SIZE + ".py",
+        "new\nline.py",
+        "\udcff.py",
+    ]
+
+
+def test_read_git_query_failures() -> None:
+    git_query = MagicMock()
+    git_query.args = ["git", "diff"]
+    git_query.stdout = io.BytesIO(b"")
+    git_query.wait.return_value = 128
+    assert _read_git_query(git_query, check=False) == []
+    git_query.stdout = io.BytesIO(b"")
+    with pytest.raises(subprocess.CalledProcessError):
+        _read_git_query(git_query)
+
+
+BUCKETING_FILE_FILTERS: TagFileFilters = {
+    tag: {"tag": tag, "regex": regex}
+    for tag, regex in (
+        ("py", r"\.py$"),
+        ("typed py", r"\.(py|pyi)$"),
+        ("js", r"\.(?:js|jsx)$"),
+        ("also py", r"\.py$"),
+        ("anywhere txt", r"\.txt"),
+        ("src", r"^src/"),
+        ("src py", r"^src/.*\.py$"),
+        ("tests", r"(^|/)tests?/"),
+        ("any char py", r".py$"),  # un-escaped, so not just an extension
+        ("dotfiles", r"(^|/)\.[^/]+$"),
+        ("everything", r".*"),
+        ("doubled letters", r"(\w)\1"),  # refers to its own group
+        ("case-insensitive md", r"(?i)\.md$"),  # sets a global flag
+        ("anchored, or not", r"^web/|\.map$"),
+    )
+}
+
+BUCKETING_FILE_PATHS: List[str] = [
+    "setup.py",
+    "src/runem/files.py",
+    "src/runem/types.pyi",
+    "tests/test_files.py",
+    "web/app.jsx",
+    "web/app.js.map",
+    "docs/README.MD",
+    "docs/notes.txt.bak",
+    ".gitignore",
+    "dir.py/file",
+    "happy",
+    "no-extension",
+    "numpy",
+    "web/package.json",
+]
+
+
+def test_compile_file_filters_splits_filters_by_kind() -> None:
+    compiled: CompiledFileFilters = compile_file_filters(BUCKETING_FILE_FILTERS)
+    assert compiled["tags"] == list(BUCKETING_FILE_FILTERS)
+    assert compiled["suffixes"] == {
+        ".py": [0, 1, 3],
+        ".pyi": [1],
+        ".js": [2],
+        ".jsx": [2],
+    }
+    assert [filter_idx for filter_idx, _ in compiled["combined_groups"]] == [5, 6]
+    assert [filter_idx for filter_idx, _ in compiled["searched"]] == [
+        4,
+        7,
+        8,
+        9,
+        10,
+        11,
+        12,
+        13,
+    ]
+
+
+@pytest.mark.parametrize(
+    "regex",
+    [r".*\.py$", r"^.*\.py$", r".*\.(py|json)$", r"^.*\.(?:py|json)$"],
+)
+def test_compile_file_filters_treats_leading_wildcards_as_suffixes(regex: str) -> None:
+    compiled: CompiledFileFilters = compile_file_filters(
+        {"tag": {"tag": "tag", "regex": regex}}
+    )
+    assert ".py" in compiled["suffixes"]
+    assert compiled["combined_groups"] == []
+    assert compiled["searched"] == []
+
+
+@pytest.mark.parametrize(
+    "file_filters",
+    [
+        BUCKETING_FILE_FILTERS,
+        # a leading `.*` matches the same as the plain suffix filters above
+        {
+            tag: {"tag": tag, "regex": regex}
+            for tag, regex in (
+                ("py", r".*\.py$"),
+                ("typed py", r"^.*\.(py|pyi)$"),
+                ("js", r".*\.(?:js|jsx)$"),
+                ("json", r".*\.(json)$"),
+            )
+        },
+        {},
+        # clashing group-names can't be combined, so all fall back
+        {
+            "a": {"tag": "a", "regex": r"^(?P<name>src)/"},
+            "b": {"tag": "b", "regex": r"^(?P<name>tests)/"},
+        },
+    ],
+    ids=["mixed", "leading wildcards", "no filters", "uncombinable"],
+)
+def test_bucket_file_by_tag_matches_re_search(file_filters: TagFileFilters) -> None:
+    """The single-pass bucketing gives the same results as re.search() per filter."""
+    config_metadata: ConfigMetadata = _prep_config(
+        pathlib.Path("."),
+        check_modified_files=False,
+        check_head_files=False,
+        always_files=None,
+        git_since_branch=None,
+    )
+    config_metadata.file_filters = file_filters
+    file_lists: FilePathListLookup = defaultdict(list)
+    _bucket_file_by_tag(BUCKETING_FILE_PATHS, config_metadata, file_lists)
+
+    expected: FilePathListLookup = defaultdict(list)
+    for file_path in BUCKETING_FILE_PATHS:
+        for tag, file_filter in file_filters.items():
+            if re.search(file_filter["regex"], file_path):
+                expected[tag].append(file_path)
+    assert file_lists == expected
+    # same tag order as well
+    assert list(file_lists) == list(expected)
+
+
+@patch(
+    "runem.files.subprocess.Popen",
+)
+def test_find_files_caches_git_ls_files(
+    mock_popen: Mock,
+    tmp_path: pathlib.Path,
+) -> None:
+    git_dir: pathlib.Path = tmp_path / ".git"
+    git_dir.mkdir()
+    (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+    (git_dir / "index").write_bytes(b"index v1")
+    _fake_git(mock_popen, ["test_file_1.txt", "test_file_2.txt"])
+    config_metadata = _prep_config(
+        tmp_path,
+        check_modified_files=False,
+        check_head_files=False,
+        always_files=None,
+        git_since_branch=None,
+    )
+    expected: typing.Dict[str, typing.List[str]] = {"dummy tag": ["test_file_1.txt"]}
+
+    assert find_files(config_metadata) == expected
+    assert find_files(config_metadata) == expected
+    assert mock_popen.call_count == 1, "second run is cached"
+
+    # staging a change re-writes the index, so we have to ask git again
+    (git_dir / "index").write_bytes(b"index version 2")
+    assert find_files(config_metadata) == expected
+    assert mock_popen.call_count == 2
+
+
+def _provided_files(**kwargs: typing.Any) -> typing.List[str]:
+    assert kwargs["root_path"] == pathlib.Path.cwd()
+    return ["test_file_1.txt", "test_file_2.txt", "test_file_1.txt"]
+
+
+@patch("runem.files.subprocess.Popen")
+def test_find_files_from_file_providers(
+    mock_popen: Mock,
+    tmp_path: pathlib.Path,
+) -> None:
+    config_metadata = _prep_config(
+        tmp_path,
+        check_modified_files=False,
+        check_head_files=False,
+        always_files=None,
+        git_since_branch=None,
+    )
+    (tmp_path / "test_file_1.txt").write_text("")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "test_file_1.txt").write_text("")
+    config_metadata.file_provider = {"name": "walk", "ignore": ["sub/"]}
+    assert find_files(config_metadata) == {"dummy tag": ["test_file_1.txt"]}
+
+    (tmp_path / "providers.py").write_text(
+        "def provide(**kwargs):\n    return ['a/test_file_1.txt', 'b.txt']\n"
+    )
+    config_metadata.file_provider = {
+        "addr": {"file": "providers.py", "function": "provide"}
+    }
+    assert find_files(config_metadata) == {"dummy tag": ["a/test_file_1.txt"]}
+
+    with patch.dict(files.FILE_PROVIDERS, {"walk": _provided_files}):
+        config_metadata.file_provider = {"name": "walk"}
+        assert find_files(config_metadata) == {"dummy tag": ["test_file_1.txt"]}
+    mock_popen.assert_not_called()
@@ -0,0 +1,150 @@
+import os
+import pathlib
+import shutil
+import subprocess
+import typing
+
+import pytest
+
+from runem.git_index import (
+    list_tracked_files,
+    list_unstaged_files,
+    read_git_index,
+)
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def _git(repo: pathlib.Path, *args: str) -> typing.List[str]:
+    return (
+        subprocess.check_output(["git", "-c", "core.quotepath=false", *args], cwd=repo)
+        .decode("utf-8")
+        .splitlines()
+    )
+
+
+@pytest.fixture(name="git_repo")
+def git_repo_fixture(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> pathlib.Path:
+    # keep the user's git config, e.g. core.autocrlf, out of it
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "home" / ".config"))
+    repo: pathlib.Path = tmp_path / "repo"
+    (repo / "src" / "sub").mkdir(parents=True)
+    _git(repo, "init", "-q")
+    for file_idx in range(20):
+        (repo / "src" / f"file_{file_idx}.py").write_text(f"{file_idx}\n")
+    (repo / "src" / "sub" / "ünicode.txt").write_text("text\n")
+    (repo / "README.md").write_text("readme\n")
+    (repo / "src" / "link.py").symlink_to("file_0.py")
+    _git(repo, "add", "-A")
+    return repo
+
+
+@pytest.mark.parametrize("index_version", [2, 3, 4])
+def test_list_tracked_files_matches_git_ls_files(
+    git_repo: pathlib.Path, index_version: int
+) -> None:
+    _git(git_repo, "update-index", "--index-version", str(index_version))
+    assert list_tracked_files(git_repo) == _git(git_repo, "ls-files")
+    # git lists the files under the cwd, relative to it
+    sub_dir: pathlib.Path = git_repo / "src"
+    assert list_tracked_files(sub_dir) == _git(sub_dir, "ls-files")
+
+
+@pytest.mark.parametrize("index_version", [2, 4])
+def test_list_unstaged_files_matches_git_diff(
+    git_repo: pathlib.Path, index_version: int
+) -> None:
+    _git(git_repo, "update-index", "--index-version", str(index_version))
+    assert list_unstaged_files(git_repo) == []
+    (git_repo / "src" / "file_1.py").write_text("longer content\n")
+    # the same size, and maybe the same mtime, as the staged content
+    (git_repo / "src" / "file_2.py").write_text("x\n")
+    (git_repo / "src" / "file_3.py").unlink()
+    # touched but unchanged files are not modified
+    os.utime(git_repo / "src" / "file_4.py")
+    (git_repo / "src" / "link.py").unlink()
+    (git_repo / "src" / "link.py").symlink_to("file_5.py")
+    (git_repo / "untracked.py").write_text("untracked\n")
+    unstaged_files: typing.Optional[typing.List[str]] = list_unstaged_files(git_repo)
+    assert unstaged_files == _git(git_repo, "diff", "--name-only")
+    assert unstaged_files == [
+        "src/file_1.py",
+        "src/file_2.py",
+        "src/file_3.py",
+        "src/link.py",
+    ]
+    assert list_unstaged_files(git_repo, include_deleted=False) == _git(
+        git_repo, "diff", "--name-only", "--diff-filter=d"
+    )
+
+
+@pytest.mark.parametrize(
+    "attributes_path, attributes",
+    [
+        (".gitattributes", "* text=auto\n"),
+        (".gitattributes", "*.sh eol=lf\n"),
+        ("src/.gitattributes", "*.psd filter=lfs diff=lfs merge=lfs -text\n"),
+        (".git/info/attributes", "*.py ident\n"),
+    ],
+)
+def test_list_unstaged_files_defers_to_git_when_it_converts_content(
+    git_repo: pathlib.Path, attributes_path: str, attributes: str
+) -> None:
+    (git_repo / attributes_path).parent.mkdir(parents=True, exist_ok=True)
+    (git_repo / attributes_path).write_text(attributes)
+    _git(git_repo, "add", "-A")
+    assert list_unstaged_files(git_repo) is None
+    # only listing the files doesn't look at their content
+    assert list_tracked_files(git_repo) == _git(git_repo, "ls-files")
+
+
+def test_list_unstaged_files_defers_to_git_with_autocrlf(
+    git_repo: pathlib.Path,
+) -> None:
+    _git(git_repo, "config", "core.autocrlf", "input")
+    assert list_unstaged_files(git_repo) is None
+
+
+def test_list_unstaged_files_with_non_converting_attributes(
+    git_repo: pathlib.Path,
+) -> None:
+    (git_repo / ".gitattributes").write_text("*.png binary\n*.lock -diff\n")
+    _git(git_repo, "add", "-A")
+    assert list_unstaged_files(git_repo) == []
+
+
+def test_read_git_index_unsupported(git_repo: pathlib.Path) -> None:
+    git_dir: pathlib.Path = git_repo / ".git"
+    assert read_git_index(git_dir) is not None
+    # too big to be worth reading ourselves
+    assert read_git_index(git_dir, max_entries=1) is None
+    # some of the entries are in another file
+    _git(git_repo, "update-index", "--split-index")
+    assert read_git_index(git_dir) is None
+
+
+def test_read_git_index_corrupt(git_repo: pathlib.Path) -> None:
+    index_path: pathlib.Path = git_repo / ".git" / "index"
+    index_data: bytes = index_path.read_bytes()
+    index_path.write_bytes(index_data[:100])
+    assert read_git_index(git_repo / ".git") is None
+    index_path.write_bytes(b"not an index" + index_data)
+    assert read_git_index(git_repo / ".git") is None
+
+
+def test_list_files_defers_to_git_env_vars(
+    git_repo: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("GIT_INDEX_FILE", str(git_repo / "other-index"))
+    assert list_tracked_files(git_repo) is None
+    assert list_unstaged_files(git_repo) is None
+
+
+def test_list_files_without_an_index(tmp_path: pathlib.Path) -> None:
+    # e.g. before anything has been staged
+    (tmp_path / ".git").mkdir()
+    assert list_tracked_files(tmp_path) is None
+    assert list_unstaged_files(tmp_path) is None
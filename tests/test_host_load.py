@@ -0,0 +1,188 @@
+import pathlib
+import typing
+from datetime import timedelta
+
+import pytest
+
+from runem.host_load import (
+    AdmissionController,
+    count_loaded_descendants,
+    read_load_average,
+    read_pressure,
+)
+
+PRESSURE_TEXT = (
+    "some avg10={some} avg60=1.85 avg300=2.77 total=50579324\n"
+    "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+)
+
+
+# runem's pid, in the fake /proc
+ROOT_PID = 100
+
+
+def _write_processes(
+    proc_dir: pathlib.Path, processes: typing.List[typing.Tuple[int, str, int]]
+) -> None:
+    """Writes fake /proc/<pid>/stat files for each (pid, state, parent-pid)."""
+    for pid, state, ppid in processes:
+        (proc_dir / str(pid)).mkdir(parents=True)
+        (proc_dir / str(pid) / "stat").write_text(
+            f"{pid} (a (job)) {state} {ppid} {pid} {pid} 0 -1 4194560\n"
+        )
+
+
+def _write_host_state(
+    tmp_path: pathlib.Path,
+    load: str,
+    cpu: typing.Optional[str],
+    memory: str,
+    processes: typing.Optional[typing.List[typing.Tuple[int, str, int]]] = None,
+) -> AdmissionController:
+    """Writes fake /proc files, returning a controller reading them.
+
+    Without `cpu` the kernel has no PSI, so the load-average is used.
+    """
+    loadavg_path = tmp_path / "loadavg"
+    loadavg_path.write_text(f"{load} 0.29 0.22 2/72 23581\n")
+    pressure_dir = tmp_path / "pressure"
+    pressure_dir.mkdir()
+    if cpu is not None:
+        (pressure_dir / "cpu").write_text(PRESSURE_TEXT.format(some=cpu))
+    (pressure_dir / "memory").write_text(PRESSURE_TEXT.format(some=memory))
+    proc_dir = tmp_path / "proc"
+    proc_dir.mkdir()
+    _write_processes(proc_dir, processes or [])
+    return AdmissionController(
+        4,
+        loadavg_path=loadavg_path,
+        pressure_dir=pressure_dir,
+        proc_dir=proc_dir,
+        root_pid=ROOT_PID,
+    )
+
+
+def test_read_load_average(tmp_path: pathlib.Path) -> None:
+    loadavg_path = tmp_path / "loadavg"
+    loadavg_path.write_text("1.50 0.29 0.22 2/72 23581\n")
+    assert read_load_average(loadavg_path) == 1.5
+
+
+@pytest.mark.parametrize("content", [None, "", "not-a-number"])
+def test_read_load_average_unavailable(tmp_path: pathlib.Path, content: str) -> None:
+    loadavg_path = tmp_path / "loadavg"
+    if content is not None:
+        loadavg_path.write_text(content)
+    assert read_load_average(loadavg_path) is None
+
+
+def test_read_pressure(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "cpu").write_text(PRESSURE_TEXT.format(some="12.5"))
+    assert read_pressure("cpu", tmp_path) == 12.5
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        None,  # no PSI support
+        "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n",
+        "some avg10=bad avg60=0.00 avg300=0.00 total=0\n",
+        "some avg60=0.00 avg300=0.00 total=0\n",
+    ],
+)
+def test_read_pressure_unavailable(tmp_path: pathlib.Path, content: str) -> None:
+    if content is not None:
+        (tmp_path / "cpu").write_text(content)
+    assert read_pressure("cpu", tmp_path) is None
+
+
+def test_admission_with_idle_host(tmp_path: pathlib.Path) -> None:
+    admission = _write_host_state(tmp_path, load="0.10", cpu="0.40", memory="0.00")
+    assert admission.hold_back_reason(running_slots=3) is None
+
+
+@pytest.mark.parametrize(
+    "load, cpu, memory, expected",
+    [
+        ("6.00", None, "0.00", "load-average 6.00 on 4 cpus"),
+        ("0.00", "75.00", "0.00", "cpu pressure 75.0%"),
+        ("0.00", "0.00", "30.00", "memory pressure 30.0%"),
+    ],
+)
+def test_admission_with_saturated_host(
+    tmp_path: pathlib.Path,
+    load: str,
+    cpu: typing.Optional[str],
+    memory: str,
+    expected: str,
+) -> None:
+    admission = _write_host_state(tmp_path, load=load, cpu=cpu, memory=memory)
+    assert admission.hold_back_reason(running_slots=1) == expected
+    # when nothing of ours is running we always start a job, so we progress
+    assert admission.hold_back_reason(running_slots=0) is None
+
+
+def test_admission_ignores_our_own_load(tmp_path: pathlib.Path) -> None:
+    admission = _write_host_state(tmp_path, load="5.00", cpu=None, memory="0.00")
+    # 5 of the load is our 2 jobs plus 3 other processes, so there is capacity
+    assert admission.hold_back_reason(running_slots=2) is None
+
+
+def test_admission_without_psi_ignores_load_from_our_own_children(
+    tmp_path: pathlib.Path,
+) -> None:
+    # one job, e.g. `pytest -n 4`, whose 4 workers are most of the load
+    admission = _write_host_state(
+        tmp_path,
+        load="6.00",
+        cpu=None,
+        memory="0.00",
+        processes=[(101, "S", ROOT_PID)] + [(pid, "R", 101) for pid in range(102, 106)],
+    )
+    assert admission.hold_back_reason(running_slots=1) is None
+
+
+def test_admission_ignores_pressure_from_our_own_children(
+    tmp_path: pathlib.Path,
+) -> None:
+    # our one job's 4 workers alone fill the 4 cpus, so they cause the pressure
+    processes: typing.List[typing.Tuple[int, str, int]] = [
+        (101, "S", ROOT_PID),
+        *((pid, "R", 101) for pid in range(102, 106)),
+        (200, "R", 1),  # someone else's
+    ]
+    admission = _write_host_state(
+        tmp_path, load="9.00", cpu="90.00", memory="0.00", processes=processes
+    )
+    assert admission.hold_back_reason(running_slots=1) is None
+
+
+def test_count_loaded_descendants(tmp_path: pathlib.Path) -> None:
+    _write_processes(
+        tmp_path,
+        [
+            (ROOT_PID, "R", 1),  # runem itself isn't counted
+            (101, "S", ROOT_PID),
+            (102, "R", 101),
+            (103, "D", 101),  # waiting on i/o, counted in the load-average
+            (104, "Z", 101),
+            (200, "R", 1),  # someone else's
+        ],
+    )
+    (tmp_path / "self").mkdir()  # non-pid entries are skipped
+    assert count_loaded_descendants(ROOT_PID, tmp_path) == 2
+    assert count_loaded_descendants(ROOT_PID, tmp_path / "missing") is None
+
+
+def test_admission_without_proc_files(tmp_path: pathlib.Path) -> None:
+    admission = AdmissionController(
+        4, loadavg_path=tmp_path / "missing", pressure_dir=tmp_path / "missing"
+    )
+    assert admission.hold_back_reason(running_slots=3) is None
+
+
+def test_admission_records_throttled_time() -> None:
+    admission = AdmissionController(4)
+    admission.record_throttled(timedelta(seconds=1))
+    admission.record_throttled(timedelta(seconds=2))
+    assert admission.throttled == timedelta(seconds=3)
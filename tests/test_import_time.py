@@ -0,0 +1,53 @@
+import os
+import pathlib
+import re
+import subprocess
+import sys
+import typing
+
+import pytest
+
+# Modules that are slow to import, and only needed on some code paths. Runem is
+# run on every commit, and by agents many times a minute, so its start-up shows.
+_LAZY_MODULES: typing.Tuple[str, ...] = (
+    "jsonschema",  # validating config
+    "yaml",  # loading config, unless it's cached
+    "termplotlib",  # plotting the report's timings
+    "numpy",  # via termplotlib
+    "rich.spinner",  # the progress display
+    "rich.status",
+    "urllib.request",  # the shared cache-server
+    "runem.mcp.help",  # --help-agents
+)
+
+
+def _import_times(module: str) -> typing.Dict[str, int]:
+    """Returns the cumulative import-time, in us, of each module `module` loads.
+
+    Runs in a new interpreter so nothing is already imported.
+    """
+    # import this checkout's runem, even if it isn't installed
+    root_path: str = str(pathlib.Path(__file__).parent.parent)
+    python_path: str = os.pathsep.join(
+        filter(None, (root_path, os.environ.get("PYTHONPATH", "")))
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": python_path},
+    )
+    import_times: typing.Dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match:
+            import_times[match.group(2)] = int(match.group(1))
+    return import_times
+
+
+@pytest.mark.parametrize("module", ["runem.cli", "runem.runem"])
+def test_import_does_not_load_heavy_modules(module: str) -> None:
+    import_times: typing.Dict[str, int] = _import_times(module)
+    assert module in import_times
+    assert [name for name in _LAZY_MODULES if name in import_times] == []
@@ -6,7 +6,7 @@ import pytest
 from runem.job import BadWhenConfigLocation, Job, NoJobName
 from runem.types.common import FilePathList, JobTags
 from runem.types.filters import FilePathListLookup
-from runem.types.runem_config import JobConfig
+from runem.types.runem_config import JobConfig, JobShardConfig
 
 
 @pytest.mark.parametrize(
@@ -120,3 +120,110 @@ def test_get_job_name_invalid_config() -> None:
     job_config: JobConfig = {}
     with pytest.raises(NoJobName):
         Job.get_job_name(job_config)
+
+
+def test_get_job_dependencies() -> None:
+    job_config: JobConfig = {
+        "label": "reformat",
+        "when": {"phase": "edit", "after": ["install"]},
+    }
+    assert Job.get_job_dependencies(job_config) == {"install"}
+
+
+def test_get_job_dependencies_none() -> None:
+    job_config: JobConfig = {"label": "reformat", "when": {"phase": "edit"}}
+    assert Job.get_job_dependencies(job_config) is None
+
+
+@pytest.mark.parametrize(
+    "job_name, dependency, expected",
+    [
+        ("install", "install", True),
+        ("install(packages/app)", "install", True),
+        ("install(packages/app)", "install(packages/app)", True),
+        ("install-dev", "install", False),
+        ("pre-install", "install", False),
+    ],
+)
+def test_is_dependency_match(job_name: str, dependency: str, expected: bool) -> None:
+    assert Job.is_dependency_match(job_name, dependency) is expected
+
+
+def test_get_cpu_slots() -> None:
+    job_config: JobConfig = {"label": "pytest", "ctx": {"cpu_slots": 4}}
+    assert Job.get_cpu_slots(job_config) == 4
+
+
+@pytest.mark.parametrize(
+    "job_config",
+    [
+        {"label": "no ctx"},
+        {"label": "empty ctx", "ctx": None},
+        {"label": "no slots", "ctx": {"cwd": "."}},
+    ],
+)
+def test_get_cpu_slots_not_given(job_config: JobConfig) -> None:
+    assert Job.get_cpu_slots(job_config) is None
+
+
+@pytest.mark.parametrize(
+    "job_config, expected",
+    [
+        ({"label": "no ctx"}, 60.0),
+        ({"label": "no timeout", "ctx": {"cwd": "."}}, 60.0),
+        ({"label": "own timeout", "ctx": {"timeout_s": 5}}, 5),
+    ],
+)
+def test_get_timeout_s(job_config: JobConfig, expected: float) -> None:
+    """The job's own timeout takes precedence over --job-timeout's."""
+    assert Job.get_timeout_s(job_config, 60.0) == expected
+
+
+def test_get_timeout_s_not_given() -> None:
+    assert Job.get_timeout_s({"label": "no ctx"}, None) is None
+
+
+@pytest.mark.parametrize(
+    "job_config, expected",
+    [
+        ({"label": "no ctx"}, None),
+        ({"label": "no shard", "ctx": {"cwd": "."}}, None),
+        ({"label": "pylint", "ctx": {"shard": {"max_shards": 4}}}, {"max_shards": 4}),
+        (
+            {"command": "pylint {file_list}", "ctx": {"shard": {"max_shards": 4}}},
+            {"max_shards": 4},
+        ),
+        # can't be sharded, the command isn't given the files
+        ({"command": "pylint .", "ctx": {"shard": {"max_shards": 4}}}, None),
+    ],
+)
+def test_get_shard_config(
+    job_config: JobConfig, expected: typing.Optional[JobShardConfig]
+) -> None:
+    assert Job.get_shard_config(job_config) == expected
+
+
+@pytest.mark.parametrize(
+    "job_config, expected",
+    [
+        ({"label": "no ctx"}, None),
+        ({"command": "ruff check {file_list}", "ctx": {"cwd": "."}}, None),
+        (
+            {"command": "ruff check {file_list}", "ctx": {"incremental": "per-file"}},
+            "per-file",
+        ),
+        # runem can only choose the files of commands given `{file_list}`
+        ({"command": "ruff check .", "ctx": {"incremental": "per-file"}}, None),
+        (
+            {
+                "addr": {"file": "a.py", "function": "f"},
+                "ctx": {"incremental": "per-file"},
+            },
+            None,
+        ),  # fmt: skip
+    ],
+)
+def test_get_incremental_mode(
+    job_config: JobConfig, expected: typing.Optional[str]
+) -> None:
+    assert Job.get_incremental_mode(job_config) == expected
@@ -0,0 +1,158 @@
+import pathlib
+import typing
+
+import pytest
+
+from runem.cache_store import LocalCacheStore
+from runem.informative_dict import ReadOnlyInformativeDict
+from runem.job_cache import (
+    CachedJobResult,
+    job_cache_key,
+    load_cached_job_result,
+    save_cached_job_result,
+    stat_files,
+)
+from runem.types.runem_config import JobConfig
+
+
+def _job_function(**kwargs: typing.Any) -> None:
+    """A job-function, whose source is this file."""
+
+
+def _key(
+    job_config: JobConfig,
+    root_path: pathlib.Path,
+    options: typing.Optional[typing.Dict[str, bool]] = None,
+) -> typing.Optional[str]:
+    return job_cache_key(
+        job_config,
+        _job_function,
+        ReadOnlyInformativeDict(options or {"check-only": True}),
+        root_path,
+        ["a.py", "b.py"],
+    )
+
+
+def test_job_cache_key_changes_with_its_inputs(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a.py").write_text("a")
+    (tmp_path / "b.py").write_text("b")
+    job_config: JobConfig = {
+        "command": "lint {file_list}",
+        "label": "lint",
+        "when": {"phase": "analysis", "tags": {"py", "lint"}},
+    }
+    key: typing.Optional[str] = _key(job_config, tmp_path)
+    assert key is not None
+    # sets are keyed in a stable order
+    assert _key({**job_config, "when": {"phase": "analysis", "tags": {"lint", "py"}}}, tmp_path) == key  # fmt: skip
+
+    assert _key({**job_config, "command": "lint --fix {file_list}"}, tmp_path) != key
+    assert _key(job_config, tmp_path, options={"check-only": False}) != key
+    (tmp_path / "b.py").write_text("b changed")
+    assert _key(job_config, tmp_path) != key
+    (tmp_path / "b.py").unlink()
+    assert _key(job_config, tmp_path) != key
+
+
+def test_job_cache_key_changes_with_declared_inputs(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "a.py").write_text("a")
+    (tmp_path / "b.py").write_text("b")
+    (tmp_path / "lint.toml").write_text("strict = false")
+    (tmp_path / "rules").mkdir()
+    (tmp_path / "rules" / "one.toml").write_text("one")
+    monkeypatch.delenv("LINT_LEVEL", raising=False)
+    job_config: JobConfig = {
+        "command": "lint {file_list}",
+        "ctx": {
+            "cache": True,
+            "cache_inputs": ["lint.toml", "rules/**/*.toml"],
+            "cache_env": ["LINT_LEVEL"],
+        },
+        "label": "lint",
+    }
+    key: typing.Optional[str] = _key(job_config, tmp_path)
+    assert key is not None
+    assert _key(job_config, tmp_path) == key
+
+    # each change to a declared input misses the cache
+    keys: typing.Set[typing.Optional[str]] = {key}
+    (tmp_path / "lint.toml").write_text("strict = true")
+    keys.add(_key(job_config, tmp_path))
+    (tmp_path / "rules" / "one.toml").write_text("one changed")
+    keys.add(_key(job_config, tmp_path))
+    (tmp_path / "rules" / "two.toml").write_text("two")
+    keys.add(_key(job_config, tmp_path))
+    monkeypatch.setenv("LINT_LEVEL", "")
+    keys.add(_key(job_config, tmp_path))
+    monkeypatch.setenv("LINT_LEVEL", "high")
+    keys.add(_key(job_config, tmp_path))
+    assert len(keys) == 6
+
+    # files that aren't declared don't change the key
+    (tmp_path / "other.toml").write_text("other")
+    assert _key(job_config, tmp_path) in keys
+
+
+def test_job_cache_key_changes_with_the_command_executable(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    bin_path: pathlib.Path = tmp_path / "bin"
+    bin_path.mkdir()
+    lint_path: pathlib.Path = bin_path / "lint"
+    lint_path.write_text("#!/bin/sh\n")
+    lint_path.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_path))
+    (tmp_path / "a.py").write_text("a")
+    (tmp_path / "b.py").write_text("b")
+    job_config: JobConfig = {"command": "lint {file_list}", "label": "lint"}
+    key: typing.Optional[str] = _key(job_config, tmp_path)
+
+    # e.g. upgrading the tool
+    lint_path.write_text("#!/bin/sh\n# version 2\n")
+    assert _key(job_config, tmp_path) not in (None, key)
+
+
+def test_job_cache_key_needs_the_function_source(tmp_path: pathlib.Path) -> None:
+    assert (
+        job_cache_key(
+            {"label": "built-in"},
+            print,  # type: ignore[arg-type]
+            ReadOnlyInformativeDict({}),
+            tmp_path,
+            [],
+        )
+        is None
+    )
+
+
+def test_cached_job_result_round_trips(tmp_path: pathlib.Path) -> None:
+    result: CachedJobResult = {
+        "duration_s": 1.5,
+        "output": [("lint", "all good\n")],
+        "reports": {"reportUrls": [("coverage", "file:///coverage.html")]},
+    }
+    cache_store = LocalCacheStore(tmp_path, max_size_bytes=1024 * 1024)
+    assert load_cached_job_result(cache_store, "key") is None
+    save_cached_job_result(cache_store, "key", result)
+    assert load_cached_job_result(cache_store, "key") == result
+    assert load_cached_job_result(cache_store, "other key") is None
+
+
+def test_load_cached_job_result_ignores_bad_entries(
+    tmp_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    cache_store = LocalCacheStore(tmp_path, max_size_bytes=1024 * 1024)
+    cache_store.put("key", b"{not json")
+    assert load_cached_job_result(cache_store, "key") is None
+    assert "ignoring unreadable job cache entry" in capsys.readouterr().out
+
+
+def test_stat_files_tells_when_files_are_rewritten(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a.py").write_text("a")
+    stats = stat_files(tmp_path, ["a.py", "missing.py"])
+    assert stats[1] is None
+    assert stat_files(tmp_path, ["a.py", "missing.py"]) == stats
+    (tmp_path / "a.py").write_text("aa")
+    assert stat_files(tmp_path, ["a.py", "missing.py"]) != stats
@@ -14,7 +14,13 @@ from runem.informative_dict import InformativeDict
 from runem.job_execute import job_execute
 from runem.timer import RecordSubJobTimeType
 from runem.types.filters import FilePathListLookup
-from runem.types.runem_config import JobConfig, PhaseGroupedJobs
+from runem.types.runem_config import JobConfig, JobContextConfig, PhaseGroupedJobs
+from runem.types.types_jobs import (
+    JobReturn,
+    JobTiming,
+    RecordSubJobOutputType,
+    RecordSubJobResourcesType,
+)
 from tests.intentional_test_error import IntentionalTestError
 
 
@@ -36,9 +42,24 @@ def time_recording_function(
     record_sub_job_time("test entry 2", timedelta(seconds=200))
 
 
+def resource_recording_function(
+    record_sub_job_resources: typing.Optional[RecordSubJobResourcesType],
+    **kwargs: typing.Any,
+) -> None:
+    """Pretends to have run some commands."""
+    assert record_sub_job_resources is not None
+    record_sub_job_resources("command 1", {"max_rss_bytes": 100})
+    record_sub_job_resources("command 2", {"max_rss_bytes": 300})
+    record_sub_job_resources("command 3", {})
+
+
+def procs_returning_function(procs: int, **kwargs: typing.Any) -> typing.Any:
+    """Returns the `procs` the job was given, as a report."""
+    return {"reportUrls": [("procs", str(procs))]}
+
+
 def _job_execute_and_capture_stdout(
     job_config: JobConfig,
-    running_jobs: typing.Dict[str, str],
     config_metadata: ConfigMetadata,
     file_lists: FilePathListLookup,
 ) -> typing.Tuple[str, typing.Optional[BaseException]]:
@@ -46,7 +67,7 @@ def _job_execute_and_capture_stdout(
     ret_err: typing.Optional[BaseException] = None
     with io.StringIO() as buf, redirect_stdout(buf):
         try:
-            job_execute(job_config, running_jobs, {}, config_metadata, file_lists)
+            job_execute(job_config, config_metadata, file_lists)
         except BaseException as err:  # pylint: disable=broad-exception-caught
             # capture the error and return it
             ret_err = err
@@ -107,7 +128,7 @@ def test_job_execute_basic_call() -> None:
         ),
     )
     config_metadata.set_cli_data(
-        args=Namespace(verbose=False, procs=1),
+        args=Namespace(verbose=False, procs=1, cache=False),
         jobs_to_run=set((job_config["label"])),  # JobNames,
         phases_to_run=set(),  # ignored JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -119,7 +140,6 @@ def test_job_execute_basic_call() -> None:
     file_lists["dummy tag"] = [__file__]
     stdout, _ = _job_execute_and_capture_stdout(
         job_config,
-        {},
         config_metadata,
         file_lists,
     )
@@ -166,7 +186,7 @@ def test_job_execute_basic_call_verbose() -> None:
         ),
     )
     config_metadata.set_cli_data(
-        args=Namespace(verbose=True, procs=1),
+        args=Namespace(verbose=True, procs=1, cache=False),
         jobs_to_run=set((job_config["label"])),  # JobNames,
         phases_to_run=set(),  # ignored JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -178,7 +198,6 @@ def test_job_execute_basic_call_verbose() -> None:
     file_lists["dummy tag"] = [__file__]
     stdout, _ = _job_execute_and_capture_stdout(
         job_config,
-        {},
         config_metadata,
         file_lists,
     )
@@ -236,7 +255,7 @@ def test_job_execute_empty_files(silent: bool) -> None:
         ),
     )
     config_metadata.set_cli_data(
-        args=Namespace(verbose=(not silent), procs=1, silent=silent),
+        args=Namespace(verbose=(not silent), procs=1, silent=silent, cache=False),
         jobs_to_run=set((job_config["label"])),  # JobNames,
         phases_to_run=set(),  # ignored JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -248,7 +267,6 @@ def test_job_execute_empty_files(silent: bool) -> None:
     # file_lists["dummy tag"] = [__file__]
     stdout, _ = _job_execute_and_capture_stdout(
         job_config,
-        {},
         config_metadata,
         file_lists,
     )
@@ -307,7 +325,7 @@ def test_job_execute_with_ctx_cwd() -> None:
         ),
     )
     config_metadata.set_cli_data(
-        args=Namespace(verbose=True, procs=1),
+        args=Namespace(verbose=True, procs=1, cache=False),
         jobs_to_run=set((job_config["label"])),  # JobNames,
         phases_to_run=set(),  # ignored JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -319,7 +337,6 @@ def test_job_execute_with_ctx_cwd() -> None:
     file_lists["dummy tag"] = [__file__]
     stdout, _ = _job_execute_and_capture_stdout(
         job_config,
-        {},
         config_metadata,
         file_lists,
     )
@@ -383,7 +400,7 @@ def test_job_execute_with_raising_func() -> None:
         ),
     )
     config_metadata.set_cli_data(
-        args=Namespace(verbose=True, procs=1),
+        args=Namespace(verbose=True, procs=1, cache=False),
         jobs_to_run=set((job_config["label"])),  # JobNames,
         phases_to_run=set(),  # ignored JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -396,7 +413,6 @@ def test_job_execute_with_raising_func() -> None:
 
     stdout, err = _job_execute_and_capture_stdout(
         job_config,
-        {},
         config_metadata,
         file_lists,
     )
@@ -455,7 +471,7 @@ def test_job_execute_time_recording_function() -> None:
         ),
     )
     config_metadata.set_cli_data(
-        args=Namespace(verbose=False, procs=1),
+        args=Namespace(verbose=False, procs=1, cache=False),
         jobs_to_run=set((job_config["label"])),  # JobNames,
         phases_to_run=set(),  # ignored JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -467,8 +483,243 @@ def test_job_execute_time_recording_function() -> None:
     file_lists["dummy tag"] = [__file__]
     stdout, _ = _job_execute_and_capture_stdout(
         job_config,
-        {},
         config_metadata,
         file_lists,
     )
     assert stdout == ""
+
+
+@pytest.mark.parametrize(
+    "cpu_slots, expected_procs",
+    [
+        (None, 8),  # the --procs value
+        (3, 3),  # the cpus granted to the job
+    ],
+)
+def test_job_execute_passes_granted_cpu_slots_as_procs(
+    cpu_slots: typing.Optional[int], expected_procs: int
+) -> None:
+    job_config: JobConfig = {
+        "addr": {
+            "file": __file__,
+            "function": "procs_returning_function",
+        },
+        "label": "multi-core job",
+        "when": {
+            "phase": "edit",
+            "tags": set(("dummy tag",)),
+        },
+    }
+    expected_jobs: PhaseGroupedJobs = defaultdict(list)
+    expected_jobs["dummy phase 1"] = [job_config]
+    config_metadata: ConfigMetadata = ConfigMetadata(
+        cfg_filepath=pathlib.Path(__file__).parent / ".runem.yml",
+        phases=("dummy phase 1",),
+        options_config=tuple(),
+        file_filters={},
+        hook_manager=MagicMock(),
+        jobs=expected_jobs,
+        all_job_names=set(("multi-core job",)),
+        all_job_phases=set(("dummy phase 1",)),
+        all_job_tags=set(("dummy tag",)),
+    )
+    config_metadata.set_cli_data(
+        args=Namespace(verbose=False, procs=8, silent=False, cache=False),
+        jobs_to_run=set((job_config["label"])),  # JobNames,
+        phases_to_run=set(),  # ignored JobPhases,
+        tags_to_run=set(),  # ignored JobTags,
+        tags_to_avoid=set(),  # ignored  JobTags,
+        options=InformativeDict({}),  # Options,
+    )
+    file_lists: FilePathListLookup = defaultdict(list)
+    file_lists["dummy tag"] = [__file__]
+    _, reports = job_execute(
+        job_config, config_metadata, file_lists, cpu_slots=cpu_slots
+    )
+    assert reports is not None
+    assert reports["reportUrls"] == [("procs", str(expected_procs))]
+
+
+def test_job_execute_records_the_peak_memory_of_its_commands() -> None:
+    job_config: JobConfig = {
+        "addr": {
+            "file": __file__,
+            "function": "resource_recording_function",
+        },
+        "label": "memory hungry job",
+        "when": {
+            "phase": "edit",
+            "tags": set(("dummy tag",)),
+        },
+    }
+    expected_jobs: PhaseGroupedJobs = defaultdict(list)
+    expected_jobs["dummy phase 1"] = [job_config]
+    config_metadata: ConfigMetadata = ConfigMetadata(
+        cfg_filepath=pathlib.Path(__file__).parent / ".runem.yml",
+        phases=("dummy phase 1",),
+        options_config=tuple(),
+        file_filters={},
+        hook_manager=MagicMock(),
+        jobs=expected_jobs,
+        all_job_names=set(("memory hungry job",)),
+        all_job_phases=set(("dummy phase 1",)),
+        all_job_tags=set(("dummy tag",)),
+    )
+    config_metadata.set_cli_data(
+        args=Namespace(verbose=False, procs=1, silent=False, cache=False),
+        jobs_to_run=set((job_config["label"])),  # JobNames,
+        phases_to_run=set(),  # ignored JobPhases,
+        tags_to_run=set(),  # ignored JobTags,
+        tags_to_avoid=set(),  # ignored  JobTags,
+        options=InformativeDict({}),  # Options,
+    )
+    file_lists: FilePathListLookup = defaultdict(list)
+    file_lists["dummy tag"] = [__file__]
+    job_timing, _ = job_execute(job_config, config_metadata, file_lists)
+    assert job_timing["max_rss_bytes"] == 300
+    assert job_timing["command_resources"] == [
+        ("command 1", {"max_rss_bytes": 100}),
+        ("command 2", {"max_rss_bytes": 300}),
+        ("command 3", {}),
+    ]
+
+
+def _record_call(file_list: typing.List[str], call: str) -> None:
+    """Notes that the job ran, next to its files.
+
+    Jobs are loaded as a module of their own, so can't share globals with tests.
+    """
+    with open(pathlib.Path(file_list[0]).parent / "calls.txt", "a") as calls_file:
+        calls_file.write(f"{call}\n")
+
+
+def _calls(tmp_path: pathlib.Path) -> typing.List[str]:
+    calls_path: pathlib.Path = tmp_path / "calls.txt"
+    return calls_path.read_text().splitlines() if calls_path.exists() else []
+
+
+def cacheable_function(
+    file_list: typing.List[str],
+    record_sub_job_output: typing.Optional[RecordSubJobOutputType],
+    **kwargs: typing.Any,
+) -> typing.Any:
+    """Pretends to have linted its files."""
+    assert record_sub_job_output is not None
+    _record_call(file_list, "linted")
+    record_sub_job_output("lint", "all good\n")
+    return {"reportUrls": [("lint report", "file:///lint.html")]}
+
+
+def formatting_function(file_list: typing.List[str], **kwargs: typing.Any) -> None:
+    """Re-writes any of its files that aren't formatted."""
+    _record_call(file_list, "formatted")
+    for file_path in file_list:
+        if pathlib.Path(file_path).read_text() != "formatted\n":
+            pathlib.Path(file_path).write_text("formatted\n")
+
+
+def _run_cacheable_job(
+    function_name: str,
+    file_lists: FilePathListLookup,
+    cache: bool = True,
+    ctx: typing.Optional[JobContextConfig] = None,
+) -> typing.Tuple[str, JobTiming, JobReturn]:
+    job_config: JobConfig = {
+        "addr": {"file": __file__, "function": function_name},
+        "ctx": {"cache": True} if ctx is None else ctx,
+        "label": "cacheable job",
+        "when": {"phase": "edit", "tags": set(("dummy tag",))},
+    }
+    expected_jobs: PhaseGroupedJobs = defaultdict(list)
+    expected_jobs["dummy phase 1"] = [job_config]
+    config_metadata: ConfigMetadata = ConfigMetadata(
+        cfg_filepath=pathlib.Path(__file__).parent / ".runem.yml",
+        phases=("dummy phase 1",),
+        options_config=tuple(),
+        file_filters={},
+        hook_manager=MagicMock(),
+        jobs=expected_jobs,
+        all_job_names=set(("cacheable job",)),
+        all_job_phases=set(("dummy phase 1",)),
+        all_job_tags=set(("dummy tag",)),
+    )
+    config_metadata.set_cli_data(
+        args=Namespace(verbose=True, procs=1, silent=False, cache=cache),
+        jobs_to_run=set((job_config["label"])),  # JobNames,
+        phases_to_run=set(),  # ignored JobPhases,
+        tags_to_run=set(),  # ignored JobTags,
+        tags_to_avoid=set(),  # ignored  JobTags,
+        options=InformativeDict({"check-only": True}),  # Options,
+    )
+    with io.StringIO() as buf, redirect_stdout(buf):
+        job_timing, reports = job_execute(job_config, config_metadata, file_lists)
+        stdout: str = buf.getvalue()
+    return stdout, job_timing, reports
+
+
+def test_job_execute_skips_cached_jobs(tmp_path: pathlib.Path) -> None:
+    file_lists: FilePathListLookup = defaultdict(list)
+    file_lists["dummy tag"] = [str(tmp_path / "a.py")]
+    (tmp_path / "a.py").write_text("a = 1\n")
+
+    _, job_timing, reports = _run_cacheable_job("cacheable_function", file_lists)
+    assert "cached" not in job_timing
+    assert job_timing["cache_stats"]["local"]["misses"] == 1
+    assert job_timing["cache_stats"]["local"]["bytes_written"] > 0
+    assert _calls(tmp_path) == ["linted"]
+
+    # the output and reports are replayed, without running the job
+    stdout, job_timing, cached_reports = _run_cacheable_job(
+        "cacheable_function", file_lists
+    )
+    assert _calls(tmp_path) == ["linted"]
+    cache_stats = job_timing.pop("cache_stats")
+    assert job_timing == {
+        "job": ("cacheable job", timedelta(0)),
+        "commands": [],
+        "cached": True,
+    }
+    assert cache_stats["local"]["hits"] == 1
+    assert cached_reports == reports
+    assert stdout == (
+        "runem: START: 'cacheable job'\n"
+        "runem: job: cached: 'cacheable job', unchanged since it ran in 0:00:00\n"
+        "| lint: all good\n"
+    )
+
+    # --no-cache
+    _run_cacheable_job("cacheable_function", file_lists, cache=False)
+    assert _calls(tmp_path) == ["linted", "linted"]
+
+    # changed files
+    (tmp_path / "a.py").write_text("a = 2\n")
+    _run_cacheable_job("cacheable_function", file_lists)
+    assert _calls(tmp_path) == ["linted", "linted", "linted"]
+
+
+def test_job_execute_only_caches_jobs_that_opt_in(tmp_path: pathlib.Path) -> None:
+    file_lists: FilePathListLookup = defaultdict(list)
+    file_lists["dummy tag"] = [str(tmp_path / "a.py")]
+    (tmp_path / "a.py").write_text("a = 1\n")
+    for _ in range(2):
+        _, job_timing, _ = _run_cacheable_job("cacheable_function", file_lists, ctx={})
+        assert "cache_stats" not in job_timing
+    assert _calls(tmp_path) == ["linted", "linted"]
+
+
+def test_job_execute_does_not_cache_jobs_that_change_their_files(
+    tmp_path: pathlib.Path,
+) -> None:
+    file_lists: FilePathListLookup = defaultdict(list)
+    file_lists["dummy tag"] = [str(tmp_path / "a.py")]
+    (tmp_path / "a.py").write_text("unformatted\n")
+    for _ in range(3):
+        _run_cacheable_job("formatting_function", file_lists)
+    # re-formatting the file means the 2nd run sees a new file, which it leaves
+    # as-is, so the 3rd run is cached.
+    assert _calls(tmp_path) == ["formatted", "formatted"]
+
+    # put back as it was, so the 1st run must not be replayed
+    (tmp_path / "a.py").write_text("unformatted\n")
+    _run_cacheable_job("formatting_function", file_lists)
+    assert (tmp_path / "a.py").read_text() == "formatted\n"
@@ -0,0 +1,108 @@
+import pickle
+import signal
+import typing
+from datetime import timedelta
+from timeit import default_timer as timer
+from unittest.mock import patch
+
+import pytest
+
+from runem.job_executor import JobExecutor, _execute_on_worker
+from runem.job_progress import report_job_event
+from runem.log import log
+from runem.run_command import RunemJobTimeoutError, run_command, stop_process
+from tests.intentional_test_error import IntentionalTestError
+
+
+def _double(value: int) -> int:
+    report_job_event(value, f"job {value}", finished=True)
+    return value * 2
+
+
+def test_job_executor_reuses_pool_across_phases() -> None:
+    with JobExecutor(2) as executor:
+        pool = executor.pool
+        for phase_idx in range(3):
+            assert executor.pool is pool
+            assert executor.pool.map(_double, [phase_idx, 1]) == [phase_idx * 2, 2]
+            # the workers report on the shared progress channel
+            events = {executor.progress_events.get(), executor.progress_events.get()}
+            assert events == {(phase_idx, f"job {phase_idx}", True), (1, "job 1", True)}
+            assert executor.progress_events.empty()
+
+
+def _log_on_worker(value: int) -> int:
+    log(f"job {value} says hi", prefix=False)
+    return value
+
+
+def test_job_executor_workers_send_their_logs_to_the_display() -> None:
+    with JobExecutor(2) as executor:
+        assert executor.pool.map(_log_on_worker, [0, 1]) == [0, 1]
+        events = {executor.progress_events.get(), executor.progress_events.get()}
+        assert events == {("job 0 says hi", "\n"), ("job 1 says hi", "\n")}
+        assert executor.progress_events.empty()
+
+
+def test_job_executor_terminates_on_errors() -> None:
+    with patch.object(
+        JobExecutor, "close", autospec=True, side_effect=JobExecutor.close
+    ) as close_mock:
+        with pytest.raises(IntentionalTestError):
+            with JobExecutor(1) as executor:
+                raise IntentionalTestError()
+    close_mock.assert_called_once_with(executor, terminate=True)
+
+
+@patch("runem.job_executor.multiprocessing.Pool", side_effect=IntentionalTestError())
+def test_job_executor_closes_progress_channel_if_pool_fails(_: object) -> None:
+    with patch("runem.job_executor.new_progress_events") as events_mock:
+        with pytest.raises(IntentionalTestError):
+            JobExecutor(1)
+    events_mock.return_value.close.assert_called_once()
+
+
+def test_job_executor_worker_utilisation() -> None:
+    with patch("runem.job_executor.timer", return_value=100.0):
+        with JobExecutor(3) as executor:
+            executor.worker_busy = {
+                123: timedelta(seconds=5),
+                456: timedelta(seconds=10),
+            }
+            with patch("runem.job_executor.timer", return_value=120.0):
+                utilisation = executor.worker_utilisation()
+    # busiest first, including the worker that never ran a job
+    assert utilisation == [
+        (timedelta(seconds=10), 0.5),
+        (timedelta(seconds=5), 0.25),
+        (timedelta(), 0.0),
+    ]
+
+
+def _run_hung_command(*args: typing.Any) -> None:
+    run_command(["sleep", "30"], "hung command", verbose=False)
+
+
+def test_execute_on_worker_stops_jobs_that_time_out() -> None:
+    """The job is unwound on its timeout, and its command's process-group stopped."""
+    start: float = timer()
+    with (
+        patch("runem.job_executor.job_execute", side_effect=_run_hung_command),
+        patch("runem.run_command.stop_process", wraps=stop_process) as stop_mock,
+    ):
+        _, busy, job_run_metadata, job_error = _execute_on_worker(
+            0.2, {"label": "hung job", "command": "sleep 30"}
+        )
+    assert timer() - start < 10
+    # the time the worker spent on the job is still counted
+    assert busy >= timedelta(seconds=0.2)
+    assert job_run_metadata is None
+    assert isinstance(job_error, RunemJobTimeoutError)
+    stop_mock.assert_called_once()
+    assert signal.getsignal(signal.SIGALRM) == signal.SIG_DFL
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+    # the error is sent back to runem from the worker
+    timeout_error: RunemJobTimeoutError = pickle.loads(pickle.dumps(job_error))
+    assert (timeout_error.label, timeout_error.timeout_s) == ("hung job", 0.2)
+    assert "ran for longer than its 0.2s timeout" in timeout_error.stdout
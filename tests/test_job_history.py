@@ -0,0 +1,132 @@
+import pathlib
+from datetime import timedelta
+
+import pytest
+
+from runem.job_history import (
+    HISTORY_FILENAME,
+    JobHistory,
+    expected_duration,
+    expected_max_rss,
+    load_job_history,
+    save_job_history,
+    update_job_history,
+)
+from runem.types.types_jobs import JobRunMetadatasByPhase
+
+
+def test_load_job_history_handles_missing_state(tmp_path: pathlib.Path) -> None:
+    assert load_job_history(None) == {}
+    assert load_job_history(tmp_path / "does-not-exist") == {}
+
+
+def test_job_history_round_trips(tmp_path: pathlib.Path) -> None:
+    history: JobHistory = {"job 1": {"duration_s": 1.5}}
+    save_job_history(tmp_path / "state", history)
+    assert load_job_history(tmp_path / "state") == history
+    # no temp-files left lying around
+    assert [path.name for path in (tmp_path / "state").iterdir()] == [HISTORY_FILENAME]
+
+
+def test_save_job_history_handles_no_state_dir() -> None:
+    save_job_history(None, {"job 1": {"duration_s": 1.5}})
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "{not json",
+        "[]",
+    ],
+)
+def test_load_job_history_ignores_bad_files(
+    tmp_path: pathlib.Path, contents: str
+) -> None:
+    (tmp_path / HISTORY_FILENAME).write_text(contents)
+    assert load_job_history(tmp_path) == {}
+
+
+def test_update_job_history_smooths_durations() -> None:
+    history: JobHistory = {"job 1": {"duration_s": 4.0}}
+    job_run_metadatas: JobRunMetadatasByPhase = {
+        "_app": [
+            ({"job": ("pre-build", timedelta(seconds=100)), "commands": []}, None)
+        ],
+        "phase 1": [
+            ({"job": ("job 1", timedelta(seconds=2)), "commands": []}, None),
+            ({"job": ("job 2", timedelta(seconds=3)), "commands": []}, None),
+            ({"job": ("job 3: no files!", timedelta(0)), "commands": []}, None),
+            (
+                {
+                    "job": ("job 4", timedelta(seconds=0.01)),
+                    "commands": [],
+                    "cached": True,
+                },
+                None,
+            ),
+        ],
+    }
+    update_job_history(history, job_run_metadatas)
+    assert history == {
+        "job 1": {"duration_s": 3.0},
+        "job 2": {"duration_s": 3.0},
+    }
+
+
+def test_expected_duration() -> None:
+    history: JobHistory = {"job 1": {"duration_s": 4.0}, "job 2": {}}
+    assert expected_duration(history, "job 1") == timedelta(seconds=4)
+    assert expected_duration(history, "job 2") is None
+    assert expected_duration(history, "unknown job") is None
+
+
+def test_update_job_history_tracks_peak_memory() -> None:
+    history: JobHistory = {
+        "grew": {"duration_s": 1.0, "max_rss_bytes": 100},
+        "shrank": {"duration_s": 1.0, "max_rss_bytes": 100},
+    }
+    job_run_metadatas: JobRunMetadatasByPhase = {
+        "phase 1": [
+            (
+                {
+                    "job": ("grew", timedelta(seconds=1)),
+                    "commands": [],
+                    "max_rss_bytes": 300,
+                },
+                None,
+            ),
+            (
+                {
+                    "job": ("shrank", timedelta(seconds=1)),
+                    "commands": [],
+                    "max_rss_bytes": 20,
+                },
+                None,
+            ),
+            (
+                {
+                    "job": ("new", timedelta(seconds=1)),
+                    "commands": [],
+                    "max_rss_bytes": 50,
+                },
+                None,
+            ),
+            # ran no commands, so nothing was measured
+            ({"job": ("python job", timedelta(seconds=1)), "commands": []}, None),
+        ],
+    }
+    update_job_history(history, job_run_metadatas)
+    # increases are taken at once, decreases are smoothed
+    assert history == {
+        "grew": {"duration_s": 1.0, "max_rss_bytes": 300},
+        "shrank": {"duration_s": 1.0, "max_rss_bytes": 60},
+        "new": {"duration_s": 1.0, "max_rss_bytes": 50},
+        "python job": {"duration_s": 1.0},
+    }
+
+
+def test_expected_max_rss() -> None:
+    history: JobHistory = {"job 1": {"max_rss_bytes": 1024}, "job 2": {}}
+    assert expected_max_rss(history, "job 1") == 1024
+    assert expected_max_rss(history, "job 2") is None
+    assert expected_max_rss(history, "unknown job") is None
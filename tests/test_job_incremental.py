@@ -0,0 +1,117 @@
+import pathlib
+import threading
+import time
+import typing
+from unittest.mock import patch
+
+import pytest
+
+from runem.job_incremental import (
+    INCREMENTAL_DIRNAME,
+    IncrementalRun,
+    load_passed_files,
+    plan_incremental_run,
+    record_passed_files,
+)
+from runem.types.runem_config import JobConfig
+
+_JOB: JobConfig = {"command": "prettier --write {file_list}"}
+
+
+def _plan(tmp_path: pathlib.Path) -> IncrementalRun:
+    return plan_incremental_run(
+        tmp_path / "state", _JOB, {}, tmp_path, ["a.js", "b.js", "missing.js"]
+    )
+
+
+def test_files_rewritten_by_the_command_are_checked_again(
+    tmp_path: pathlib.Path,
+) -> None:
+    (tmp_path / "a.js").write_text("a")
+    (tmp_path / "b.js").write_text("b")
+    incremental_run: IncrementalRun = _plan(tmp_path)
+    assert incremental_run["file_list"] == ["a.js", "b.js", "missing.js"]
+
+    # the formatter re-wrote a file, so what it passed on is gone
+    (tmp_path / "a.js").write_text("a formatted")
+    record_passed_files(tmp_path / "state", tmp_path, incremental_run)
+    assert not (tmp_path / "state" / INCREMENTAL_DIRNAME).exists()
+
+    incremental_run = _plan(tmp_path)
+    record_passed_files(tmp_path / "state", tmp_path, incremental_run)
+    # missing files are never passed
+    assert _plan(tmp_path)["file_list"] == ["missing.js"]
+
+
+def test_changed_declared_inputs_check_every_file_again(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "a.js").write_text("a")
+    (tmp_path / "b.js").write_text("b")
+    (tmp_path / ".prettierrc").write_text("{}")
+    monkeypatch.delenv("PRETTIER_LEVEL", raising=False)
+    job_config: JobConfig = {
+        **_JOB,
+        "ctx": {"cache_inputs": [".prettierrc"], "cache_env": ["PRETTIER_LEVEL"]},
+    }
+
+    def _plan_files() -> typing.List[str]:
+        incremental_run: IncrementalRun = plan_incremental_run(
+            tmp_path / "state", job_config, {}, tmp_path, ["a.js", "b.js"]
+        )
+        record_passed_files(tmp_path / "state", tmp_path, incremental_run)
+        return incremental_run["file_list"]
+
+    assert _plan_files() == ["a.js", "b.js"]
+    assert _plan_files() == []
+
+    # e.g. the tool's config changed
+    (tmp_path / ".prettierrc").write_text('{"semi": false}')
+    assert _plan_files() == ["a.js", "b.js"]
+    assert _plan_files() == []
+
+    monkeypatch.setenv("PRETTIER_LEVEL", "strict")
+    assert _plan_files() == ["a.js", "b.js"]
+
+
+def test_shards_recording_at_once_keep_each_others_files(
+    tmp_path: pathlib.Path,
+) -> None:
+    (tmp_path / "a.js").write_text("a")
+    (tmp_path / "b.js").write_text("b")
+    shard_runs: typing.List[IncrementalRun] = [
+        plan_incremental_run(tmp_path / "state", _JOB, {}, tmp_path, [file_path])
+        for file_path in ("a.js", "b.js")
+    ]
+    load_passed_files_orig = load_passed_files
+
+    def _slow_load_passed_files(*args: typing.Any) -> typing.Dict[str, str]:
+        # widen the window between reading the record and writing it back
+        passed: typing.Dict[str, str] = load_passed_files_orig(*args)
+        time.sleep(0.2)
+        return passed
+
+    with patch(
+        "runem.job_incremental.load_passed_files",
+        side_effect=_slow_load_passed_files,
+    ):
+        threads: typing.List[threading.Thread] = [
+            threading.Thread(
+                target=record_passed_files,
+                args=(tmp_path / "state", tmp_path, shard_run),
+            )
+            for shard_run in shard_runs
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert _plan(tmp_path)["file_list"] == ["missing.js"]
+
+
+def test_load_passed_files_ignores_bad_records(tmp_path: pathlib.Path) -> None:
+    (tmp_path / INCREMENTAL_DIRNAME).mkdir()
+    (tmp_path / INCREMENTAL_DIRNAME / "key.json").write_text("{not json")
+    assert load_passed_files(tmp_path, "key") == {}
+    (tmp_path / INCREMENTAL_DIRNAME / "key.json").write_text("[]")
+    assert load_passed_files(tmp_path, "key") == {}
@@ -4,9 +4,15 @@ from contextlib import redirect_stdout
 from pathlib import Path
 from unittest.mock import ANY, Mock, patch
 
+import pytest
+
 from runem.config_metadata import ConfigMetadata
 from runem.job import Job
-from runem.job_runner_simple_command import job_runner_simple_command
+from runem.job_runner_simple_command import (
+    batch_file_list,
+    job_runner_simple_command,
+)
+from runem.run_command import OUTPUT_TAIL_CHARS, RunCommandBadExitCode
 from runem.types.runem_config import JobConfig
 from tests.utils.gen_dummy_config_metadata import gen_dummy_config_metadata
 
@@ -39,6 +45,7 @@ def test_job_runner_simple_command(mock_run_command: Mock) -> None:
     assert run_command_stdout.split("\n") == [""]
     mock_run_command.assert_called_once_with(
         cmd=["echo", '"testing job_runner_simple_command"'],
+        capture_tail_chars=OUTPUT_TAIL_CHARS,
         config_metadata=ANY,
         file_list=[],
         job={"command": "echo 'testing job_runner_simple_command'"},
@@ -92,6 +99,7 @@ def test_job_runner_simple_command_with_file_list(mock_run_command: Mock) -> Non
             '"file with spaces"',
             '"some option after files"',
         ],
+        capture_tail_chars=OUTPUT_TAIL_CHARS,
         config_metadata=ANY,
         file_list=file_list,
         job=job_config,
@@ -145,6 +153,7 @@ def test_job_runner_simple_command_with_option(mock_run_command: Mock) -> None:
             # Not this -> "--option_off",
             '"some option after switch"',
         ],
+        capture_tail_chars=OUTPUT_TAIL_CHARS,
         config_metadata=ANY,
         file_list=file_list,
         job=job_config,
@@ -154,3 +163,125 @@ def test_job_runner_simple_command_with_option(mock_run_command: Mock) -> None:
         root_path=Path("."),
         verbose=True,
     )
+
+
+@patch(
+    "runem.job_runner_simple_command.run_command",
+)
+def test_job_runner_simple_command_incremental(
+    mock_run_command: Mock, tmp_path: Path
+) -> None:
+    """Incremental commands are only given the files that changed since they passed."""
+    job_config: JobConfig = {
+        "command": "ruff check {file_list}",
+        "ctx": {"incremental": "per-file"},
+    }
+    config_metadata: ConfigMetadata = gen_dummy_config_metadata()
+    config_metadata.args.cache = True
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "b.py").write_text("b = 1\n")
+
+    def _run_and_get_files() -> typing.Optional[typing.List[str]]:
+        mock_run_command.reset_mock()
+        with io.StringIO() as buf, redirect_stdout(buf):
+            job_runner_simple_command(
+                file_list=["a.py", "b.py"],
+                job=job_config,
+                label=Job.get_job_name(job_config),
+                config_metadata=config_metadata,
+                options=config_metadata.options,  # type: ignore
+                procs=config_metadata.args.procs,
+                root_path=tmp_path,
+                verbose=False,
+            )
+        if not mock_run_command.called:
+            return None
+        files: typing.List[str] = mock_run_command.call_args.kwargs["file_list"]
+        return files
+
+    assert _run_and_get_files() == ["a.py", "b.py"]
+    assert _run_and_get_files() is None, "nothing changed, so nothing is run"
+
+    (tmp_path / "b.py").write_text("b = 2\n")
+    mock_run_command.side_effect = RuntimeError("b.py failed")
+    with pytest.raises(RuntimeError):
+        _run_and_get_files()
+    mock_run_command.side_effect = None
+    assert _run_and_get_files() == ["b.py"], "failed files are run again"
+    assert _run_and_get_files() is None
+
+    # a different command has to check all the files again
+    job_config["command"] = "ruff check --fix {file_list}"
+    assert _run_and_get_files() == ["a.py", "b.py"]
+
+    # as does --no-cache
+    config_metadata.args.cache = False
+    assert _run_and_get_files() == ["a.py", "b.py"]
+
+
+@patch("runem.job_runner_simple_command._environ_cost", return_value=0)
+@patch("runem.job_runner_simple_command._arg_max", return_value=1000)
+def test_batch_file_list(_: Mock, __: Mock) -> None:
+    """Files are only split into batches when they'd go over ARG_MAX."""
+    assert batch_file_list("ruff check {file_list}", []) == [[]]
+    few_files: typing.List[str] = ["a.py", "b.py"]
+    assert batch_file_list("ruff check {file_list}", few_files) == [few_files]
+
+    many_files: typing.List[str] = [f"{idx:0>100}.py" for idx in range(20)]
+    batches = batch_file_list("ruff check {file_list}", many_files)
+    assert len(batches) > 1
+    assert [file_path for batch in batches for file_path in batch] == many_files
+    for batch in batches:
+        arg_bytes: int = sum(len(file_path) + 3 + 8 for file_path in batch)
+        assert arg_bytes < 1000
+
+
+@pytest.mark.parametrize("cpu_slots", (None, 4))
+@patch("runem.job_runner_simple_command._environ_cost", return_value=0)
+@patch("runem.job_runner_simple_command._arg_max", return_value=1000)
+@patch("runem.job_runner_simple_command.run_command")
+def test_job_runner_simple_command_runs_batches(
+    mock_run_command: Mock, _: Mock, __: Mock, cpu_slots: typing.Optional[int]
+) -> None:
+    """Too many files for one command are run as several, all of them run.
+
+    And the failures of all of them are reported, as one.
+    """
+    job_config: JobConfig = {"command": "ruff check {file_list}"}
+    if cpu_slots is not None:
+        job_config["ctx"] = {"cpu_slots": cpu_slots}
+    config_metadata: ConfigMetadata = gen_dummy_config_metadata()
+    file_list: typing.List[str] = [f"{idx:0>100}.py" for idx in range(20)]
+
+    def _fail_on_first_and_last_files(**kwargs: typing.Any) -> None:
+        if file_list[0] in kwargs["file_list"]:
+            raise RunCommandBadExitCode("first batch failed")
+        if file_list[-1] in kwargs["file_list"]:
+            raise RunCommandBadExitCode("last batch failed")
+
+    mock_run_command.side_effect = _fail_on_first_and_last_files
+    with pytest.raises(RunCommandBadExitCode) as err_info:
+        job_runner_simple_command(
+            file_list=file_list,
+            job=job_config,
+            label="ruff",
+            config_metadata=config_metadata,
+            options=config_metadata.options,  # type: ignore
+            procs=cpu_slots or 1,
+            root_path=Path("."),
+            verbose=False,
+        )
+    assert err_info.value.stdout == "first batch failed\nlast batch failed"
+
+    num_batches: int = mock_run_command.call_count
+    assert num_batches > 1
+    run_files: typing.List[str] = []
+    labels: typing.Set[str] = set()
+    for call in mock_run_command.call_args_list:
+        labels.add(call.kwargs["label"])
+        run_files.extend(call.kwargs["file_list"])
+        assert call.kwargs["cmd"] == ["ruff", "check", *call.kwargs["file_list"]]
+    assert sorted(run_files) == file_list
+    assert labels == {
+        f"ruff ({idx}/{num_batches})" for idx in range(1, num_batches + 1)
+    }
@@ -0,0 +1,106 @@
+from collections import defaultdict
+
+import pytest
+
+from runem.job_history import JobHistory
+from runem.job_scheduler import (
+    JobDependencyCycle,
+    longest_first_order,
+    memory_estimates,
+    phased_job_dependencies,
+    uses_job_dependencies,
+)
+from runem.types.runem_config import Jobs, PhaseGroupedJobs
+
+JOBS: Jobs = [
+    {"label": "quick", "command": "echo quick"},
+    {"label": "slow", "command": "echo slow"},
+    {"label": "new", "command": "echo new"},
+    {"label": "medium", "command": "echo medium"},
+]
+
+
+def test_longest_first_order_without_history_keeps_config_order() -> None:
+    assert longest_first_order(JOBS, {}) == [0, 1, 2, 3]
+
+
+def test_longest_first_order() -> None:
+    history: JobHistory = {
+        "quick": {"duration_s": 0.1},
+        "slow": {"duration_s": 90.0},
+        "medium": {"duration_s": 5.0},
+    }
+    # unknown jobs are started first as they might be slow
+    assert longest_first_order(JOBS, history) == [2, 1, 3, 0]
+
+
+def test_memory_estimates() -> None:
+    history: JobHistory = {
+        "quick": {"duration_s": 0.1, "max_rss_bytes": 100},
+        "slow": {"duration_s": 90.0},
+        "medium": {"max_rss_bytes": 2000},
+    }
+    # jobs we haven't measured get an even share of the budget
+    assert memory_estimates(JOBS, history, 1000, 4) == [100, 250, 250, 2000]
+
+
+def test_uses_job_dependencies() -> None:
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["phase 1"] = [{"label": "a", "when": {"phase": "phase 1"}}]
+    assert not uses_job_dependencies(("phase 1",), jobs_by_phase)
+    jobs_by_phase["phase 1"].append(
+        {"label": "b", "when": {"phase": "phase 1", "after": ["a"]}}
+    )
+    assert uses_job_dependencies(("phase 1",), jobs_by_phase)
+
+
+def test_phased_job_dependencies() -> None:
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["pre-run"] = [
+        {"label": "install", "when": {"phase": "pre-run"}},
+        {"label": "ls", "when": {"phase": "pre-run"}},
+    ]
+    jobs_by_phase["edit"] = [
+        {"label": "reformat", "when": {"phase": "edit", "after": ["install"]}},
+    ]
+    jobs_by_phase["analysis"] = [
+        {"label": "lint", "when": {"phase": "analysis"}},
+        # "filtered-out" is not being run, so is ignored
+        {
+            "label": "test",
+            "when": {"phase": "analysis", "after": ["install", "filtered-out"]},
+        },
+    ]
+    phased_jobs, dependencies = phased_job_dependencies(
+        ("pre-run", "edit", "analysis"), jobs_by_phase
+    )
+    assert [(phase, job["label"]) for phase, job in phased_jobs] == [
+        ("pre-run", "install"),
+        ("pre-run", "ls"),
+        ("edit", "reformat"),
+        ("analysis", "lint"),
+        ("analysis", "test"),
+    ]
+    assert dependencies == {
+        0: set(),
+        1: set(),
+        2: {0},
+        # jobs without `after` wait on all the earlier phases
+        3: {0, 1, 2},
+        4: {0},
+    }
+
+
+def test_phased_job_dependencies_cycle() -> None:
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["phase 1"] = [
+        {"label": "a", "when": {"phase": "phase 1", "after": ["c"]}},
+    ]
+    jobs_by_phase["phase 2"] = [
+        # waits on 'a' via the phases, whilst 'a' waits on 'c'
+        {"label": "b", "when": {"phase": "phase 2"}},
+        {"label": "c", "when": {"phase": "phase 2", "after": ["b"]}},
+    ]
+    with pytest.raises(JobDependencyCycle) as err_info:
+        phased_job_dependencies(("phase 1", "phase 2"), jobs_by_phase)
+    assert "'a', 'b', 'c'" in str(err_info.value)
@@ -0,0 +1,157 @@
+import pathlib
+from collections import defaultdict
+from datetime import timedelta
+
+import pytest
+
+from runem.job_shard import (
+    ShardedJobs,
+    count_tasks,
+    get_num_shards,
+    merge_shard_results,
+    shard_dependencies,
+    shard_jobs,
+    shard_priority_order,
+    split_file_list,
+)
+from runem.types.filters import FilePathListLookup
+from runem.types.runem_config import Jobs, JobShardConfig
+from runem.types.types_jobs import JobRunMetadata
+
+JOBS: Jobs = [
+    {"label": "install", "command": "echo install"},
+    {
+        "label": "lint",
+        "command": "pylint {file_list}",
+        "ctx": {"shard": {"max_shards": 3, "min_files_per_shard": 2}},
+        "when": {"phase": "analysis", "tags": {"py"}},
+    },
+    {"label": "test", "command": "echo test"},
+]
+
+
+@pytest.mark.parametrize(
+    "shard_config, num_files, expected",
+    [
+        ({}, 100, 4),  # defaults to the number of workers
+        ({}, 25, 2),  # at least 10 files per shard by default
+        ({}, 5, 1),
+        ({"max_shards": 2}, 100, 2),
+        ({"max_shards": 16}, 100, 4),  # no more than the number of workers
+        ({"min_files_per_shard": 50}, 100, 2),
+        ({"min_files_per_shard": 1}, 0, 1),
+    ],
+)
+def test_get_num_shards(
+    shard_config: JobShardConfig, num_files: int, expected: int
+) -> None:
+    assert get_num_shards(shard_config, num_files, 4) == expected
+
+
+def test_split_file_list_balances_by_size(tmp_path: pathlib.Path) -> None:
+    sizes = {"a.py": 90, "b.py": 50, "c.py": 40, "d.py": 30, "e.py": 20}
+    for file_name, size in sizes.items():
+        (tmp_path / file_name).write_text("x" * size)
+    shards = split_file_list(
+        [*sizes.keys(), "deleted.py"], num_shards=2, root_path=tmp_path
+    )
+    # 90+30 vs 50+40+20+1, files keep their order within each shard
+    assert shards == [["a.py", "d.py"], ["b.py", "c.py", "e.py", "deleted.py"]]
+
+
+def _sharded_jobs(tmp_path: pathlib.Path) -> ShardedJobs:
+    file_lists: FilePathListLookup = defaultdict(list)
+    file_lists["py"] = [f"file_{idx}.py" for idx in range(7)]
+    assert count_tasks(JOBS, file_lists, 8) == 5
+    return shard_jobs(JOBS, file_lists, 8, tmp_path)
+
+
+def test_shard_jobs(tmp_path: pathlib.Path) -> None:
+    sharded: ShardedJobs = _sharded_jobs(tmp_path)
+    assert sharded["tasks"] == [JOBS[0], JOBS[1], JOBS[1], JOBS[1], JOBS[2]]
+    assert sharded["job_indices"] == [0, 1, 1, 1, 2]
+    assert sharded["shards"][0] is None
+    assert sharded["shards"][4] is None
+    shard_files = []
+    for shard in sharded["shards"][1:4]:
+        assert shard is not None
+        assert shard["count"] == 3
+        shard_files.extend(shard["file_list"])
+    assert sorted(shard_files) == [f"file_{idx}.py" for idx in range(7)]
+
+
+def test_shard_dependencies_and_priority(tmp_path: pathlib.Path) -> None:
+    sharded: ShardedJobs = _sharded_jobs(tmp_path)
+    # lint after install, test after lint
+    assert shard_dependencies(sharded, {1: {0}, 2: {1}}) == {
+        0: set(),
+        1: {0},
+        2: {0},
+        3: {0},
+        4: {1, 2, 3},
+    }
+    assert shard_priority_order(sharded, [1, 2, 0]) == [1, 2, 3, 4, 0]
+
+
+def test_merge_shard_results(tmp_path: pathlib.Path) -> None:
+    sharded: ShardedJobs = _sharded_jobs(tmp_path)
+
+    def _result(label: str, seconds: int, max_rss_bytes: int) -> JobRunMetadata:
+        return (
+            {
+                "job": (label, timedelta(seconds=seconds)),
+                "commands": [(label, timedelta(seconds=seconds))],
+                "command_resources": [(label, {"max_rss_bytes": max_rss_bytes})],
+                "max_rss_bytes": max_rss_bytes,
+            },
+            {"reportUrls": [(label, f"{label}-{seconds}.html")]},
+        )
+
+    install = _result("install", 1, 10)
+    assert merge_shard_results(
+        sharded,
+        3,
+        [
+            install,
+            _result("lint", 2, 100),
+            _result("lint", 3, 300),
+            _result("lint", 4, 200),
+            None,  # didn't run
+        ],
+    ) == [
+        install,
+        (
+            {
+                "job": ("lint", timedelta(seconds=9)),
+                "commands": [
+                    ("lint", timedelta(seconds=2)),
+                    ("lint", timedelta(seconds=3)),
+                    ("lint", timedelta(seconds=4)),
+                ],
+                "command_resources": [
+                    ("lint", {"max_rss_bytes": 100}),
+                    ("lint", {"max_rss_bytes": 300}),
+                    ("lint", {"max_rss_bytes": 200}),
+                ],
+                "max_rss_bytes": 300,
+            },
+            {
+                "reportUrls": [
+                    ("lint", "lint-2.html"),
+                    ("lint", "lint-3.html"),
+                    ("lint", "lint-4.html"),
+                ]
+            },
+        ),
+        None,
+    ]
+
+
+def test_merge_shard_results_drops_incomplete_jobs(tmp_path: pathlib.Path) -> None:
+    sharded: ShardedJobs = _sharded_jobs(tmp_path)
+    lint: JobRunMetadata = ({"job": ("lint", timedelta(1)), "commands": []}, None)
+    assert merge_shard_results(sharded, 3, [None, lint, None, lint, None]) == [
+        None,
+        None,
+        None,
+    ]
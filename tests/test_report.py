@@ -3,13 +3,25 @@ import typing
 from contextlib import redirect_stdout
 from datetime import timedelta
 
-from runem.report import _print_reports_by_phase, report_on_run
+import pytest
+
+from runem.report import (
+    _print_cache_stats,
+    _print_reports_by_phase,
+    _print_resource_usage,
+    _print_timed_out,
+    cpu_efficiency,
+    report_on_run,
+)
 from runem.types.common import OrderedPhases
 from runem.types.types_jobs import (
+    CacheStats,
+    CommandResources,
     JobReturn,
     JobRunMetadata,
     JobRunMetadatasByPhase,
     JobRunReportByPhase,
+    JobRunTimesByPhase,
     JobTiming,
 )
 from tests.sanitise_reports_footer import sanitise_reports_footer
@@ -236,3 +248,154 @@ def test_print_reports_by_phase() -> None:
         "",
     ]
     assert run_command_stdout.split("\n") == expected_logs
+
+
+def test_print_cache_stats() -> None:
+    stats: CacheStats = {
+        "hits": 3,
+        "misses": 1,
+        "bytes_read": 1536,
+        "bytes_written": 100,
+        "bytes_evicted": 3 * 1024 * 1024,
+    }
+    timing_data: JobRunTimesByPhase = {
+        "_app": [{"job": ("pre-build", timedelta(0)), "commands": []}],
+        "phase1": [
+            {"job": ("job 1", timedelta(0)), "commands": []},
+            {
+                "job": ("job 2", timedelta(0)),
+                "commands": [],
+                "cache_stats": {"local": stats},
+            },
+        ],
+        "phase2": [
+            {
+                "job": ("job 3", timedelta(0)),
+                "commands": [],
+                "cache_stats": {"local": stats},
+            },
+        ],
+    }
+    with io.StringIO() as buf, redirect_stdout(buf):
+        _print_cache_stats(timing_data)
+        run_command_stdout = buf.getvalue()
+    assert run_command_stdout.split("\n") == [
+        (
+            "runem: cache: local: 6 hits, 2 misses (75%), read 3.0 KB, "
+            "wrote 200 B, evicted 6.0 MB"
+        ),
+        "",
+    ]
+
+    # nothing is shown when the cache wasn't used
+    with io.StringIO() as buf, redirect_stdout(buf):
+        _print_cache_stats({"phase1": [{"job": ("job", timedelta(0)), "commands": []}]})
+        assert buf.getvalue() == ""
+
+
+def test_print_resource_usage() -> None:
+    timing_data: JobRunTimesByPhase = {
+        "phase1": [
+            {"job": ("no commands", timedelta(seconds=1)), "commands": []},
+            {
+                "job": ("pytest", timedelta(seconds=2)),
+                "commands": [
+                    ("pytest 1", timedelta(seconds=1)),
+                    ("pytest 2", timedelta(seconds=1)),
+                ],
+                "command_resources": [
+                    (
+                        "pytest 1",
+                        {
+                            "max_rss_bytes": 2 * 1024 * 1024,
+                            "user_cpu_s": 2.5,
+                            "system_cpu_s": 0.5,
+                            "block_reads": 10,
+                            "block_writes": 20,
+                            "voluntary_ctx_switches": 30,
+                            "involuntary_ctx_switches": 40,
+                        },
+                    ),
+                    (
+                        "pytest 2",
+                        {
+                            "max_rss_bytes": 1024 * 1024,
+                            "user_cpu_s": 0.5,
+                            "system_cpu_s": 0.5,
+                            "block_reads": 1,
+                            "block_writes": 2,
+                            "voluntary_ctx_switches": 3,
+                            "involuntary_ctx_switches": 4,
+                        },
+                    ),
+                ],
+            },
+        ],
+    }
+    with io.StringIO() as buf, redirect_stdout(buf):
+        _print_resource_usage(timing_data)
+        run_command_stdout = buf.getvalue()
+    assert run_command_stdout.split("\n") == [
+        (
+            "runem: resources: pytest: 200% cpu (3.00s user, 1.00s sys, in 2.00s), "
+            "peak 2.0 MB, 11 blocks read, 22 written, 33 waits, 44 preemptions"
+        ),
+        "",
+    ]
+
+
+@pytest.mark.parametrize("verbose", [True, False])
+def test_report_on_run_only_shows_resources_when_verbose(verbose: bool) -> None:
+    job_timing: JobTiming = {
+        "job": ("pytest", timedelta(seconds=2)),
+        "commands": [("pytest", timedelta(seconds=2))],
+        "command_resources": [
+            (
+                "pytest",
+                {
+                    "max_rss_bytes": 1024 * 1024,
+                    "user_cpu_s": 1.0,
+                    "system_cpu_s": 0.5,
+                    "block_reads": 1,
+                    "block_writes": 2,
+                    "voluntary_ctx_switches": 3,
+                    "involuntary_ctx_switches": 4,
+                },
+            ),
+        ],
+    }
+    with io.StringIO() as buf, redirect_stdout(buf):
+        report_on_run(
+            phase_run_oder=("phase 1",),
+            job_run_metadatas={"phase 1": [(job_timing, None)]},
+            wall_clock_for_runem_main=timedelta(seconds=3),
+            verbose=verbose,
+        )
+        run_command_stdout = buf.getvalue()
+    assert ("runem: resources: pytest: 75% cpu" in run_command_stdout) is verbose
+
+
+def test_cpu_efficiency() -> None:
+    resources: CommandResources = {"user_cpu_s": 0.5, "system_cpu_s": 0.25}
+    assert cpu_efficiency(resources, timedelta(seconds=3)) == 0.25
+    assert cpu_efficiency(resources, timedelta(0)) == 0.0
+
+
+def test_print_timed_out() -> None:
+    timing_data: JobRunTimesByPhase = {
+        "phase1": [{"job": ("quick", timedelta(seconds=1)), "commands": []}],
+        "_timed_out": [
+            {
+                "job": ("hangs", timedelta(seconds=30)),
+                "commands": [],
+                "timed_out": True,
+            }
+        ],
+    }
+    with io.StringIO() as buf, redirect_stdout(buf):
+        _print_timed_out(timing_data)
+        run_command_stdout = buf.getvalue()
+    assert run_command_stdout.split("\n") == [
+        "runem: timed out: hangs: stopped after 30.0s",
+        "",
+    ]
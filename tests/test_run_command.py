@@ -1,14 +1,22 @@
 import io
+import os
 import pathlib
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 from collections import deque
 from contextlib import redirect_stdout
 from datetime import timedelta
-from typing import Tuple
+from typing import List, Tuple
 from unittest.mock import Mock, patch
 
 import pytest
 
 import runem.run_command
+from runem.types.types_jobs import CommandResources
 
 
 class MockPopen:
@@ -417,3 +425,254 @@ def test_run_command_basic_call_verbose_with_cwd(mock_popen: Mock) -> None:
         "",
     ]
     mock_popen.assert_called_once()
+
+
+def test_run_command_runs_commands_in_their_own_process_group() -> None:
+    """Commands can be stopped as a group, but keep our session and terminal."""
+    output: str = runem.run_command.run_command(
+        [
+            sys.executable,
+            "-c",
+            "import os; print(os.getpid(), os.getpgrp(), os.getsid(0))",
+        ],
+        "process group",
+        verbose=False,
+    )
+    pid, pgid, sid = (int(value) for value in output.split())
+    assert pgid == pid
+    assert sid == os.getsid(0)
+
+
+def test_stop_process_terminates_the_process_group() -> None:
+    process: "subprocess.Popen[str]" = subprocess.Popen(
+        ["sh", "-c", "sleep 30 & sleep 30"],
+        start_new_session=True,
+        text=True,
+    )
+    runem.run_command.stop_process(process)
+    assert process.returncode == -signal.SIGTERM
+    # the background 'sleep' was in the group too, so has also gone, once it
+    # has been reaped by whatever adopted it
+    with pytest.raises(ProcessLookupError):
+        for _ in range(200):
+            os.killpg(process.pid, 0)
+            time.sleep(0.01)
+
+
+def test_stop_process_kills_after_grace_period() -> None:
+    process: "subprocess.Popen[str]" = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            (
+                "import signal, time; "
+                "signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+                "print('ready', flush=True); "
+                "time.sleep(30)"
+            ),
+        ],
+        start_new_session=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert process.stdout is not None
+    assert process.stdout.readline() == "ready\n"
+    runem.run_command.stop_process(process, grace_period_s=0.1)
+    assert process.returncode == -signal.SIGKILL
+    process.stdout.close()
+
+
+def test_run_command_stops_command_when_stopped() -> None:
+    """When runem stops a job, e.g. on --fail-fast, the command is stopped."""
+    with (
+        patch(
+            "runem.run_command._watch_process", side_effect=SystemExit(143)
+        ) as watch_mock,
+        patch(
+            "runem.run_command.stop_process", wraps=runem.run_command.stop_process
+        ) as stop_mock,
+        pytest.raises(SystemExit),
+    ):
+        runem.run_command.run_command(["sleep", "30"], "test command", verbose=False)
+    stop_mock.assert_called_once()
+    process = watch_mock.call_args[0][1]
+    assert process.returncode == -signal.SIGTERM
+    process.stdout.close()
+
+
+def test_stop_running_commands_stops_commands_on_other_threads() -> None:
+    """Commands run on other threads are stopped along with the job."""
+    errors: List[BaseException] = []
+
+    def _run() -> None:
+        try:
+            runem.run_command.run_command(
+                ["sleep", "30"], "threaded command", verbose=False
+            )
+        except runem.run_command.RunCommandBadExitCode as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=_run)
+    thread.start()
+    for _ in range(200):
+        if runem.run_command._RUNNING_PROCESSES:
+            break
+        time.sleep(0.01)
+    runem.run_command.stop_running_commands()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert len(errors) == 1, "stopped, so exited with SIGTERM's exit code"
+    assert not runem.run_command._RUNNING_PROCESSES
+
+
+def test_run_command_records_the_peak_memory_of_the_command() -> None:
+    """A real command is reaped with wait4(), measuring its peak memory & cpu."""
+    recorded: List[Tuple[str, CommandResources]] = []
+
+    def _record_resources(label: str, resources: CommandResources) -> None:
+        recorded.append((label, resources))
+
+    output = runem.run_command.run_command(
+        cmd=[sys.executable, "-c", "data = bytearray(64 * 1024 * 1024); print('ok')"],
+        label="big command",
+        verbose=False,
+        record_sub_job_resources=_record_resources,
+    )
+    assert output == "ok\n"
+    assert len(recorded) == 1
+    label, resources = recorded[0]
+    assert label == "big command"
+    assert resources["max_rss_bytes"] >= 64 * 1024 * 1024
+    # and the rest of its rusage
+    assert resources["user_cpu_s"] + resources["system_cpu_s"] > 0
+    assert set(resources) == {
+        "max_rss_bytes",
+        "user_cpu_s",
+        "system_cpu_s",
+        "block_reads",
+        "block_writes",
+        "voluntary_ctx_switches",
+        "involuntary_ctx_switches",
+    }
+
+
+def test_run_command_records_the_output_of_the_command() -> None:
+    recorded: List[Tuple[str, str]] = []
+
+    def _record_output(label: str, stdout: str) -> None:
+        recorded.append((label, stdout))
+
+    runem.run_command.run_command(
+        cmd=["echo", "hello"],
+        label="echo",
+        verbose=False,
+        record_sub_job_output=_record_output,
+    )
+    assert recorded == [("echo", "hello\n")]
+
+
+def test_output_tail_keeps_the_end_of_the_output() -> None:
+    tail = runem.run_command._OutputTail(max_chars=10)
+    tail.append("line 1\n")
+    assert not tail.truncated
+    assert tail.getvalue() == "line 1\n"
+    for line_no in range(2, 100):
+        tail.append(f"line {line_no}\n")
+    assert tail.truncated
+    # starts at a whole line, within the last 10 chars
+    assert tail.getvalue() == "line 99\n"
+
+
+def test_run_command_captures_the_tail_of_long_output(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    lines_cmd: List[str] = [
+        sys.executable,
+        "-c",
+        "import sys\nfor i in range(10000): print(f'line {i}')\nsys.exit(1)",
+    ]
+    with pytest.raises(runem.run_command.RunCommandBadExitCode) as err_info:
+        runem.run_command.run_command(
+            cmd=lines_cmd,
+            label="long output",
+            verbose=False,
+            capture_tail_chars=100,
+        )
+    error: str = err_info.value.stdout
+    assert "line 9999" in error
+    assert "line 0\n" not in error
+    # the full output is left for the user, and named in the error
+    (spill_path,) = tmp_path.glob("runem-output-*.log")
+    assert f"all of it is in {str(spill_path)}" in error
+    assert spill_path.read_text().splitlines() == [
+        f"line {line_no}" for line_no in range(10000)
+    ]
+
+    # passing commands tidy up after themselves
+    spill_path.unlink()
+    output: str = runem.run_command.run_command(
+        cmd=lines_cmd[:2] + ["for i in range(10000): print(f'line {i}')"],
+        label="long output",
+        verbose=False,
+        capture_tail_chars=100,
+    )
+    assert output.startswith("line 99")
+    assert output.endswith("line 9999\n")
+    assert not list(tmp_path.iterdir())
+
+
+def test_run_command_captures_all_of_short_output(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    recorded: List[Tuple[str, str]] = []
+
+    def _record_output(label: str, stdout: str) -> None:
+        recorded.append((label, stdout))
+
+    with io.StringIO() as buf, redirect_stdout(buf):
+        output: str = runem.run_command.run_command(
+            cmd=[sys.executable, "-c", "print('one\\r\\ntwo'); print('three', end='')"],
+            label="short",
+            verbose=True,
+            decorate_logs=False,
+            record_sub_job_output=_record_output,
+            capture_tail_chars=1000,
+        )
+        stdout: str = buf.getvalue()
+    # newlines are translated, as in text mode
+    assert output == "one\ntwo\nthree"
+    assert recorded == [("short", output)]
+    assert "| short: one\n| short: two\n| short: three\n" in stdout
+    assert not list(tmp_path.iterdir())
+
+
+def test_run_command_logs_output_as_it_happens(tmp_path: pathlib.Path) -> None:
+    """The command only exits once it sees that its first line was logged."""
+    seen_path: pathlib.Path = tmp_path / "seen"
+    logged: List[str] = []
+
+    def _log_command_stdout(label: str, stdout: str) -> None:
+        logged.append(stdout)
+        seen_path.touch()
+
+    wait_for_log: str = (
+        "import os, sys, time\n"
+        "print('first', flush=True)\n"
+        "for _ in range(500):\n"
+        "    if os.path.exists(sys.argv[1]):\n"
+        "        print('second')\n"
+        "        sys.exit(0)\n"
+        "    time.sleep(0.01)\n"
+        "sys.exit(1)\n"
+    )
+    with patch("runem.run_command.log_command_stdout", _log_command_stdout):
+        output: str = runem.run_command.run_command(
+            cmd=[sys.executable, "-c", wait_for_log, str(seen_path)],
+            label="live",
+            verbose=True,
+            decorate_logs=False,
+        )
+    assert output == "first\nsecond\n"
+    assert logged == ["first\n", "second\n"]
@@ -5,24 +5,32 @@ import os
 import pathlib
 import re
 import sys
+import time
 import typing
 from argparse import Namespace
 from collections import defaultdict
-from contextlib import redirect_stdout
+from contextlib import contextmanager, redirect_stdout
 from datetime import timedelta
 from pprint import pprint
 from unittest import mock
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import MagicMock, Mock, call, patch
 
 # Assuming that the modified _progress_updater function is in a module named runem
 import pytest
 
 from runem.config_metadata import ConfigMetadata
+from runem.hook_manager import HookManager
 from runem.informative_dict import InformativeDict
+from runem.job_executor import JobExecutor
+from runem.job_history import JobHistory
+from runem.job_progress import ProgressEvent, ProgressEvents
+from runem.job_shard import JobShard
+from runem.run_command import RunCommandBadExitCode, RunemJobTimeoutError
 from runem.runem import (
     _main,
     _process_jobs,
     _process_jobs_by_phase,
+    _run_jobs,
     _update_progress,
     timed_main,
 )
@@ -38,7 +46,7 @@ from runem.types.runem_config import (
     PhaseGroupedJobs,
     UserConfigMetadata,
 )
-from runem.types.types_jobs import JobReturn, JobTiming
+from runem.types.types_jobs import JobReturn, JobRunMetadatasByPhase, JobTiming
 from tests.intentional_test_error import IntentionalTestError
 from tests.sanitise_reports_footer import sanitise_reports_footer
 from tests.utils.dummy_data import (
@@ -81,11 +89,11 @@ def test_runem_basic() -> None:
 
 
 @patch(
-    "runem.runem.load_user_configs",
+    "runem.config_cache.load_user_configs",
     return_value=[],
 )
 @patch(
-    "runem.runem.load_project_config",
+    "runem.config_cache.load_project_config",
 )
 @patch(
     "runem.runem.find_files",
@@ -129,11 +137,11 @@ def test_runem_basic_with_config(
 
 
 @patch(
-    "runem.runem.load_user_configs",
+    "runem.config_cache.load_user_configs",
     return_value=[],
 )
 @patch(
-    "runem.runem.load_project_config",
+    "runem.config_cache.load_project_config",
 )
 @patch(
     "runem.runem.find_files",
@@ -174,11 +182,11 @@ def test_runem_basic_with_config_no_options(
 
 
 @patch(
-    "runem.runem.load_user_configs",
+    "runem.config_cache.load_user_configs",
     return_value=[],
 )
 @patch(
-    "runem.runem.load_project_config",
+    "runem.config_cache.load_project_config",
 )
 @patch(
     "runem.runem.find_files",
@@ -251,11 +259,11 @@ MOCK_USER_CONFIGS_METADATA: UserConfigMetadata = [
 
 
 @patch(
-    "runem.runem.load_user_configs",
+    "runem.config_cache.load_user_configs",
     return_value=MOCK_USER_CONFIGS_METADATA,
 )
 @patch(
-    "runem.runem.load_project_config",
+    "runem.config_cache.load_project_config",
 )
 @patch(
     "runem.runem.find_files",
@@ -1654,23 +1662,14 @@ def test_runem_phase_filters_work(verbosity: bool) -> None:
         ]
 
 
-class SleepCalledError(ValueError):
-    """Thrown when the sleep function is called to stop the infinite loop."""
-
-
-@pytest.fixture(name="mock_sleep")
-def create_mock_print_sleep() -> typing.Generator[typing.Tuple[Mock, Mock], None, None]:
-    call_count = 0
-
-    def custom_side_effect(*args: typing.Any, **kwargs: typing.Any) -> float:
-        nonlocal call_count
-        if call_count < 3:
-            call_count += 1
-            return 0.1  # Return a valid value for the first call
-        raise SleepCalledError("Mocked sleep error on the second call")
-
-    with patch("time.sleep", side_effect=custom_side_effect) as mock_sleep:
-        yield mock_sleep
+def _progress_events(
+    events: typing.List[typing.Optional[ProgressEvent]],
+) -> ProgressEvents:
+    """Returns a progress channel with the given events queued on it."""
+    progress_events: ProgressEvents = multiprocessing.SimpleQueue()
+    for event in events:
+        progress_events.put(event)
+    return progress_events
 
 
 @pytest.mark.parametrize(
@@ -1682,28 +1681,22 @@ def create_mock_print_sleep() -> typing.Generator[typing.Tuple[Mock, Mock], None
         False,
     ],
 )
-def test_progress_updater_with_running_jobs(
-    mock_sleep: Mock,
-    show_spinner: bool,
-) -> None:
-    running_jobs: typing.Dict[str, str] = {"job1": "running", "job2": "pending"}
-    completed_jobs: typing.Dict[str, str] = {}
-    with pytest.raises(SleepCalledError), multiprocessing.Manager() as manager:
-        _update_progress(
-            "dummy label",
-            running_jobs,
-            completed_jobs,
-            all_jobs=[],
-            is_running=manager.Value("b", True),
-            num_workers=1,
-            show_spinner=show_spinner,
-        )
-    mock_sleep.assert_called()
+def test_progress_updater_with_running_jobs(show_spinner: bool) -> None:
+    progress_events: ProgressEvents = _progress_events(
+        [(0, "job1", False), (1, "job2", False), (0, "job1", True), None]
+    )
+    _update_progress(
+        "dummy label",
+        progress_events,
+        all_jobs=[],
+        num_workers=1,
+        show_spinner=show_spinner,
+    )
+    assert progress_events.empty()
+    progress_events.close()
 
 
-def test_progress_updater_with_running_jobs_and_10_jobs(mock_sleep: Mock) -> None:
-    running_jobs: typing.Dict[str, str] = {"job1": "running", "job2": "pending"}
-    completed_jobs: typing.Dict[str, str] = {}
+def test_progress_updater_with_running_jobs_and_10_jobs() -> None:
     job_config: JobConfig = {
         "addr": {
             "file": __file__,
@@ -1725,49 +1718,74 @@ def test_progress_updater_with_running_jobs_and_10_jobs(mock_sleep: Mock) -> Non
         job_config = copy.copy(job_config)
         job_config["label"] = f"{job_config['label']} {idx}"
         all_jobs.append(job_config)
-    with pytest.raises(SleepCalledError), multiprocessing.Manager() as manager:
+    progress_events: ProgressEvents = _progress_events(
+        [
+            (0, "reformat py 0", False),
+            (1, "reformat py 1", False),
+            (0, "reformat py 0", True),
+            (1, "reformat py 1", True),
+            None,
+        ]
+    )
+    with patch("runem.runem.RICH_CONSOLE.log") as log_mock:
         _update_progress(
             "dummy label",
-            running_jobs,
-            completed_jobs,
+            progress_events,
             all_jobs=all_jobs,
-            is_running=manager.Value("b", True),
             num_workers=1,
             show_spinner=False,
         )
-    mock_sleep.assert_called()
+    progress_events.close()
+    # only changes to the running jobs are logged
+    assert [call_args[0][0] for call_args in log_mock.call_args_list] == [
+        "[green]dummy label[/green]: 0/10(1): '[blue]reformat py 0[/blue]'",
+        (
+            "[green]dummy label[/green]: 0/10(1): "
+            "'[blue]reformat py 0[/blue]', '[blue]reformat py 1[/blue]'"
+        ),
+        "[green]dummy label[/green]: 1/10(1): '[blue]reformat py 1[/blue]'",
+        "[green]dummy label[/green]: 2/10(1): ",
+    ]
 
 
-def test_progress_updater_without_running_jobs(mock_sleep: Mock) -> None:
-    running_jobs: typing.Dict[str, str] = {}
-    completed_jobs: typing.Dict[str, str] = {}
-    with pytest.raises(SleepCalledError), multiprocessing.Manager() as manager:
+@pytest.mark.parametrize("show_spinner", [True, False])
+def test_progress_updater_prints_the_workers_output(show_spinner: bool) -> None:
+    progress_events: ProgressEvents = _progress_events(
+        [
+            (0, "job1", False),
+            ("[green]| [/green][blue]job1[/blue]: line 1\n| job1: line 2", "\n"),
+            ("runem: job: DONE", "\n"),
+            (0, "job1", True),
+            None,
+        ]
+    )
+    with patch("runem.runem.blocking_print") as print_mock:
         _update_progress(
             "dummy label",
-            running_jobs,
-            completed_jobs,
+            progress_events,
             all_jobs=[],
-            is_running=manager.Value("b", True),
             num_workers=1,
-            show_spinner=False,
+            show_spinner=show_spinner,
         )
-    mock_sleep.assert_called()
+    progress_events.close()
+    assert print_mock.call_args_list == [
+        call("[green]| [/green][blue]job1[/blue]: line 1\n| job1: line 2", end="\n"),
+        call("runem: job: DONE", end="\n"),
+    ]
 
 
-def test_progress_updater_with_empty_running_jobs(mock_sleep: Mock) -> None:
-    running_jobs: typing.Dict[str, str] = {"job1": ""}
-    completed_jobs: typing.Dict[str, str] = {}
-    with pytest.raises(SleepCalledError), multiprocessing.Manager() as manager:
+def test_progress_updater_ignores_unknown_finished_jobs() -> None:
+    progress_events: ProgressEvents = _progress_events([(7, "job1", True), None])
+    with patch("runem.runem.RICH_CONSOLE.log") as log_mock:
         _update_progress(
             "dummy label",
-            running_jobs,
-            completed_jobs,
+            progress_events,
             all_jobs=[],
-            is_running=manager.Value("b", True),
             num_workers=1,
             show_spinner=False,
         )
-    mock_sleep.assert_called()
+    progress_events.close()
+    log_mock.assert_not_called()
 
 
 @pytest.mark.parametrize(
@@ -1779,18 +1797,16 @@ def test_progress_updater_with_empty_running_jobs(mock_sleep: Mock) -> None:
         False,
     ],
 )
-def test_progress_updater_with_false(show_spinner: bool) -> None:
-    running_jobs: typing.Dict[str, str] = {"job1": ""}
-    with multiprocessing.Manager() as manager:
-        _update_progress(
-            "dummy label",
-            running_jobs,
-            {},
-            [],
-            manager.Value("b", False),
-            1,
-            show_spinner=show_spinner,
-        )
+def test_progress_updater_with_no_events(show_spinner: bool) -> None:
+    progress_events: ProgressEvents = _progress_events([None])
+    _update_progress(
+        "dummy label",
+        progress_events,
+        [],
+        1,
+        show_spinner=show_spinner,
+    )
+    progress_events.close()
 
 
 @patch(
@@ -1891,7 +1907,15 @@ def test_process_jobs_by_phase_early_exits_with_exceptions(
     )
 
     config_metadata.set_cli_data(
-        args=Namespace(verbose=verbosity, procs=1),
+        args=Namespace(
+            verbose=verbosity,
+            procs=1,
+            fail_fast=False,
+            load_aware=False,
+            mem_budget=None,
+            job_timeout=None,
+            cache=False,
+        ),
         jobs_to_run=set(all_job_names),  # JobNames,
         phases_to_run=set(all_phase_names),  # JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -2004,7 +2028,15 @@ def test_process_jobs_early_exits_with_exceptions(
     )
 
     config_metadata.set_cli_data(
-        args=Namespace(verbose=True, procs=1),
+        args=Namespace(
+            verbose=True,
+            procs=1,
+            fail_fast=False,
+            load_aware=False,
+            mem_budget=None,
+            job_timeout=None,
+            cache=False,
+        ),
         jobs_to_run=set(all_job_names),  # JobNames,
         phases_to_run=set(all_phase_names),  # JobPhases,
         tags_to_run=set(),  # ignored JobTags,
@@ -2055,3 +2087,747 @@ def test_main_handles_no_files(
         "runem: WARNING: no files found",
         "",
     ]
+
+
+def test_process_jobs_schedules_longest_first(tmp_path: pathlib.Path) -> None:
+    """Jobs start longest-first but are reported in config order."""
+    jobs: Jobs = [
+        {"label": "quick job", "command": "echo quick"},
+        {"label": "slow job", "command": "echo slow"},
+        {"label": "medium job", "command": "echo medium"},
+    ]
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = jobs
+    config_metadata: ConfigMetadata = ConfigMetadata(
+        cfg_filepath=pathlib.Path(__file__),
+        phases=("dummy phase 1",),
+        options_config=tuple(),
+        file_filters={},
+        hook_manager=HookManager(defaultdict(list), verbose=False),
+        jobs=jobs_by_phase,
+        all_job_names={"quick job", "slow job", "medium job"},
+        all_job_phases={"dummy phase 1"},
+        all_job_tags=set(),
+    )
+    config_metadata.set_cli_data(
+        args=Namespace(
+            verbose=True,
+            procs=1,
+            fail_fast=False,
+            load_aware=False,
+            mem_budget=None,
+            job_timeout=None,
+            cache=False,
+        ),
+        jobs_to_run={"quick job", "slow job", "medium job"},
+        phases_to_run={"dummy phase 1"},
+        tags_to_run=set(),
+        tags_to_avoid=set(),
+        options=InformativeDict({}),
+    )
+    run_order_file = tmp_path / "run_order.txt"
+
+    def _record_run_order(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        label: str = job_config["label"]
+        with run_order_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"{label}\n")
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_record_run_order),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            in_out_job_run_metadatas=job_run_metadatas,
+            phase="dummy phase 1",
+            jobs=jobs,
+            show_spinner=False,
+            job_history={
+                "quick job": {"duration_s": 0.1},
+                "slow job": {"duration_s": 90.0},
+                "medium job": {"duration_s": 5.0},
+            },
+        )
+        runem_stdout = buf.getvalue().split("\n")
+    assert error is None
+    assert runem_stdout[:2] == [
+        "runem: Running 'dummy phase 1' with 1 workers (of 1 max) processing 3 jobs",
+        "runem: scheduled 'dummy phase 1' longest-first: slow job, medium job, quick job",
+    ]
+    assert run_order_file.read_text().splitlines() == [
+        "slow job",
+        "medium job",
+        "quick job",
+    ]
+    assert [timing["job"][0] for timing, _ in job_run_metadatas["dummy phase 1"]] == [
+        "quick job",
+        "slow job",
+        "medium job",
+    ]
+
+
+def test_process_jobs_by_phase_shares_executor() -> None:
+    """One worker pool serves all phases, and its overhead is recorded."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [{"label": "job 1", "command": "echo 1"}]
+    jobs_by_phase["dummy phase 2"] = [
+        {"label": "job 2", "command": "echo 2"},
+        {"label": "job 3", "command": "echo 3"},
+    ]
+    config_metadata: ConfigMetadata = ConfigMetadata(
+        cfg_filepath=pathlib.Path(__file__),
+        phases=("dummy phase 1", "dummy phase 2"),
+        options_config=tuple(),
+        file_filters={},
+        hook_manager=HookManager(defaultdict(list), verbose=False),
+        jobs=jobs_by_phase,
+        all_job_names={"job 1", "job 2", "job 3"},
+        all_job_phases={"dummy phase 1", "dummy phase 2"},
+        all_job_tags=set(),
+    )
+    config_metadata.set_cli_data(
+        args=Namespace(
+            verbose=False,
+            procs=4,
+            fail_fast=False,
+            load_aware=False,
+            mem_budget=None,
+            job_timeout=None,
+            cache=False,
+        ),
+        jobs_to_run={"job 1", "job 2", "job 3"},
+        phases_to_run={"dummy phase 1", "dummy phase 2"},
+        tags_to_run=set(),
+        tags_to_avoid=set(),
+        options=InformativeDict({}),
+    )
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch(
+            "runem.job_execute.job_execute_inner",
+            return_value=MOCK_JOB_EXECUTE_INNER_RET,
+        ),
+        patch("runem.runem.JobExecutor", wraps=JobExecutor) as executor_mock,
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+        )
+    assert error is None
+    # sized for the busiest phase
+    executor_mock.assert_called_once_with(2, None)
+    assert len(job_run_metadatas["dummy phase 1"]) == 1
+    assert len(job_run_metadatas["dummy phase 2"]) == 2
+    app_labels: typing.List[str] = [
+        timing["job"][0] for timing, _ in job_run_metadatas["_app"]
+    ]
+    assert app_labels[:2] == ["executor-start", "executor-stop"]
+    # how busy each worker was, busiest first
+    assert len(app_labels) == 4
+    assert all(
+        re.fullmatch(r"worker-\d \(\d+% busy\)", app_label)
+        for app_label in app_labels[2:]
+    )
+
+
+def _dependency_config_metadata(jobs_by_phase: PhaseGroupedJobs) -> ConfigMetadata:
+    job_names: typing.Set[str] = {
+        job["label"] for jobs in jobs_by_phase.values() for job in jobs
+    }
+    config_metadata: ConfigMetadata = ConfigMetadata(
+        cfg_filepath=pathlib.Path(__file__),
+        phases=("dummy phase 1", "dummy phase 2"),
+        options_config=tuple(),
+        file_filters={},
+        hook_manager=HookManager(defaultdict(list), verbose=False),
+        jobs=jobs_by_phase,
+        all_job_names=job_names,
+        all_job_phases={"dummy phase 1", "dummy phase 2"},
+        all_job_tags=set(),
+    )
+    config_metadata.set_cli_data(
+        args=Namespace(
+            verbose=False,
+            procs=1,
+            fail_fast=False,
+            load_aware=False,
+            mem_budget=None,
+            job_timeout=None,
+            cache=False,
+        ),
+        jobs_to_run=job_names,
+        phases_to_run={"dummy phase 1", "dummy phase 2"},
+        tags_to_run=set(),
+        tags_to_avoid=set(),
+        options=InformativeDict({}),
+    )
+    return config_metadata
+
+
+def test_process_jobs_by_phase_runs_by_dependency(tmp_path: pathlib.Path) -> None:
+    """A job with `when.after` can start before earlier phases have finished."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {"label": "install", "command": "echo 1", "when": {"phase": "dummy phase 1"}},
+        {"label": "lint", "command": "echo 2", "when": {"phase": "dummy phase 1"}},
+    ]
+    jobs_by_phase["dummy phase 2"] = [
+        {
+            "label": "reformat",
+            "command": "echo 3",
+            "when": {"phase": "dummy phase 2", "after": ["install"]},
+        },
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    run_order_file = tmp_path / "run_order.txt"
+
+    def _record_run_order(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        label: str = job_config["label"]
+        with run_order_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"{label}\n")
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_record_run_order),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+            job_history={
+                "install": {"duration_s": 90.0},
+                "reformat": {"duration_s": 50.0},
+                "lint": {"duration_s": 5.0},
+            },
+        )
+        runem_stdout = buf.getvalue().split("\n")
+    assert error is None
+    assert runem_stdout[0] == (
+        "runem: Running 3 jobs by dependency with 1 workers (of 1 max)"
+    )
+    # 'reformat' only waits on 'install', not on all of 'dummy phase 1'
+    assert run_order_file.read_text().splitlines() == ["install", "reformat", "lint"]
+    assert [timing["job"][0] for timing, _ in job_run_metadatas["dummy phase 1"]] == [
+        "install",
+        "lint",
+    ]
+    assert [timing["job"][0] for timing, _ in job_run_metadatas["dummy phase 2"]] == [
+        "reformat",
+    ]
+
+
+def test_process_jobs_by_phase_exits_on_dependency_cycle() -> None:
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {
+            "label": "job 1",
+            "command": "echo 1",
+            "when": {"phase": "dummy phase 1", "after": ["job 2"]},
+        },
+    ]
+    jobs_by_phase["dummy phase 2"] = [
+        {"label": "job 2", "command": "echo 2", "when": {"phase": "dummy phase 2"}},
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    with (
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+        pytest.raises(SystemExitBad),
+    ):
+        _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=defaultdict(list),
+            show_spinner=False,
+        )
+
+
+@pytest.mark.parametrize("fail_fast", [True, False])
+def test_process_jobs_by_phase_fail_fast(
+    tmp_path: pathlib.Path, fail_fast: bool
+) -> None:
+    """On --fail-fast running jobs are stopped, without it they complete."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {"label": "fails", "command": "echo 1"},
+        {"label": "slow", "command": "echo 2"},
+        {"label": "queued", "command": "echo 3"},
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    config_metadata.args.procs = 2
+    config_metadata.args.fail_fast = fail_fast
+    completed_file = tmp_path / "completed.txt"
+
+    def _fail_or_sleep(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        label: str = job_config["label"]
+        if label == "fails":
+            raise RunCommandBadExitCode("dummy failure")
+        if label == "slow":
+            time.sleep(2)
+        with completed_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"{label}\n")
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_fail_or_sleep),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+        )
+        runem_stdout = buf.getvalue()
+    assert isinstance(error, RunCommandBadExitCode)
+    assert ("fail-fast: stopping 1 running jobs" in runem_stdout) is fail_fast
+    # on --fail-fast the running job is stopped and the queued one never started,
+    # without it both complete
+    completed: typing.List[str] = (
+        completed_file.read_text().splitlines() if completed_file.exists() else []
+    )
+    assert sorted(completed) == ([] if fail_fast else ["queued", "slow"])
+
+
+def test_run_jobs_stops_jobs_before_the_progress_display_on_fail_fast() -> None:
+    """The display reads the workers' output until they are all stopped."""
+    jobs: Jobs = [{"label": "fails", "command": "echo 1"}]
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = jobs
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    config_metadata.args.fail_fast = True
+    calls: typing.List[str] = []
+
+    @contextmanager
+    def _fake_progress_reporter(*args: typing.Any) -> typing.Iterator[None]:
+        yield
+        calls.append("stop progress")
+
+    executor = MagicMock()
+    executor.run_jobs.return_value = ([None], RunCommandBadExitCode("failure"))
+    executor.stop_jobs.side_effect = lambda: calls.append("stop jobs")
+    with patch("runem.runem._progress_reporter", new=_fake_progress_reporter):
+        _, error = _run_jobs(
+            executor,
+            "dummy phase 1",
+            config_metadata,
+            defaultdict(list),
+            jobs,
+            {},
+            [0],
+            1,
+            False,
+            None,
+        )
+    assert isinstance(error, RunCommandBadExitCode)
+    assert calls == ["stop jobs", "stop progress"]
+
+
+def test_process_jobs_by_phase_counts_failed_jobs_as_busy() -> None:
+    """The utilisation report counts the time workers spent on failing jobs."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [{"label": "fails", "command": "echo 1"}]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+
+    def _fail_slowly(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        time.sleep(0.3)
+        raise RunCommandBadExitCode("dummy failure")
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_fail_slowly),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+        )
+    assert isinstance(error, RunCommandBadExitCode)
+    worker_busy: typing.List[timedelta] = [
+        timing["job"][1]
+        for timing, _ in job_run_metadatas["_app"]
+        if timing["job"][0].startswith("worker-")
+    ]
+    assert len(worker_busy) == 1
+    assert worker_busy[0] >= timedelta(seconds=0.3)
+
+
+def test_process_jobs_by_phase_skips_dependents_of_failed_jobs(
+    tmp_path: pathlib.Path,
+) -> None:
+    """Only the jobs after a failed job are skipped, independent jobs still run."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {"label": "fails", "command": "echo 1", "when": {"phase": "dummy phase 1"}},
+        {
+            "label": "after fails",
+            "command": "echo 2",
+            "when": {"phase": "dummy phase 1", "after": ["fails"]},
+        },
+        {
+            "label": "after after fails",
+            "command": "echo 3",
+            "when": {"phase": "dummy phase 1", "after": ["after fails"]},
+        },
+        {
+            "label": "independent",
+            "command": "echo 4",
+            "when": {"phase": "dummy phase 1"},
+        },
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    completed_file = tmp_path / "completed.txt"
+
+    def _fail_or_complete(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        label: str = job_config["label"]
+        if label == "fails":
+            raise RunCommandBadExitCode("dummy failure")
+        with completed_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"{label}\n")
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_fail_or_complete),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        # one worker, so 'independent' is queued behind 'fails'
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=defaultdict(list),
+            show_spinner=False,
+        )
+    assert isinstance(error, RunCommandBadExitCode)
+    assert completed_file.read_text().splitlines() == ["independent"]
+
+
+def test_process_jobs_by_phase_stops_jobs_that_time_out() -> None:
+    """Jobs running for longer than their timeout are stopped, and reported."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {"label": "hangs", "command": "echo 1", "ctx": {"timeout_s": 0.5}},
+        {"label": "quick", "command": "echo 2"},
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    config_metadata.args.procs = 2
+    config_metadata.args.job_timeout = 60.0
+
+    def _hang(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        label: str = job_config["label"]
+        if label == "hangs":
+            time.sleep(30)
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    start: float = time.monotonic()
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_hang),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+        )
+        runem_stdout = buf.getvalue()
+    assert time.monotonic() - start < 20
+    assert isinstance(error, RunemJobTimeoutError)
+    assert "timed out: 'hangs' ran for longer than 0.5s" in runem_stdout
+    assert job_run_metadatas["_timed_out"] == [
+        (
+            {
+                "job": ("hangs", timedelta(seconds=0.5)),
+                "commands": [],
+                "timed_out": True,
+            },
+            None,
+        )
+    ]
+
+
+def test_process_jobs_by_phase_holds_back_jobs_on_busy_host() -> None:
+    """Only one job runs at a time whilst the host is busy, the wait is reported."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {"label": "job 1", "command": "echo 1"},
+        {"label": "job 2", "command": "echo 2"},
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    config_metadata.args.procs = 2
+    config_metadata.args.load_aware = True
+    config_metadata.args.verbose = True
+
+    def _sleep(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        time.sleep(0.2)
+        label: str = job_config["label"]
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_sleep),
+        # a host without pressure-stall info, busy with others' processes
+        patch("runem.host_load.read_pressure", return_value=None),
+        patch("runem.host_load.read_load_average", return_value=100.0),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+        )
+        runem_stdout = buf.getvalue()
+    assert error is None
+    assert "holding back jobs, the host is busy: load-average 100.00" in runem_stdout
+    assert len(job_run_metadatas["dummy phase 1"]) == 2
+    app_timings: typing.Dict[str, timedelta] = {
+        timing["job"][0]: timing["job"][1] for timing, _ in job_run_metadatas["_app"]
+    }
+    assert app_timings["throttled"] >= timedelta(seconds=0.1)
+
+
+def test_process_jobs_by_phase_weights_jobs_by_cpu_slots(
+    tmp_path: pathlib.Path,
+) -> None:
+    """Multi-core jobs only run together when there are cpus enough for them."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {"label": "big 1", "command": "echo 1", "ctx": {"cpu_slots": 3}},
+        {"label": "big 2", "command": "echo 2", "ctx": {"cpu_slots": 3}},
+        # asks for more than there are, so gets all of them
+        {"label": "huge", "command": "echo 3", "ctx": {"cpu_slots": 16}},
+        {"label": "small", "command": "echo 4"},
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    config_metadata.args.procs = 4
+    events_file = tmp_path / "events.txt"
+
+    def _record_events(
+        job_config: JobConfig,
+        config_metadata: ConfigMetadata,
+        file_lists: FilePathListLookup,
+        cpu_slots: typing.Optional[int],
+        *args: typing.Any,
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        label: str = job_config["label"]
+        with events_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"start {label} {cpu_slots}\n")
+        time.sleep(0.1)
+        with events_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"end {label}\n")
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_record_events),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+        )
+    assert error is None
+    # the big jobs don't fit together, and nothing fits alongside 'huge'. The
+    # jobs that asked for cpus are told how many they got.
+    assert events_file.read_text().splitlines() == [
+        "start big 1 3",
+        "end big 1",
+        "start big 2 3",
+        "end big 2",
+        "start huge 4",
+        "end huge",
+        "start small None",
+        "end small",
+    ]
+
+
+def test_process_jobs_by_phase_keeps_jobs_within_the_mem_budget(
+    tmp_path: pathlib.Path,
+) -> None:
+    """Jobs only run together when their peak memory fits in --mem-budget."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {"label": "big 1", "command": "echo 1"},
+        {"label": "big 2", "command": "echo 2"},
+        {"label": "small", "command": "echo 3"},
+        # bigger than the whole budget, so runs on its own
+        {"label": "huge", "command": "echo 4"},
+    ]
+    job_history: JobHistory = {
+        "big 1": {"max_rss_bytes": 600},
+        "big 2": {"max_rss_bytes": 600},
+        "small": {"max_rss_bytes": 300},
+        "huge": {"max_rss_bytes": 5000},
+    }
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    config_metadata.args.procs = 4
+    config_metadata.args.mem_budget = 1000
+    events_file = tmp_path / "events.txt"
+
+    def _record_events(
+        job_config: JobConfig, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        label: str = job_config["label"]
+        with events_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"start {label}\n")
+        time.sleep(0.1)
+        with events_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"end {label}\n")
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.job_execute.job_execute_inner", side_effect=_record_events),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=defaultdict(list),
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+            job_history=job_history,
+        )
+    assert error is None
+    running: typing.Set[str] = set()
+    started: typing.List[str] = []
+    for event in events_file.read_text().splitlines():
+        action, label = event.split(" ", 1)
+        if action == "start":
+            running.add(label)
+            started.append(label)
+            if label == "small":
+                # the queue is not re-ordered to squeeze jobs in
+                assert "big 1" not in running
+            if label == "huge":
+                assert running == {"huge"}
+            else:
+                assert (
+                    sum(
+                        job_history[running_label]["max_rss_bytes"]
+                        for running_label in running
+                    )
+                    <= 1000
+                ), f"too much memory in use running {running}"
+        else:
+            running.remove(label)
+    # 'big 2' and 'small' are started together, on different workers, so may
+    # report their starts in either order
+    assert started[0] == "big 1"
+    assert set(started[1:3]) == {"big 2", "small"}
+    assert started[3] == "huge"
+
+
+def test_process_jobs_by_phase_shards_jobs_across_workers(
+    tmp_path: pathlib.Path,
+) -> None:
+    """A sharded job runs a task per shard, and is reported as one job."""
+    jobs_by_phase: PhaseGroupedJobs = defaultdict(list)
+    jobs_by_phase["dummy phase 1"] = [
+        {
+            "label": "lint",
+            "command": "pylint {file_list}",
+            "ctx": {"shard": {"min_files_per_shard": 2}},
+            "when": {"phase": "dummy phase 1", "tags": {"py"}},
+        },
+    ]
+    config_metadata: ConfigMetadata = _dependency_config_metadata(jobs_by_phase)
+    config_metadata.args.procs = 3
+    file_lists: FilePathListLookup = defaultdict(list)
+    file_lists["py"] = [f"file_{idx}.py" for idx in range(6)]
+    shards_file = tmp_path / "shards.txt"
+
+    def _record_shard(
+        job_config: JobConfig,
+        config_metadata: ConfigMetadata,
+        file_lists: FilePathListLookup,
+        cpu_slots: typing.Optional[int],
+        shard: typing.Optional[JobShard],
+    ) -> typing.Tuple[JobTiming, JobReturn]:
+        assert shard is not None
+        with shards_file.open("a", encoding="utf-8") as file_handle:
+            file_handle.write(f"{shard['index']}/{shard['count']}: ")
+            file_handle.write(f"{' '.join(shard['file_list'])}\n")
+        label: str = job_config["label"]
+        return ({"job": (label, timedelta(seconds=1)), "commands": []}, None)
+
+    job_run_metadatas: JobRunMetadatasByPhase = defaultdict(list)
+    with (
+        patch("runem.runem.JobExecutor", side_effect=JobExecutor) as executor_mock,
+        patch("runem.job_execute.job_execute_inner", side_effect=_record_shard),
+        io.StringIO() as buf,
+        redirect_stdout(buf),
+    ):
+        error = _process_jobs_by_phase(
+            config_metadata=config_metadata,
+            file_lists=file_lists,
+            filtered_jobs_by_phase=jobs_by_phase,
+            in_out_job_run_metadatas=job_run_metadatas,
+            show_spinner=False,
+        )
+    assert error is None
+    # a worker per shard
+    executor_mock.assert_called_once_with(3, None)
+    shard_runs: typing.List[str] = sorted(shards_file.read_text().splitlines())
+    assert [shard_run.split(":")[0] for shard_run in shard_runs] == [
+        "0/3",
+        "1/3",
+        "2/3",
+    ]
+    sharded_files: typing.List[str] = sorted(
+        file_name
+        for shard_run in shard_runs
+        for file_name in shard_run.split(": ")[1].split()
+    )
+    assert sharded_files == file_lists["py"]
+    assert job_run_metadatas["dummy phase 1"] == [
+        ({"job": ("lint", timedelta(seconds=3)), "commands": []}, None)
+    ]
@@ -151,3 +151,40 @@ def test_get_timing_filters_latest_run_metadata(
             }
         ]
     }
+
+
+def test_get_timing_shows_the_resources_the_commands_used(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(
+        runem_runner_mcp,
+        "LATEST_RUN_METADATA",
+        {
+            "test": [
+                (
+                    {
+                        "job": ("test", timedelta(seconds=4)),
+                        "commands": [
+                            ("pytest", timedelta(seconds=2)),
+                            ("pytest", timedelta(seconds=2)),
+                        ],
+                        "command_resources": [
+                            ("pytest", {"user_cpu_s": 3.0, "system_cpu_s": 1.0}),
+                            ("pytest", {"user_cpu_s": 1.0, "system_cpu_s": 0.0}),
+                        ],
+                    },
+                    None,
+                )
+            ]
+        },
+    )
+
+    payload = yaml.safe_load(runem_runner_mcp.get_timing(job="test"))
+
+    (entry,) = payload["timing"]
+    assert [command["resources"] for command in entry["commands"]] == [
+        {"user_cpu_s": 3.0, "system_cpu_s": 1.0, "cpu_efficiency": 2.0},
+        {"user_cpu_s": 1.0, "system_cpu_s": 0.0, "cpu_efficiency": 0.5},
+    ]
+    assert entry["resources"]["user_cpu_s"] == 4.0
+    assert entry["resources"]["cpu_efficiency"] == 1.25
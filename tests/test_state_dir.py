@@ -0,0 +1,50 @@
+import pathlib
+
+import pytest
+
+from runem.state_dir import STATE_DIR_ENV_VAR, find_state_dir
+
+
+def test_find_state_dir_uses_env_override(tmp_path: pathlib.Path) -> None:
+    # NOTE: the conftest sets the env-var for all tests
+    assert find_state_dir(tmp_path / ".runem.yml") == tmp_path / "runem-state"
+
+
+def test_find_state_dir_finds_git_dir(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.delenv(STATE_DIR_ENV_VAR)
+    (tmp_path / ".git").mkdir()
+    sub_dir = tmp_path / "sub" / "dir"
+    sub_dir.mkdir(parents=True)
+    assert find_state_dir(sub_dir / ".runem.yml") == tmp_path / ".git" / "runem"
+
+
+def test_find_state_dir_follows_git_file(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    """Work-trees and submodules have a `.git` file pointing at the git-dir."""
+    monkeypatch.delenv(STATE_DIR_ENV_VAR)
+    worktree = tmp_path / "worktree"
+    worktree.mkdir()
+    (worktree / ".git").write_text("gitdir: ../main/.git/worktrees/wt\n")
+    assert find_state_dir(worktree / ".runem.yml") == (
+        worktree / ".." / "main" / ".git" / "worktrees" / "wt" / "runem"
+    )
+
+
+def test_find_state_dir_handles_bad_git_file(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.delenv(STATE_DIR_ENV_VAR)
+    (tmp_path / ".git").write_text("not a git file\n")
+    assert find_state_dir(tmp_path / ".runem.yml") is None
+
+
+def test_find_state_dir_none_outside_git(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+) -> None:
+    monkeypatch.delenv(STATE_DIR_ENV_VAR)
+    # the tmp_path may be inside a git checkout, so patch the search
+    monkeypatch.setattr("runem.state_dir.find_git_dir", lambda _: None)
+    assert find_state_dir(tmp_path / ".runem.yml") is None